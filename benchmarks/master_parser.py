@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# Compares parse_master against decode_master on a recorded servers.json.
+#
+# Usage:
+#   python -m benchmarks.master_parser --record            # download a fresh fixture
+#   python -m benchmarks.master_parser [--fixture PATH] [--runs N]
+#
+# The fixture may be gzip-compressed. Timings include JSON decoding for both paths.
+
+import argparse
+import asyncio
+import gc
+import gzip
+import json
+import os
+import statistics
+import time
+import tracemalloc
+
+import aiohttp
+
+from utils.master_parser import MASTER_URL, decode_master, parse_master
+
+DEFAULT_FIXTURE = "benchmarks/fixtures/servers.json.gz"
+
+
+async def record(path: str):
+    async with aiohttp.ClientSession() as session:
+        async with session.get(MASTER_URL, timeout=aiohttp.ClientTimeout(total=30)) as resp:
+            resp.raise_for_status()
+            raw = await resp.read()
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wb") as f:
+        f.write(raw)
+    print(f"Recorded {len(raw)} bytes from {MASTER_URL} to {path}")
+
+
+def load(path: str) -> bytes:
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        return f.read()
+
+
+def measure(func, raw: bytes, runs: int):
+    timings = []
+    for _ in range(runs):
+        gc.collect()
+        start = time.perf_counter()
+        func(raw)
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    result = func(raw)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return timings, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--record", action="store_true", help="download a new fixture and exit")
+    args = parser.parse_args()
+
+    if args.record:
+        asyncio.run(record(args.fixture))
+        return
+
+    if not os.path.exists(args.fixture):
+        parser.exit(1, f"Fixture {args.fixture} not found, run with --record first.\n")
+
+    raw = load(args.fixture)
+    candidates = {
+        "parse_master": lambda r: parse_master(json.loads(r)),
+        "decode_master": lambda r: decode_master(r),
+        "decode_master(skins, extras)": lambda r: decode_master(r, skins=True, extras=True),
+    }
+
+    print(f"Fixture: {args.fixture} ({len(raw) / 1024 / 1024:.1f} MiB), {args.runs} runs")
+    baseline = None
+    for name, func in candidates.items():
+        timings, peak, master = measure(func, raw, args.runs)
+        median = statistics.median(timings)
+        baseline = baseline or median
+        clients = sum(len(s.info.clients) for s in master.servers)
+        print(
+            f"{name:<30} median {median * 1000:8.1f} ms  "
+            f"min {min(timings) * 1000:8.1f} ms  "
+            f"peak {peak / 1024 / 1024:7.1f} MiB  "
+            f"x{baseline / median:4.2f}  "
+            f"({len(master.servers)} servers, {clients} clients)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# Compares the eager TwMapV4 parser against LazyTwMapV4.
+#
+# Usage:
+#   python -m benchmarks.tw_map_v4 [--map PATH] [--runs N]
+#
+# Without --map a synthetic map is built (see tests/twmap_fixture.py). The workload is what
+# the size visualization needs: parse the map and read every image and sound name.
+
+import argparse
+import gc
+import os
+import statistics
+import time
+import tracemalloc
+
+from benchmarks.tw_map_v4_lazy import LazyTwMapV4
+from benchmarks.twmap_fixture import DEFAULT_OUT
+from extensions.map_testing.tw_map_v4 import TwMapV4
+from tests.twmap_fixture import build_map
+
+
+def read_names(cls, raw: bytes, **kwargs):
+    tw_map = cls.from_bytes(raw, **kwargs)
+    names = [
+        item.content.name.string
+        for item in tw_map.items
+        if item.type_id in (TwMapV4.ItemKind.image, TwMapV4.ItemKind.sound)
+    ]
+    return tw_map, names
+
+
+def measure(func, raw: bytes, runs: int):
+    timings = []
+    for _ in range(runs):
+        gc.collect()
+        start = time.perf_counter()
+        func(raw)
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    result = func(raw)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return timings, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--map", default=DEFAULT_OUT)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    if os.path.exists(args.map):
+        with open(args.map, "rb") as f:
+            raw = f.read()
+    else:
+        print(f"{args.map} not found, using a synthetic map")
+        raw = build_map()
+
+    candidates = {
+        "TwMapV4": lambda r: read_names(TwMapV4, r),
+        "LazyTwMapV4": lambda r: read_names(LazyTwMapV4, r),
+        "LazyTwMapV4(cache=False)": lambda r: read_names(LazyTwMapV4, r, cache=False),
+    }
+
+    print(f"Map: {len(raw) / 1024 / 1024:.1f} MiB, {args.runs} runs")
+    baseline = None
+    for name, func in candidates.items():
+        timings, peak, (_, names) = measure(func, raw, args.runs)
+        median = statistics.median(timings)
+        baseline = baseline or median
+        print(
+            f"{name:<26} median {median * 1000:8.1f} ms  "
+            f"min {min(timings) * 1000:8.1f} ms  "
+            f"peak {peak / 1024 / 1024:7.1f} MiB  "
+            f"x{baseline / median:5.2f}  "
+            f"({len(names)} names)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Lazy variant of the generated TwMapV4 parser.
+
+TwMapV4 inflates every data item (including every embedded image and sound) while parsing.
+LazyTwMapV4 parses header, item types, offsets and items eagerly like the generated parser, but
+only keeps the compressed data items around and inflates one when it is first accessed.
+
+All accessors of the generated types (OptionalStringDataIndex.string, QuadsLayerItem.quads, ...)
+keep working, since they only go through ``_root.data_items[index]._io``.
+
+Only benchmarks/tw_map_v4.py uses this parser, the bot itself parses maps with TwMapV4.
+"""
+
+import zlib
+from collections.abc import Sequence
+from typing import Dict, List, Optional
+
+from kaitaistruct import BytesIO, KaitaiStream
+
+from extensions.map_testing.tw_map_v4 import TwMapV4
+
+
+class LazyDataItems(Sequence):
+    """
+    Sequence of TwMapV4.Dummy data items that are inflated on access.
+
+    Every access returns a fresh item with its own stream positioned at the start, so two
+    accessors reading the same data item do not interfere with each other.
+
+    Args:
+        root: The map the items belong to.
+        compressed: The zlib-compressed data items.
+        cache: Keep inflated data items in memory for repeated access.
+    """
+
+    def __init__(self, root: "LazyTwMapV4", compressed: List[bytes], cache: bool = True):
+        self._root = root
+        self._compressed = compressed
+        self.cache = cache
+        self._inflated: Dict[int, bytes] = {}
+
+    def __len__(self) -> int:
+        return len(self._compressed)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return TwMapV4.Dummy(KaitaiStream(BytesIO(self.data(index))), self._root, self._root)
+
+    def data(self, index: int) -> bytes:
+        """Returns the inflated bytes of a data item."""
+        if index < 0:
+            index += len(self)
+        if (data := self._inflated.get(index)) is not None:
+            return data
+
+        data = zlib.decompress(self._compressed[index])
+        if self.cache:
+            self._inflated[index] = data
+        return data
+
+    def compressed_size(self, index: int) -> int:
+        return len(self._compressed[index])
+
+    def clear(self):
+        """Drops every cached inflated data item."""
+        self._inflated.clear()
+
+
+class LazyTwMapV4(TwMapV4):
+    """
+    TwMapV4 that inflates data items on first access.
+
+    ``_raw__raw_data_items`` still holds the compressed data items. ``_raw_data_items`` (the inflated
+    items of the eager parser) is not available.
+
+    Args:
+        cache: Keep inflated data items in memory. Disable it when every item is read once only.
+    """
+
+    def __init__(self, _io, _parent=None, _root=None, *, cache: bool = True):
+        self._cache_data_items = cache
+        super().__init__(_io, _parent, _root)
+
+    @classmethod
+    def from_bytes(cls, buf: bytes, *, cache: bool = True) -> "LazyTwMapV4":
+        return cls(KaitaiStream(BytesIO(buf)), cache=cache)
+
+    @classmethod
+    def from_file(cls, filename: str, *, cache: bool = True) -> "LazyTwMapV4":
+        with open(filename, "rb") as f:
+            return cls.from_bytes(f.read(), cache=cache)
+
+    def _read(self):
+        self.header = TwMapV4.Header(self._io, self, self._root)
+        self.item_types = [TwMapV4.ItemType(self._io, self, self._root) for _ in range(self.header.num_item_types)]
+        self.item_offsets = [self._io.read_s4le() for _ in range(self.header.num_items)]
+        self.data_offsets = [self._io.read_s4le() for _ in range(self.header.num_data)]
+        self.data_sizes = [self._io.read_s4le() for _ in range(self.header.num_data)]
+        self.items = [TwMapV4.Item(self._io, self, self._root) for _ in range(self.header.num_items)]
+
+        self._raw__raw_data_items = []
+        for i in range(self.header.num_data):
+            end = self.header.data_size if i == (self.header.num_data - 1) else self.data_offsets[i + 1]
+            self._raw__raw_data_items.append(self._io.read_bytes(end - self.data_offsets[i]))
+
+        self.data_items = LazyDataItems(self, self._raw__raw_data_items, cache=self._cache_data_items)
+
+    def data(self, index: int) -> Optional[bytes]:
+        """Returns the inflated bytes of a data item, or None for an unset (-1) index."""
+        if isinstance(index, TwMapV4.Optional) or index == -1:
+            return None
+        return self.data_items.data(index)
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# Writes a synthetic datafile v4 map for the map benchmarks, see tests/twmap_fixture.py.
+#
+# Usage:
+#   python -m benchmarks.twmap_fixture [--out PATH] [--images N] [--image-size PX] [--sounds N] [--tiles WxH]
+#                                      [--special-layers tele,switch]
+
+import argparse
+import os
+
+from tests.twmap_fixture import build_map
+
+DEFAULT_OUT = "benchmarks/fixtures/synthetic.map"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    parser.add_argument("--images", type=int, default=20)
+    parser.add_argument("--image-size", type=int, default=512)
+    parser.add_argument("--sounds", type=int, default=4)
+    parser.add_argument("--tiles", default="500x300")
+    parser.add_argument("--special-layers", default="", help="comma separated, e.g. tele,switch")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.tiles.lower().split("x"))
+    special_layers = tuple(kind for kind in args.special_layers.split(",") if kind)
+    raw = build_map(
+        images=args.images, image_size=args.image_size, sounds=args.sounds, tiles=(width, height),
+        special_layers=special_layers,
+    )
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "wb") as f:
+        f.write(raw)
+    print(f"Wrote {len(raw) / 1024 / 1024:.1f} MiB to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
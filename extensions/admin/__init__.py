@@ -5,7 +5,6 @@ from discord.ui import Button
 
 from run import extensions
 from constants import Guilds
-from extensions.moderator.automod import session
 
 
 # noinspection PyUnresolvedReferences
@@ -56,15 +55,15 @@ class Admin(commands.Cog):
 
     @app_commands.guilds(discord.Object(Guilds.DDNET))
     @app_commands.default_permissions(administrator=True)
-    @app_commands.command(name="clear_cache", description="DEBUG COMMAND: Clears the bots sqlite cache.")
+    @app_commands.command(name="clear_cache", description="DEBUG COMMAND: Clears the bots HTTP cache.")
     async def clear_cache(self, interaction: discord.Interaction):
         """|coro|
-        Clears the SQLite cache used by the bot.
+        Clears the on-disk HTTP cache used by the bot.
         This command is intended for debugging purposes.
         """
 
-        session.cache.clear()
-        await interaction.response.send_message("Cleared sqlite cache.", ephemeral=True)
+        await self.bot.request_cache.clear()
+        await interaction.response.send_message("Cleared HTTP cache.", ephemeral=True)
 
     @app_commands.guild_only()
     @app_commands.default_permissions(administrator=True)
@@ -4,7 +4,13 @@ import sqlite3
 import discord
 from discord.ext import commands
 
+from extensions.map_testing.analysis_cache import analysis_cache
 from extensions.map_testing.checklist import ChecklistView
+from extensions.map_testing.render_pool import render_pool
+from extensions.map_testing.submission import tools
+from extensions.map_testing.version_store import map_versions
+from utils.master_parser import endpoint_summary
+from utils.singleflight import upstream
 
 
 class Debug(commands.Cog):
@@ -17,6 +23,44 @@ class Debug(commands.Cog):
     async def sessions(self, ctx: commands.Context):
         await ctx.send(self.sessions)
 
+    @commands.command()
+    async def flights(self, ctx: commands.Context):
+        """Shows how many upstream requests were coalesced or answered from cache."""
+        await ctx.send(f"```\n{upstream.summary()}\n```")
+
+    @commands.command()
+    async def masters(self, ctx: commands.Context):
+        """Shows latency and error stats of the master server endpoints, best first."""
+        await ctx.send(f"```\n{endpoint_summary()}\n```")
+
+    @commands.command()
+    async def pf_edits(self, ctx: commands.Context):
+        """Shows how many playerfinder message edits were sent, skipped or deferred."""
+        cog = self.bot.get_cog("PlayerFinder")
+        if cog is None:
+            await ctx.send("Playerfinder is not loaded.")
+            return
+        await ctx.send(
+            f"```\n{cog.edit_stats}\n"
+            f"pending={sorted(cog.pending_edits)} min_interval={cog.min_edit_interval}s\n```"
+        )
+
+    @commands.command()
+    async def map_cache(self, ctx: commands.Context):
+        """Shows size and hit rate of the map analysis cache."""
+        await ctx.send(f"```\n{analysis_cache.summary()}\n```")
+
+    @commands.command()
+    async def map_versions(self, ctx: commands.Context):
+        """Shows how many map versions are stored locally."""
+        await map_versions.versions(0)  # loads the index
+        await ctx.send(f"```\n{map_versions.summary()}\n```")
+
+    @commands.command()
+    async def map_tools(self, ctx: commands.Context):
+        """Shows queue depth and run times of the map tool processes."""
+        await ctx.send(f"```\n{tools.summary()}\n{render_pool.summary()}\n```")
+
     @commands.command()
     async def map_channels(self, ctx: commands.Context):
         print(self.bot.map_channels)
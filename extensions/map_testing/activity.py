@@ -0,0 +1,127 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+log = logging.getLogger("mt")
+
+
+def _timestamp(when: datetime) -> float:
+    return when.timestamp()
+
+
+def _datetime(ts: float) -> datetime:
+    return datetime.fromtimestamp(ts, tz=timezone.utc)
+
+
+class ActivityIndex:
+    """Last activity and latest release of every map channel, persisted to a JSON file.
+
+    Lets the auto archive decide which channels to archive without reading any channel history.
+    Updates are written after `save_delay` seconds, so a burst of messages causes a single write.
+
+    Args:
+        path: File the index is persisted to.
+        save_delay: Seconds between a change and writing it to disk.
+    """
+
+    def __init__(self, path: str = "data/map-testing/activity.json", save_delay: float = 60.0):
+        self.path = path
+        self.save_delay = save_delay
+        self.loaded_from_disk = False
+
+        self._last_activity: Dict[int, float] = {}
+        self._releases: Dict[int, float] = {}
+        self._save_task: Optional[asyncio.Task] = None
+
+    def __repr__(self):
+        return f"<ActivityIndex channels={len(self._last_activity)} releases={len(self._releases)}>"
+
+    def _read(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            log.error("Failed reading the map channel activity index, starting empty: %r", e)
+            return
+
+        self._last_activity = {int(k): v for k, v in raw.get("last_activity", {}).items()}
+        self._releases = {int(k): v for k, v in raw.get("releases", {}).items()}
+        self.loaded_from_disk = True
+
+    def _write(self, raw: dict):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(f"{self.path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(raw, f)
+        os.replace(f"{self.path}.tmp", self.path)
+
+    async def load(self):
+        """|coro|
+        Reads the persisted index. Entries added before loading are kept if they are newer.
+        """
+        last_activity, releases = self._last_activity, self._releases
+        await asyncio.get_running_loop().run_in_executor(None, self._read)
+        for channel_id, ts in last_activity.items():
+            self._last_activity[channel_id] = max(ts, self._last_activity.get(channel_id, 0.0))
+        for channel_id, ts in releases.items():
+            self._releases[channel_id] = max(ts, self._releases.get(channel_id, 0.0))
+
+    async def flush(self):
+        """|coro|
+        Writes the index to disk now.
+        """
+        if self._save_task is not None:
+            self._save_task.cancel()
+            self._save_task = None
+        await self._save()
+
+    async def _save(self):
+        raw = {
+            "last_activity": {str(k): v for k, v in self._last_activity.items()},
+            "releases": {str(k): v for k, v in self._releases.items()},
+        }
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._write, raw)
+        except OSError as e:
+            log.error("Failed writing the map channel activity index: %r", e)
+
+    async def _delayed_flush(self):
+        await asyncio.sleep(self.save_delay)
+        self._save_task = None
+        await self._save()
+
+    def _changed(self):
+        if self._save_task is None:
+            self._save_task = asyncio.create_task(self._delayed_flush())
+
+    def touch(self, channel_id: int, when: datetime):
+        """Records a message sent at `when` in a map channel."""
+        ts = _timestamp(when)
+        if ts > self._last_activity.get(channel_id, 0.0):
+            self._last_activity[channel_id] = ts
+            self._changed()
+
+    def add_release(self, channel_id: int, when: datetime):
+        """Records the release announcement of a map channel's map."""
+        ts = _timestamp(when)
+        if ts > self._releases.get(channel_id, 0.0):
+            self._releases[channel_id] = ts
+            self._changed()
+
+    def last_activity(self, channel_id: int) -> Optional[datetime]:
+        ts = self._last_activity.get(channel_id)
+        return _datetime(ts) if ts is not None else None
+
+    def released_since(self, channel_id: int, since: datetime) -> bool:
+        return self._releases.get(channel_id, 0.0) >= _timestamp(since)
+
+    def forget(self, channel_id: int):
+        """Drops everything known about a map channel, e.g. once it is deleted."""
+        removed = self._last_activity.pop(channel_id, None) is not None
+        removed |= self._releases.pop(channel_id, None) is not None
+        if removed:
+            self._changed()
@@ -0,0 +1,211 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from utils.singleflight import SingleFlight
+
+log = logging.getLogger("mt")
+
+
+def map_digest(data: bytes) -> str:
+    """Content address of a map: the hex SHA-256 of its bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class AnalysisCache:
+    """Disk-backed cache of per-map analysis results, keyed by the SHA-256 of the map.
+
+    Every map gets a directory holding one file per result (debug output, size visualization,
+    thumbnail, ...) plus a small metadata file. Entries are evicted least recently used first
+    once the total size exceeds `max_bytes`; a cache hit refreshes the entry's mtime, which is
+    what the order is rebuilt from after a restart.
+
+    Concurrent computations of the same result are coalesced, so identical re-uploads that arrive
+    at the same time only run the analysis once.
+
+    Args:
+        root: Directory of the cache.
+        max_bytes: Upper bound for the total size of all cached results.
+    """
+
+    META = "meta.json"
+
+    def __init__(self, root: str = "data/map-testing/cache", max_bytes: int = 512 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+        # (digest, name) -> size, least recently used first
+        self._index: Optional[OrderedDict[Tuple[str, str], int]] = None
+        self._total = 0
+
+    def __repr__(self):
+        entries = len(self._index) if self._index is not None else "?"
+        return f"<AnalysisCache root={self.root!r} entries={entries} size={self._total} hits={self.hits} misses={self.misses}>"
+
+    def _path(self, digest: str, name: str = "") -> str:
+        return os.path.join(self.root, digest[:2], digest, name)
+
+    # Disk backend. These run in the default executor.
+
+    def _load_index(self) -> OrderedDict:
+        if self._index is not None:
+            return self._index
+
+        entries = []
+        if os.path.isdir(self.root):
+            for dirpath, _, filenames in os.walk(self.root):
+                digest = os.path.basename(dirpath)
+                for filename in filenames:
+                    if filename.endswith(".tmp"):
+                        continue
+                    stat = os.stat(os.path.join(dirpath, filename))
+                    entries.append((stat.st_mtime, (digest, filename), stat.st_size))
+
+        self._index = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self._total = sum(self._index.values())
+        return self._index
+
+    def _read(self, digest: str, name: str) -> Optional[bytes]:
+        with self._lock:
+            index = self._load_index()
+            if (digest, name) not in index:
+                return None
+            path = self._path(digest, name)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                os.utime(path)
+            except FileNotFoundError:
+                self._total -= index.pop((digest, name))
+                return None
+            index.move_to_end((digest, name))
+            return data
+
+    def _write(self, digest: str, name: str, data: bytes):
+        with self._lock:
+            index = self._load_index()
+            os.makedirs(self._path(digest), exist_ok=True)
+            path = self._path(digest, name)
+            tmp = f"{path}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+
+            self._total += len(data) - index.pop((digest, name), 0)
+            index[(digest, name)] = len(data)
+            self._evict()
+
+    def _evict(self):
+        index = self._index
+        while self._total > self.max_bytes and index:
+            (digest, name), size = index.popitem(last=False)
+            self._total -= size
+            try:
+                os.remove(self._path(digest, name))
+            except FileNotFoundError:
+                pass
+            directory = self._path(digest)
+            if os.path.isdir(directory) and not os.listdir(directory):
+                os.rmdir(directory)
+
+    def _clear(self):
+        with self._lock:
+            shutil.rmtree(self.root, ignore_errors=True)
+            self._index = OrderedDict()
+            self._total = 0
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def get(self, digest: str, name: str) -> Optional[bytes]:
+        """|coro|
+        Returns a cached result, or None if there is none.
+        """
+        try:
+            data = await self._run(self._read, digest, name)
+        except OSError as e:
+            log.warning("Analysis cache read failed for %s/%s: %r", digest, name, e)
+            data = None
+
+        if name != self.META:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    async def put(self, digest: str, name: str, data: bytes):
+        """|coro|
+        Stores a result, evicting the least recently used results if the cache grew too large.
+        """
+        try:
+            await self._run(self._write, digest, name, data)
+        except OSError as e:
+            log.warning("Analysis cache write failed for %s/%s: %r", digest, name, e)
+
+    async def get_or_compute(self, digest: str, name: str, func: Callable[[], Awaitable[Optional[bytes]]]) -> Optional[bytes]:
+        """|coro|
+        Returns the cached result, or runs `func` and caches what it returns.
+
+        Args:
+            digest: The map's SHA-256, see :func:`map_digest`.
+            name: Name of the result, e.g. "debug.txt".
+            func: Coroutine function computing the result. Returning None skips caching,
+                e.g. when the analysis failed.
+        """
+        if (data := await self.get(digest, name)) is not None:
+            return data
+
+        async def compute():
+            result = await func()
+            if result is not None:
+                await self.put(digest, name, result)
+            return result
+
+        return await self._flight.do((digest, name), compute, label=name)
+
+    async def get_meta(self, digest: str) -> Dict[str, Any]:
+        """|coro|
+        Returns the metadata stored for a map, or an empty dict.
+        """
+        data = await self.get(digest, self.META)
+        return json.loads(data) if data else {}
+
+    async def update_meta(self, digest: str, **meta):
+        """|coro|
+        Merges `meta` into the metadata stored for a map.
+        """
+        current = await self.get_meta(digest)
+        if current.items() >= meta.items():
+            return
+        current.update(meta)
+        current.setdefault("first_seen", time.time())
+        await self.put(digest, self.META, json.dumps(current).encode())
+
+    async def clear(self):
+        """|coro|
+        Drops every cached result.
+        """
+        await self._run(self._clear)
+
+    def summary(self) -> str:
+        entries = len(self._index) if self._index is not None else 0
+        return (
+            f"entries={entries} size={self._total / 1024 / 1024:.1f}/{self.max_bytes / 1024 / 1024:.0f} MiB "
+            f"hits={self.hits} misses={self.misses}"
+        )
+
+
+# Shared by every submission.
+analysis_cache = AnalysisCache()
@@ -0,0 +1,221 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+
+from utils.conn import UploadError, ddnet_upload
+
+log = logging.getLogger("mt")
+
+# Archivals of different testlogs (auto archive and the Archive button) share the upload ledger.
+_ledger_lock = asyncio.Lock()
+
+
+class RetryableError(Exception):
+    pass
+
+
+@dataclass(slots=True)
+class ArchiveStats:
+    """
+    Counters of one archival run.
+
+    Attributes:
+        assets: Assets referenced by the testlog.
+        fetched: Assets downloaded from Discord.
+        cached: Assets read from the local archive instead.
+        uploaded: Assets uploaded to ddnet.org.
+        skipped: Uploads skipped because ddnet.org already has the same content.
+        failed: Assets that could not be archived.
+    """
+    assets: int = 0
+    fetched: int = 0
+    cached: int = 0
+    uploaded: int = 0
+    skipped: int = 0
+    failed: int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"assets={self.assets} fetched={self.fetched} cached={self.cached} "
+            f"uploaded={self.uploaded} skipped={self.skipped} failed={self.failed}"
+        )
+
+
+class AssetArchiver:
+    """Downloads testlog assets and uploads them to ddnet.org, concurrently and with retries.
+
+    Every URL is fetched once, even if several assets point to it. Assets are immutable on Discord
+    (their filenames contain an ID or hash), so one that is already in the local archive isn't
+    downloaded again. A ledger of uploaded content hashes skips uploads ddnet.org already has,
+    e.g. avatars of testers that appear in every testlog, or a retried archival.
+
+    Args:
+        session: Session used for downloads and uploads.
+        root: Directory of the testlog archive.
+        concurrency: Maximum number of simultaneous downloads and uploads.
+        attempts: Tries per download or upload.
+        backoff: Seconds to wait before the first retry, doubled for every further one.
+    """
+
+    LEDGER = "uploaded.json"
+
+    def __init__(
+            self, session: aiohttp.ClientSession, root: str, *, concurrency: int = 8, attempts: int = 3,
+            backoff: float = 1.0
+    ):
+        self.session = session
+        self.root = root
+        self.attempts = attempts
+        self.backoff = backoff
+        self.stats = ArchiveStats()
+
+        self._limit = asyncio.Semaphore(concurrency)
+        self._ledger: Dict[str, str] = {}
+        self._uploaded: Dict[str, str] = {}
+
+    def _path(self, asset_type: str, filename: str) -> str:
+        return os.path.join(self.root, "assets", f"{asset_type}s", filename)
+
+    # File system helpers, these run in the default executor.
+
+    def _read_ledger(self) -> Dict[str, str]:
+        try:
+            with open(os.path.join(self.root, self.LEDGER), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            log.warning("Failed reading the asset upload ledger: %r", e)
+            return {}
+
+    def _write_ledger(self, ledger: Dict[str, str]):
+        path = os.path.join(self.root, self.LEDGER)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(ledger, f)
+        os.replace(f"{path}.tmp", path)
+
+    def _read_local(self, paths: List[str]) -> Optional[bytes]:
+        for path in paths:
+            try:
+                with open(path, "rb") as f:
+                    return f.read()
+            except FileNotFoundError:
+                continue
+        return None
+
+    def _write_local(self, paths: List[str], data: bytes):
+        for path in paths:
+            if os.path.exists(path):
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+
+    async def _save_ledger(self):
+        # Another archival may have written the ledger since it was read, only add this run's uploads.
+        if not self._uploaded:
+            return
+        async with _ledger_lock:
+            try:
+                ledger = await self._run(self._read_ledger)
+                ledger.update(self._uploaded)
+                await self._run(self._write_ledger, ledger)
+            except OSError as e:
+                log.warning("Failed writing the asset upload ledger: %r", e)
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def _retry(self, what: str, func, *args):
+        for attempt in range(1, self.attempts + 1):
+            try:
+                return await func(*args)
+            except (RetryableError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.attempts:
+                    raise
+                delay = self.backoff * 2 ** (attempt - 1)
+                log.warning("%s failed (attempt %d/%d), retrying in %.1fs: %r", what, attempt, self.attempts, delay, e)
+                await asyncio.sleep(delay)
+
+    async def _fetch(self, url: str) -> bytes:
+        async with self.session.get(url) as resp:
+            if resp.status == 200:
+                return await resp.read()
+            text = await resp.text()
+            if resp.status == 429 or resp.status >= 500:
+                raise RetryableError(f"status {resp.status}: {text}")
+            raise RuntimeError(f"status {resp.status}: {text}")
+
+    async def _upload(self, asset_type: str, filename: str, data: bytes):
+        try:
+            await ddnet_upload(self.session, asset_type, BytesIO(data), filename)
+        except UploadError as e:
+            if e.status == 429 or e.status >= 500:
+                raise RetryableError(f"status {e.status}: {e}") from e
+            raise
+
+    async def _archive_url(self, url: str, targets: List[Tuple[str, str]]) -> bool:
+        paths = [self._path(asset_type, filename) for asset_type, filename in targets]
+
+        async with self._limit:
+            data = await self._run(self._read_local, paths)
+            if data is not None:
+                self.stats.cached += len(targets)
+            else:
+                try:
+                    data = await self._retry(f"Fetching {url}", self._fetch, url)
+                except Exception as e:
+                    log.error("Failed fetching asset %r: %s", targets[0][1], e)
+                    self.stats.failed += len(targets)
+                    return False
+                self.stats.fetched += len(targets)
+            await self._run(self._write_local, paths, data)
+
+        digest = hashlib.sha256(data).hexdigest()
+        ok = True
+        for asset_type, filename in targets:
+            key = f"{asset_type}/{filename}"
+            if self._ledger.get(key) == digest:
+                self.stats.skipped += 1
+                continue
+
+            async with self._limit:
+                try:
+                    await self._retry(f"Uploading {key}", self._upload, asset_type, filename, data)
+                except Exception as e:
+                    log.error("Failed uploading asset %r: %s", key, e)
+                    self.stats.failed += 1
+                    ok = False
+                    continue
+            self._ledger[key] = self._uploaded[key] = digest
+            self.stats.uploaded += 1
+        return ok
+
+    async def archive(self, assets: Dict[str, Dict[str, str]]) -> bool:
+        """|coro|
+        Archives the assets of a testlog, see :attr:`TestLog.assets`.
+
+        Returns:
+            True if every asset was archived.
+        """
+        by_url: Dict[str, List[Tuple[str, str]]] = {}
+        for asset_type, files in assets.items():
+            for filename, url in files.items():
+                by_url.setdefault(url, []).append((asset_type, filename))
+                self.stats.assets += 1
+
+        async with _ledger_lock:
+            self._ledger = await self._run(self._read_ledger)
+        try:
+            results = await asyncio.gather(*(self._archive_url(url, targets) for url, targets in by_url.items()))
+        finally:
+            await self._save_ledger()
+
+        return all(results)
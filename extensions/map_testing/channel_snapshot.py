@@ -0,0 +1,68 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Dict, Iterable, Optional
+
+log = logging.getLogger("mt")
+
+
+class ChannelSnapshot:
+    """State of every map channel as of the last save, persisted to a JSON file.
+
+    Rebuilding a map channel normally takes several requests: its archived threads, the thread
+    history to find the changelog message, the changelog from the DB and every voter. The
+    snapshot remembers the results (thread, changelog message and voter IDs) together with the
+    channel topic they were read from, so after a restart a channel whose topic is unchanged can
+    be rebuilt from the cache alone and reconciled in the background.
+
+    Args:
+        path: File the snapshot is persisted to.
+    """
+
+    def __init__(self, path: str = "data/map-testing/channels.json"):
+        self.path = path
+        self._entries: Dict[int, dict] = {}
+
+    def __repr__(self):
+        return f"<ChannelSnapshot channels={len(self._entries)}>"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _read(self) -> Dict[int, dict]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            log.error("Failed reading the map channel snapshot, loading every channel from Discord: %r", e)
+            return {}
+        return {int(k): v for k, v in raw.items()}
+
+    def _write(self, raw: dict):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(f"{self.path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(raw, f)
+        os.replace(f"{self.path}.tmp", self.path)
+
+    async def load(self):
+        """|coro|
+        Reads the persisted snapshot.
+        """
+        self._entries = await asyncio.get_running_loop().run_in_executor(None, self._read)
+
+    def get(self, channel_id: int) -> Optional[dict]:
+        return self._entries.get(channel_id)
+
+    async def save(self, map_channels: Iterable):
+        """|coro|
+        Replaces the snapshot with the current state of `map_channels`, see :meth:`MapChannel.snapshot`.
+        """
+        self._entries = {map_channel.id: map_channel.snapshot() for map_channel in map_channels}
+        raw = {str(k): v for k, v in self._entries.items()}
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._write, raw)
+        except OSError as e:
+            log.error("Failed writing the map channel snapshot: %r", e)
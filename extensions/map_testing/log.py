@@ -1,6 +1,9 @@
+import asyncio
+import contextlib
 import json
+import os
 import re
-from typing import Dict, List
+from typing import AsyncIterator, Dict, List
 
 import discord
 
@@ -15,6 +18,31 @@ def format_size(size):
         size /= 1024.0
 
 
+URL_RE = re.compile(r"<((?:https?|steam):\/\/(?:-\.)?(?:[^\s\/?\.#-]+\.?)+(?:\/[^\s]*)?)>")
+
+# Applied in this order, every match is replaced by the output of the named handler.
+TEXT_PATTERNS = (
+    (re.compile(r"\`\`\`(?:[^\`]*?\n)?([^\`]+)\n?\`\`\`"), "_handle_multiline_codeblock"),
+    (re.compile(r"(?:\`|\`\`)([^\`]+)(?:\`|\`\`)"), "_handle_inline_codeblock"),
+    (re.compile(r"<(a)?:(.*):(\d*)>"), "_handle_custom_emoji"),
+    (re.compile(r"<@!?(\d+)>"), "_handle_user_mention"),
+    (re.compile(r"<#(\d+)>"), "_handle_channel_mention"),
+    (re.compile(r"<@&(\d+)>"), "_handle_role_mention"),
+)
+
+
+def _write_text(path: str, text: str, append: bool):
+    if not append:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a" if append else "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def _remove(path: str):
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+
 class TestLogError(Exception):
     pass
 
@@ -23,14 +51,20 @@ class TestLog:
     __slots__ = (
         "map_channel",
         "guild",
-        "_messages",
         "_avatars",
         "_attachments",
         "_emojis",
+        "_users",
+        "_channels",
+        "_emoji_checks",
+        "_authors",
     )
 
     VERSION = 1.0
 
+    # Characters of serialized messages collected before writing them out
+    FLUSH_SIZE = 64 * 1024
+
     DIR = "data/map-testing/testlogs"
 
     bot = None
@@ -40,11 +74,16 @@ class TestLog:
         self.map_channel = map_channel
         self.guild = map_channel.guild
 
-        self._messages = []
         self._avatars = {}
         self._attachments = {}
         self._emojis = {}
 
+        # Resolved once per log: id -> user/channel (None if deleted), emoji ID -> still exists
+        self._users = {}
+        self._channels = {}
+        self._emoji_checks = {}
+        self._authors = {}
+
     @property
     def name(self) -> str:
         return self.map_channel.filename
@@ -54,13 +93,8 @@ class TestLog:
         return self.map_channel.details.replace("**", "")  # strip markdown bolding
 
     @property
-    def content(self) -> Dict:
-        return {
-            "protocol": {"version": self.VERSION},
-            "name": self.name,
-            "topic": self.topic,
-            "messages": self._messages,
-        }
+    def path(self) -> str:
+        return f"{self.DIR}/json/{self.name}.json"
 
     @property
     def assets(self) -> Dict:
@@ -70,9 +104,6 @@ class TestLog:
             "emoji": self._emojis,
         }
 
-    def json(self) -> str:
-        return json.dumps(self.content)
-
     def _handle_multiline_codeblock(self, text: str) -> Dict:
         return {"multiline-codeblock": {"text": text}}
 
@@ -88,9 +119,11 @@ class TestLog:
         )
 
         emoji_url = str(emoji.url)
-        async with self.session.get(emoji_url) as resp:
-            if resp.status != 200:
-                raise TestLogError(":deleted-emoji:")
+        if emoji.id not in self._emoji_checks:
+            async with self.session.get(emoji_url) as resp:
+                self._emoji_checks[emoji.id] = resp.status == 200
+        if not self._emoji_checks[emoji.id]:
+            raise TestLogError(":deleted-emoji:")
 
         self._emojis[f"{emoji.id}.png"] = emoji_url
 
@@ -98,23 +131,35 @@ class TestLog:
 
     async def _handle_user_mention(self, user_id: str) -> Dict:
         user_id = int(user_id)
-        user = self.guild.get_member(user_id) or self.bot.get_user(user_id)
+        if user_id not in self._users:
+            user = self.guild.get_member(user_id) or self.bot.get_user(user_id)
+            if user is None:
+                try:
+                    user = await self.bot.fetch_user(user_id)
+                except discord.NotFound:
+                    user = None
+            self._users[user_id] = user
+
+        user = self._users[user_id]
         if user is None:
-            try:
-                user = await self.bot.fetch_user(user_id)
-            except discord.NotFound:
-                raise TestLogError("@Deleted User")
+            raise TestLogError("@Deleted User")
 
         return {"user-mention": self._handle_user(user)}
 
     async def _handle_channel_mention(self, channel_id: str) -> Dict:
         channel_id = int(channel_id)
-        channel = self.bot.get_channel(channel_id)
+        if channel_id not in self._channels:
+            channel = self.bot.get_channel(channel_id)
+            if channel is None:
+                try:
+                    channel = await self.bot.fetch_channel(channel_id)
+                except discord.NotFound:
+                    channel = None
+            self._channels[channel_id] = channel
+
+        channel = self._channels[channel_id]
         if channel is None:
-            try:
-                channel = await self.bot.fetch_channel(channel_id)
-            except discord.NotFound:
-                raise TestLogError("#deleted-channel")
+            raise TestLogError("#deleted-channel")
 
         return {
             "channel-mention": {
@@ -148,27 +193,22 @@ class TestLog:
         }
 
     async def _handle_text(self, text: str) -> Dict:
-        url_re = r"<((?:https?|steam):\/\/(?:-\.)?(?:[^\s\/?\.#-]+\.?)+(?:\/[^\s]*)?)>"
+        # every pattern needs a backtick or an angle bracket
+        if "`" not in text and "<" not in text:
+            return {"text": [{"text": text}]}
+
         out = [
-            {"text": re.sub(url_re, r"\1", text)}
+            {"text": URL_RE.sub(r"\1", text)}
         ]  # TODO: handle urls after codeblocks
 
-        regexes = {
-            r"\`\`\`(?:[^\`]*?\n)?([^\`]+)\n?\`\`\`": self._handle_multiline_codeblock,
-            r"(?:\`|\`\`)([^\`]+)(?:\`|\`\`)": self._handle_inline_codeblock,
-            r"<(a)?:(.*):(\d*)>": self._handle_custom_emoji,
-            r"<@!?(\d+)>": self._handle_user_mention,
-            r"<#(\d+)>": self._handle_channel_mention,
-            r"<@&(\d+)>": self._handle_role_mention,
-        }
-
-        for regex, handler in regexes.items():
+        for regex, handler_name in TEXT_PATTERNS:
+            handler = getattr(self, handler_name)
             for i, chunk in enumerate(out):
                 text = chunk.get("text", None)
                 if text is None:
                     continue
 
-                match = re.search(regex, text)
+                match = regex.search(text)
                 if match is None:
                     continue
 
@@ -235,7 +275,19 @@ class TestLog:
 
         return {"reactions": out}
 
-    async def _process(self):
+    def _header(self) -> str:
+        # Same layout as json.dumps of the whole document, with the messages streamed in between.
+        return (
+            f'{{"protocol": {json.dumps({"version": self.VERSION})}, "name": {json.dumps(self.name)}, '
+            f'"topic": {json.dumps(self.topic)}, "messages": ['
+        )
+
+    async def _chunks(self) -> AsyncIterator[str]:
+        # Serializes the log as the history is read, in chunks of about FLUSH_SIZE characters.
+        buffer = [self._header()]
+        buffered = 0
+        first = True
+
         async for message in self.map_channel.history(limit=None, oldest_first=True):
             # video media doesn't seem to work on ddnet.org/testlogs so no reason to include them at the moment
             if any(
@@ -244,24 +296,52 @@ class TestLog:
             ):
                 continue
 
+            if message.author.id not in self._authors:
+                self._authors[message.author.id] = self._handle_user(message.author)
+
             content_handlers = (
                 (self._handle_text, message.content),
                 (self._handle_attachments, message.attachments),
                 (self._handle_reactions, message.reactions),
             )
-            self._messages.append(
-                {
-                    "author": self._handle_user(message.author),
-                    "timestamp": message.created_at.isoformat(),
-                    "content": [
-                        await maybe_coroutine(h, a) for h, a in content_handlers if a
-                    ],
-                }
-            )
+            entry = {
+                "author": self._authors[message.author.id],
+                "timestamp": message.created_at.isoformat(),
+                "content": [
+                    await maybe_coroutine(h, a) for h, a in content_handlers if a
+                ],
+            }
+
+            chunk = json.dumps(entry) if first else ", " + json.dumps(entry)
+            first = False
+            buffer.append(chunk)
+            buffered += len(chunk)
+            if buffered >= self.FLUSH_SIZE:
+                yield "".join(buffer)
+                buffer.clear()
+                buffered = 0
+
+        buffer.append("]}")
+        yield "".join(buffer)
 
     @classmethod
     async def from_map_channel(cls, map_channel: MapChannel):
+        """Processes the channel history and writes the log to :attr:`path` while doing so.
+
+        Only the assets referenced by the log are kept in memory, not the messages.
+        """
         self = cls(map_channel)
-        await self._process()
+        loop = asyncio.get_running_loop()
+
+        tmp = f"{self.path}.tmp"
+        try:
+            append = False
+            async for chunk in self._chunks():
+                await loop.run_in_executor(None, _write_text, tmp, chunk, append)
+                append = True
+            await loop.run_in_executor(None, os.replace, tmp, self.path)
+        except BaseException:
+            await loop.run_in_executor(None, _remove, tmp)
+            raise
 
         return self
@@ -3,7 +3,7 @@ import discord
 import logging
 import json
 import re
-from typing import List, Optional
+from typing import Awaitable, List, Optional
 
 from extensions.map_testing.map_states import MapState
 from extensions.map_testing.submission import InitialSubmission
@@ -85,6 +85,55 @@ class MapChannel:
         instance.votes = votes
         return instance
 
+    @classmethod
+    def from_snapshot(cls, bot, channel: discord.TextChannel, entry: dict) -> Optional["MapChannel"]:
+        """Rebuilds a map channel from its :meth:`snapshot` without sending any requests.
+
+        The changelog entries aren't loaded, see :meth:`reconcile`.
+
+        Returns:
+            None if the snapshot is outdated or refers to something that isn't cached anymore, the
+            channel has to be loaded with :meth:`create` instead.
+        """
+        if entry.get("topic") != channel.topic or entry.get("changelog_id") is None:
+            return None
+
+        thread_id = entry.get("thread_id")
+        thread = channel.guild.get_thread(thread_id) if thread_id is not None else None
+        if thread is None or thread.archived:
+            return None
+
+        guild = bot.get_guild(Guilds.DDNET)
+        votes = [guild.get_member(user_id) or bot.get_user(user_id) for user_id in entry.get("votes", [])]
+        if None in votes:
+            return None
+
+        instance = cls(bot, channel, thread)
+        if str(instance.state) != entry.get("state"):
+            return None
+
+        instance.votes = votes
+        instance.changelog = thread.get_partial_message(entry["changelog_id"])
+        instance.changelog_paginator = ChangelogPaginator(bot, channel=channel, changelog=instance.changelog)
+        bot.add_view(view=instance.changelog_paginator, message_id=instance.changelog.id)
+        return instance
+
+    def snapshot(self) -> dict:
+        """Returns what :meth:`from_snapshot` needs to rebuild this map channel."""
+        return {
+            "topic": self._channel.topic,
+            "state": str(self.state),
+            "thread_id": self.thread.id if self.thread is not None else None,
+            "changelog_id": self.changelog.id if self.changelog is not None else None,
+            "votes": [user.id for user in self.votes if user is not None],
+        }
+
+    async def reconcile(self):
+        """|coro|
+        Loads the changelog entries of a map channel rebuilt by :meth:`from_snapshot`.
+        """
+        await self.changelog_paginator.get_data()
+
     def __repr__(self):
         return json.dumps(
             {
@@ -239,7 +288,10 @@ class MapChannel:
         await self.edit(**options)
 
     @classmethod
-    async def from_submission(cls, isubm: InitialSubmission, init_state: MapState, **options):
+    async def create_for_submission(cls, isubm: InitialSubmission, init_state: MapState, **options) -> "MapChannel":
+        """|coro|
+        Creates the channel of a new map submission, without any messages yet, see :meth:`setup_submission`.
+        """
         self = cls.__new__(cls)
         self.name = isubm.name
         self.mappers = isubm.mappers
@@ -257,10 +309,27 @@ class MapChannel:
             self._channel = await category.create_text_channel(
                 str(self), topic=self.topic, **options
             )
+        return self
+
+    async def setup_submission(
+            self,
+            isubm: InitialSubmission,
+            *,
+            thumbnail: Optional[Awaitable[discord.File]] = None,
+    ) -> discord.Message:
+        """|coro|
+        Posts the initial messages of a new map submission and creates the tester thread.
 
+        Args:
+            isubm: The submission the channel was created for.
+            thumbnail: The thumbnail, if it is already being rendered.
+
+        Returns:
+            The message the map file is attached to.
+        """
         # Initial channel setup message
         try:
-            thumbnail = await isubm.generate_thumbnail()
+            thumbnail = await (thumbnail if thumbnail is not None else isubm.generate_thumbnail())
         except Exception as e:
             thumbnail = None
             logging.error(f"Failed to generate thumbnail for {self}: {e}")
@@ -314,4 +383,4 @@ class MapChannel:
             allowed_mentions=discord.AllowedMentions(users=False),
         )
 
-        return self, message  # Return the instance instead of a submission
+        return message
@@ -0,0 +1,359 @@
+"""Structural diff of two versions of a map.
+
+Built on :mod:`extensions.map_testing.map_index`: every data item is identified by a hash of its
+compressed blob and every item by a hash of its fields, with references to data items, images and
+sounds replaced by what they point to. Data indices shift whenever something is added or removed,
+so comparing raw fields would report nearly everything as changed.
+
+Only blobs whose hashes differ are ever inflated, to count changed tiles or to compare settings.
+"""
+
+import hashlib
+import struct
+import zlib
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from extensions.map_testing.map_index import (
+    ITEM_ENV_POINTS,
+    ITEM_ENVELOPE,
+    ITEM_GROUP,
+    ITEM_IMAGE,
+    ITEM_INFO,
+    ITEM_LAYER,
+    ITEM_SOUND,
+    ItemInfo,
+    MapIndex,
+    read_map_index,
+)
+from extensions.map_testing.tilemap import (
+    SPEEDUP_TILE,
+    SWITCH_TILE,
+    TELE_TILE,
+    TILE,
+    TUNE_TILE,
+    TilemapFlags,
+    decode_i32x3,
+)
+
+LAYER_TILEMAP = 2
+LAYER_QUADS = 3
+LAYER_SOUNDS = 10
+
+# Fields holding data item indices, per item type (and layer type).
+INFO_DATA_FIELDS = (1, 2, 3, 4, 5)  # author, map version, credits, license, settings
+IMAGE_DATA_FIELDS = (4, 5)  # name, pixels
+SOUND_DATA_FIELDS = (2, 3)  # name, sound data
+TILEMAP_DATA_FIELDS = (14, 18, 19, 20, 21, 22)  # tiles, tele, speedup, front, switch, tune
+TILE_SIZES = dict(zip(TILEMAP_DATA_FIELDS, (dtype.itemsize for dtype in (
+    TILE, TELE_TILE, SPEEDUP_TILE, TILE, SWITCH_TILE, TUNE_TILE
+))))
+QUADS_DATA_FIELDS = (5,)
+SOUNDS_DATA_FIELDS = (5,)
+
+KIND_ORDER = ("settings", "info", "image", "sound", "envelope", "group", "layer")
+
+
+@dataclass(slots=True)
+class Change:
+    """
+    One added, removed or changed part of a map.
+
+    Attributes:
+        kind: What changed, one of KIND_ORDER.
+        name: Name of the image, sound, layer, ... or the setting itself.
+        status: "added", "removed" or "changed".
+        detail: Short human readable description, may be empty.
+    """
+    kind: str
+    name: str
+    status: str
+    detail: str = ""
+
+    def __str__(self) -> str:
+        sign = {"added": "+", "removed": "-"}.get(self.status, "~")
+        detail = f" ({self.detail})" if self.detail else ""
+        return f"{sign} {self.kind} {self.name}{detail}"
+
+
+@dataclass(slots=True)
+class MapDiff:
+    """
+    Differences between two versions of a map.
+
+    Attributes:
+        old_size: Size of the old map in bytes.
+        new_size: Size of the new map in bytes.
+        changes: Every change, ordered by kind.
+    """
+    old_size: int
+    new_size: int
+    changes: List[Change] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.changes)
+
+    def __str__(self) -> str:
+        return "\n".join(str(change) for change in self.changes)
+
+    def summary(self) -> str:
+        delta = self.new_size - self.old_size
+        header = f"Size: {self.old_size / 1024:.1f} KiB -> {self.new_size / 1024:.1f} KiB ({delta / 1024:+.1f} KiB)"
+        if not self.changes:
+            return f"{header}\nNo structural changes."
+        counts = Counter(change.status for change in self.changes)
+        totals = ", ".join(f"{counts[status]} {status}" for status in ("added", "removed", "changed") if counts[status])
+        return f"{header}\n{totals}\n\n{self}"
+
+
+class _Fingerprints:
+    """Hashes of the data items of one map and of its items, with references resolved."""
+
+    def __init__(self, index: MapIndex):
+        self.index = index
+        self._blobs: Dict[int, bytes] = {}
+        self.image_names = [index.string(item.get(4)) or f"#{i}" for i, item in enumerate(index.items_of(ITEM_IMAGE))]
+        self.sound_names = [index.string(item.get(2)) or f"#{i}" for i, item in enumerate(index.items_of(ITEM_SOUND))]
+
+    def blob(self, data_index: Optional[int]) -> bytes:
+        if data_index is None or not 0 <= data_index < len(self.index.data):
+            return b""
+        if data_index not in self._blobs:
+            # SHA-256 is hardware accelerated on most CPUs and the fastest choice for large blobs.
+            self._blobs[data_index] = hashlib.sha256(self.index.compressed(data_index)).digest()[:16]
+        return self._blobs[data_index]
+
+    def item(self, item: ItemInfo, data_fields: Iterable[int] = (), refs: Dict[int, List[str]] = None) -> bytes:
+        """Hashes an item. `data_fields` point at data items, `refs` maps fields to the names they index."""
+        fields = list(item.fields)
+        h = hashlib.blake2b(digest_size=16)
+        for i in data_fields:
+            if i < len(fields):
+                h.update(self.blob(fields[i]))
+                fields[i] = 0
+        for i, names in (refs or {}).items():
+            if i < len(fields):
+                h.update(_name_at(names, fields[i]).encode())
+                fields[i] = 0
+        h.update(struct.pack(f"<{len(fields)}i", *fields))
+        return h.digest()
+
+
+def _name_at(names: List[str], index: int) -> str:
+    return names[index] if 0 <= index < len(names) else ""
+
+
+def _unique_keys(names: Iterable[str]) -> List[str]:
+    """Disambiguates duplicate names by their occurrence, e.g. "Game", "Game #2"."""
+    seen = Counter()
+    keys = []
+    for name in names:
+        seen[name] += 1
+        keys.append(name if seen[name] == 1 else f"{name} #{seen[name]}")
+    return keys
+
+
+def _compare(kind: str, old: Dict[str, bytes], new: Dict[str, bytes]) -> List[Change]:
+    changes = [Change(kind, key, "removed") for key in old if key not in new]
+    changes += [Change(kind, key, "added") for key in new if key not in old]
+    changes += [Change(kind, key, "changed") for key in new if key in old and old[key] != new[key]]
+    return changes
+
+
+def _settings(index: MapIndex) -> List[str]:
+    info = next(iter(index.items_of(ITEM_INFO)), None)
+    settings = info.get(5) if info else None
+    if settings is None or not 0 <= settings < len(index.data):
+        return []
+    return [s.decode("utf-8", errors="replace") for s in index.inflate(settings).split(b"\0") if s]
+
+
+def _diff_info(old: _Fingerprints, new: _Fingerprints) -> List[Change]:
+    old_info = next(iter(old.index.items_of(ITEM_INFO)), None)
+    new_info = next(iter(new.index.items_of(ITEM_INFO)), None)
+    changes = []
+
+    # author, map version, credits, license: compare the blobs, inflate only the changed ones
+    for i, name in zip(INFO_DATA_FIELDS[:4], ("author", "map version", "credits", "license")):
+        old_ref = old_info.get(i) if old_info else None
+        new_ref = new_info.get(i) if new_info else None
+        if old.blob(old_ref) != new.blob(new_ref):
+            changes.append(Change("info", name, "changed", repr(new.index.string(new_ref) or "")))
+
+    settings_ref = (old_info.get(5) if old_info else None, new_info.get(5) if new_info else None)
+    if old.blob(settings_ref[0]) != new.blob(settings_ref[1]):
+        old_settings, new_settings = Counter(_settings(old.index)), Counter(_settings(new.index))
+        changes += [Change("settings", s, "removed") for s in (old_settings - new_settings).elements()]
+        changes += [Change("settings", s, "added") for s in (new_settings - old_settings).elements()]
+    return changes
+
+
+def _resources(fp: _Fingerprints, type_id: int, names: List[str], data_fields: Tuple[int, ...]) -> Dict[str, bytes]:
+    items = fp.index.items_of(type_id)
+    return dict(zip(_unique_keys(names), (fp.item(item, data_fields) for item in items)))
+
+
+def _envelopes(fp: _Fingerprints) -> Dict[str, bytes]:
+    items = fp.index.items_of(ITEM_ENVELOPE)
+    points = fp.index.items_of(ITEM_ENV_POINTS)
+    point_fields = points[0].fields if points else ()
+    # The points of every envelope live in one shared item, 6 ints each (22 with bezier curves).
+    total_points = sum(item.get(3, 0) for item in items)
+    point_size = len(point_fields) // total_points if total_points else 6
+
+    names = []
+    hashes = []
+    for i, item in enumerate(items):
+        names.append(decode_i32x3(item.fields[4:12]) if len(item.fields) >= 12 else f"#{i}")
+        # version, channels, start point, number of points
+        start, count = item.get(2, 0), item.get(3, 0)
+        own_points = point_fields[start * point_size:(start + count) * point_size]
+        h = hashlib.blake2b(fp.item(item), digest_size=16)
+        h.update(struct.pack(f"<{len(own_points)}i", *own_points))
+        hashes.append(h.digest())
+    return dict(zip(_unique_keys(names), hashes))
+
+
+def _groups(fp: _Fingerprints) -> Tuple[Dict[str, bytes], List[str]]:
+    """Returns the group hashes and, for every layer, the name of its group."""
+    groups = {}
+    layer_groups = []
+    items = fp.index.items_of(ITEM_GROUP)
+    names = [decode_i32x3(item.fields[12:15]) if len(item.fields) >= 15 else f"#{i}" for i, item in enumerate(items)]
+    for key, item in zip(_unique_keys(names), items):
+        # start layer and layer count change whenever layers are added elsewhere, they are
+        # covered by the layer keys instead
+        fields = list(item.fields)
+        fields[5:7] = [0, 0]
+        groups[key] = hashlib.blake2b(struct.pack(f"<{len(fields)}i", *fields), digest_size=16).digest()
+        layer_groups += [key] * item.get(6, 0)
+    return groups, layer_groups
+
+
+def _layer_name(item: ItemInfo) -> Tuple[str, str]:
+    """Returns the kind and name of a layer item."""
+    layer_type = item.get(1)
+    if layer_type == LAYER_TILEMAP:
+        flags = TilemapFlags(item.get(6, 0))
+        kind = next((f.name.lower() for f in (TilemapFlags.GAME, TilemapFlags.TELE, TilemapFlags.SPEEDUP,
+                                               TilemapFlags.FRONT, TilemapFlags.SWITCH, TilemapFlags.TUNE)
+                     if f in flags), "tiles")
+        name = decode_i32x3(item.fields[15:18]) if len(item.fields) >= 18 else ""
+    elif layer_type in (LAYER_QUADS, LAYER_SOUNDS):
+        kind = "quads" if layer_type == LAYER_QUADS else "sounds"
+        name = decode_i32x3(item.fields[7:10]) if len(item.fields) >= 10 else ""
+    else:
+        kind, name = f"type {layer_type}", ""
+    return kind, name
+
+
+def _layers(fp: _Fingerprints, layer_groups: List[str]) -> Dict[str, Tuple[bytes, ItemInfo]]:
+    keys = []
+    values = []
+    for i, item in enumerate(fp.index.items_of(ITEM_LAYER)):
+        kind, name = _layer_name(item)
+        group = layer_groups[i] if i < len(layer_groups) else "?"
+        keys.append(f"{group}/{name or kind} [{kind}]")
+
+        layer_type = item.get(1)
+        if layer_type == LAYER_TILEMAP:
+            digest = fp.item(item, TILEMAP_DATA_FIELDS, {13: fp.image_names})
+        elif layer_type == LAYER_QUADS:
+            digest = fp.item(item, QUADS_DATA_FIELDS, {6: fp.image_names})
+        elif layer_type == LAYER_SOUNDS:
+            digest = fp.item(item, SOUNDS_DATA_FIELDS, {6: fp.sound_names})
+        else:
+            digest = fp.item(item)
+        values.append((digest, item))
+    return dict(zip(_unique_keys(keys), values))
+
+
+def _tile_detail(old: MapIndex, new: MapIndex, old_item: ItemInfo, new_item: ItemInfo) -> str:
+    if old_item.get(1) != LAYER_TILEMAP or new_item.get(1) != LAYER_TILEMAP:
+        return ""
+    old_shape = (old_item.get(5), old_item.get(4))
+    new_shape = (new_item.get(5), new_item.get(4))
+    if old_shape != new_shape:
+        return f"resized {old_shape[1]}x{old_shape[0]} -> {new_shape[1]}x{new_shape[0]}"
+    if old_item.get(3) != new_item.get(3) or old_item.get(3, 0) >= 4:
+        # run-length encoded tiles can't be compared cell by cell without expanding them
+        return ""
+
+    changed = 0
+    for field_index in TILEMAP_DATA_FIELDS:
+        old_ref, new_ref = old_item.get(field_index), new_item.get(field_index)
+        if old_ref is None or new_ref is None or old_ref < 0 or new_ref < 0:
+            continue
+        old_blob, new_blob = old.compressed(old_ref), new.compressed(new_ref)
+        if old_blob == new_blob:
+            continue
+        old_data, new_data = zlib.decompress(old_blob), zlib.decompress(new_blob)
+        cells = old_shape[0] * old_shape[1]
+        size = TILE_SIZES[field_index]
+        if len(old_data) != len(new_data) or len(old_data) < cells * size:
+            if old_data != new_data:
+                return "tiles changed"
+            continue
+        # one row of raw bytes per cell, works for every tile type
+        old_tiles = np.frombuffer(old_data, dtype=np.uint8, count=cells * size).reshape(cells, size)
+        new_tiles = np.frombuffer(new_data, dtype=np.uint8, count=cells * size).reshape(cells, size)
+        changed += int(np.count_nonzero((old_tiles != new_tiles).any(axis=1)))
+    return f"{changed} tiles changed" if changed else ""
+
+
+def diff_maps(old: MapIndex, new: MapIndex) -> MapDiff:
+    """
+    Compares two versions of a map.
+
+    Images, sounds, envelopes and groups are matched by name, layers by group, name and kind.
+    Duplicate names are matched in file order.
+
+    Args:
+        old: Index of the previous version.
+        new: Index of the new version.
+
+    Returns:
+        MapDiff: Every added, removed or changed part.
+    """
+    old_fp, new_fp = _Fingerprints(old), _Fingerprints(new)
+    result = MapDiff(old_size=old.file_size, new_size=new.file_size)
+
+    result.changes += _diff_info(old_fp, new_fp)
+    result.changes += _compare(
+        "image",
+        _resources(old_fp, ITEM_IMAGE, old_fp.image_names, IMAGE_DATA_FIELDS),
+        _resources(new_fp, ITEM_IMAGE, new_fp.image_names, IMAGE_DATA_FIELDS),
+    )
+    result.changes += _compare(
+        "sound",
+        _resources(old_fp, ITEM_SOUND, old_fp.sound_names, SOUND_DATA_FIELDS),
+        _resources(new_fp, ITEM_SOUND, new_fp.sound_names, SOUND_DATA_FIELDS),
+    )
+    result.changes += _compare("envelope", _envelopes(old_fp), _envelopes(new_fp))
+
+    old_groups, old_layer_groups = _groups(old_fp)
+    new_groups, new_layer_groups = _groups(new_fp)
+    result.changes += _compare("group", old_groups, new_groups)
+
+    old_layers = _layers(old_fp, old_layer_groups)
+    new_layers = _layers(new_fp, new_layer_groups)
+    layer_changes = _compare(
+        "layer",
+        {key: digest for key, (digest, _) in old_layers.items()},
+        {key: digest for key, (digest, _) in new_layers.items()},
+    )
+    for change in layer_changes:
+        if change.status == "changed":
+            change.detail = _tile_detail(old, new, old_layers[change.name][1], new_layers[change.name][1])
+    result.changes += layer_changes
+
+    result.changes.sort(key=lambda change: KIND_ORDER.index(change.kind))
+    return result
+
+
+def diff_map_bytes(old: bytes, new: bytes) -> MapDiff:
+    """:func:`diff_maps` for two complete map files."""
+    return diff_maps(read_map_index(old), read_map_index(new))
@@ -0,0 +1,220 @@
+"""Metadata-only reader for datafile v4 maps.
+
+Reads the header tables and items with ``struct`` and never inflates a data item unless asked to.
+Use it instead of TwMapV4 whenever only item fields, names or data sizes are needed.
+
+References:
+    https://github.com/heinrich5991/libtw2/blob/master/doc/datafile.md
+"""
+
+import struct
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+HEADER = struct.Struct("<4s4s7i")
+ITEM_HEADER = struct.Struct("<HHi")
+
+ITEM_VERSION = 0
+ITEM_INFO = 1
+ITEM_IMAGE = 2
+ITEM_ENVELOPE = 3
+ITEM_GROUP = 4
+ITEM_LAYER = 5
+ITEM_ENV_POINTS = 6
+ITEM_SOUND = 7
+ITEM_EX_TYPE_INDEX = 0xFFFF
+
+
+class MapFormatError(ValueError):
+    pass
+
+
+@dataclass(slots=True)
+class DataInfo:
+    """
+    Location and sizes of one data item.
+
+    Attributes:
+        index: Position in the data item table.
+        offset: Offset of the compressed blob in the file.
+        compressed_size: Size of the zlib-compressed blob in bytes.
+        size: Size of the inflated data in bytes, as recorded in the header.
+    """
+    index: int
+    offset: int
+    compressed_size: int
+    size: int
+
+
+@dataclass(slots=True)
+class ItemInfo:
+    """
+    One item with its raw 32-bit fields.
+
+    Attributes:
+        type_id: Item kind, see the ITEM_* constants.
+        id: Item ID, unique per type.
+        offset: Offset of the item header in the file.
+        fields: The item payload as signed 32-bit integers.
+    """
+    type_id: int
+    id: int
+    offset: int
+    fields: tuple
+
+    def get(self, index: int, default: Optional[int] = None) -> Optional[int]:
+        return self.fields[index] if index < len(self.fields) else default
+
+
+@dataclass(slots=True)
+class Resource:
+    """
+    An image or sound with its name and the size of its embedded data.
+
+    Attributes:
+        item: The image or sound item.
+        name: Resource name, without the terminating NUL bytes.
+        external: True if the resource is not embedded in the map.
+        data: The embedded data item, or None for external resources.
+    """
+    item: ItemInfo
+    name: str
+    external: bool
+    data: Optional[DataInfo]
+
+    @property
+    def compressed_size(self) -> int:
+        return self.data.compressed_size if self.data else 0
+
+    @property
+    def size(self) -> int:
+        return self.data.size if self.data else 0
+
+
+@dataclass(slots=True)
+class MapIndex:
+    """
+    Item and data tables of a map.
+
+    Attributes:
+        size: Map size as recorded in the header.
+        items: Every item in file order.
+        data: Every data item in table order.
+    """
+    size: int
+    items: List[ItemInfo]
+    data: List[DataInfo]
+    _raw: bytes = field(repr=False)
+    _strings: Dict[int, Optional[str]] = field(default_factory=dict, repr=False)
+
+    @property
+    def file_size(self) -> int:
+        return len(self._raw)
+
+    def items_of(self, type_id: int) -> List[ItemInfo]:
+        return [item for item in self.items if item.type_id == type_id]
+
+    def compressed(self, index: int) -> memoryview:
+        """Returns the zlib-compressed blob of a data item, as a view into the map without copying it."""
+        info = self.data[index]
+        return memoryview(self._raw)[info.offset:info.offset + info.compressed_size]
+
+    def inflate(self, index: int) -> bytes:
+        return zlib.decompress(self.compressed(index))
+
+    def string(self, index: Optional[int]) -> Optional[str]:
+        """Inflates and decodes a NUL terminated string data item. Returns None for unset indices."""
+        if index is None or not 0 <= index < len(self.data):
+            return None
+        if index not in self._strings:
+            self._strings[index] = self.inflate(index).split(b"\0", 1)[0].decode("utf-8", errors="replace")
+        return self._strings[index]
+
+    def _data_info(self, index: Optional[int]) -> Optional[DataInfo]:
+        return self.data[index] if index is not None and 0 <= index < len(self.data) else None
+
+    def images(self) -> List[Resource]:
+        # version, width, height, external, name, data
+        return [
+            Resource(
+                item=item,
+                name=self.string(item.get(4)) or "",
+                external=bool(item.get(3)),
+                data=None if item.get(3) else self._data_info(item.get(5)),
+            )
+            for item in self.items_of(ITEM_IMAGE)
+        ]
+
+    def sounds(self) -> List[Resource]:
+        # version, external, name, data
+        return [
+            Resource(
+                item=item,
+                name=self.string(item.get(2)) or "",
+                external=bool(item.get(1)),
+                data=None if item.get(1) else self._data_info(item.get(3)),
+            )
+            for item in self.items_of(ITEM_SOUND)
+        ]
+
+
+def read_map_index(raw: bytes) -> MapIndex:
+    """
+    Reads the item and data tables of a datafile v4 map.
+
+    Args:
+        raw: The complete map file.
+
+    Returns:
+        MapIndex: The map's tables. Nothing is inflated yet.
+
+    Raises:
+        MapFormatError: If the data is not a version 4 datafile or is truncated.
+    """
+    if len(raw) < HEADER.size:
+        raise MapFormatError("File too small for a datafile header")
+
+    magic, version, size, _swaplen, num_item_types, num_items, num_data, item_size, data_size = HEADER.unpack_from(raw)
+    if magic != b"DATA":
+        raise MapFormatError(f"Bad magic {magic!r}")
+    if version != b"\x04\x00\x00\x00":
+        raise MapFormatError(f"Unsupported datafile version {version!r}")
+    if min(num_item_types, num_items, num_data, item_size, data_size) < 0:
+        raise MapFormatError("Negative table size in header")
+
+    try:
+        return _read_tables(raw, size, num_item_types, num_items, num_data, item_size, data_size)
+    except struct.error as e:
+        raise MapFormatError(f"Map is truncated: {e}") from e
+
+
+def _read_tables(
+        raw: bytes, size: int, num_item_types: int, num_items: int, num_data: int, item_size: int, data_size: int
+) -> MapIndex:
+    pos = HEADER.size + num_item_types * 12
+    item_offsets = struct.unpack_from(f"<{num_items}i", raw, pos)
+    pos += num_items * 4
+    data_offsets = struct.unpack_from(f"<{num_data}i", raw, pos)
+    pos += num_data * 4
+    data_sizes = struct.unpack_from(f"<{num_data}i", raw, pos)
+    pos += num_data * 4
+
+    items_start = pos
+    data_start = items_start + item_size
+    if data_start + data_size > len(raw):
+        raise MapFormatError("Map is truncated")
+
+    items = []
+    for offset in item_offsets:
+        start = items_start + offset
+        item_id, type_id, length = ITEM_HEADER.unpack_from(raw, start)
+        fields = struct.unpack_from(f"<{length // 4}i", raw, start + ITEM_HEADER.size)
+        items.append(ItemInfo(type_id=type_id, id=item_id, offset=start, fields=fields))
+
+    data = []
+    for i, offset in enumerate(data_offsets):
+        end = data_size if i == num_data - 1 else data_offsets[i + 1]
+        data.append(DataInfo(index=i, offset=data_start + offset, compressed_size=end - offset, size=data_sizes[i]))
+
+    return MapIndex(size=size, items=items, data=data, _raw=raw)
@@ -2,7 +2,7 @@
 # Generates plots that visualize which images/sounds take up how much of the map size.
 # Command line parameter: MAP_PATH
 #
-# Requires the tw_map_v4 module which is the map.ksy kaitai module for Python.
+# Reads the map with map_index, which only inflates the image and sound names.
 # References:
 # 1. https://github.com/heinrich5991/libtw2/blob/master/doc/map_v4.ksy
 # 2. https://doc.kaitai.io/stream_api.html
@@ -10,7 +10,7 @@
 # Author: Patiga
 # License: MIT
 
-from extensions.map_testing.tw_map_v4 import TwMapV4
+from extensions.map_testing.map_index import read_map_index
 import matplotlib.pyplot as plt
 import numpy as np
 import io
@@ -42,28 +42,15 @@ def numbered_pie(ax, sizes, names, title):
 
 
 def visualize_from_bytes(data) -> io.BytesIO:
-    map = TwMapV4.from_bytes(data)
-
-    image_names = []
-    image_sizes = []
-    sound_names = []
-    sound_sizes = []
-
-    for item in map.items:
-        if item.type_id == TwMapV4.ItemKind.image:
-            image = item.content
-            image_names.append(f"{image.name.string.strip(chr(0))} ({item.id})")
-            if image.data_index is not TwMapV4.Optional.not_set:
-                image_sizes.append(len(map._raw__raw_data_items[image.data_index]))
-            else:
-                image_sizes.append(0)
-        elif item.type_id == TwMapV4.ItemKind.sound:
-            sound = item.content
-            sound_names.append(f"{sound.name.string.strip(chr(0))} ({item.id})")
-            if sound.data_index is not TwMapV4.Optional.not_set:
-                sound_sizes.append(len(map._raw__raw_data_items[sound.data_index]))
-            else:
-                sound_sizes.append(0)
+    # Only names and compressed sizes are needed, both come straight from the datafile tables.
+    map = read_map_index(data)
+    images = map.images()
+    sounds = map.sounds()
+
+    image_names = [f"{image.name} ({image.item.id})" for image in images]
+    image_sizes = [image.compressed_size for image in images]
+    sound_names = [f"{sound.name} ({sound.item.id})" for sound in sounds]
+    sound_sizes = [sound.compressed_size for sound in sounds]
 
     def sizeof_fmt(num, suffix="B"):
         for unit in ("", "Ki", "Mi", "Gi", "Ti", "Pi", "Ei", "Zi"):
@@ -74,7 +61,7 @@ def visualize_from_bytes(data) -> io.BytesIO:
 
     total_images_size = sum(image_sizes)
     total_sounds_size = sum(sound_sizes)
-    total_map_size = map.header.size
+    total_map_size = map.size
     other = total_map_size - total_images_size - total_sounds_size
 
     max_items = max(len(image_names), len(sound_names))
@@ -118,5 +105,6 @@ def visualize_from_bytes(data) -> io.BytesIO:
     plt.tight_layout()
     buf = io.BytesIO()
     plt.savefig(buf, format='png', bbox_inches="tight")
+    plt.close(fig)
     buf.seek(0)
     return buf
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from utils import render_worker
+
+log = logging.getLogger("mt")
+
+
+@dataclass(slots=True)
+class RenderStats:
+    """
+    Counters of a RenderPool.
+
+    Attributes:
+        jobs: Finished jobs, including failed ones.
+        failures: Jobs that raised.
+        timeouts: Jobs that ran into their timeout.
+        cancelled: Jobs cancelled by their caller.
+        restarts: How often the workers were replaced.
+        run_time: Total seconds from submitting to finishing a job.
+    """
+    jobs: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    cancelled: int = 0
+    restarts: int = 0
+    run_time: float = 0.0
+
+    def __str__(self) -> str:
+        avg = self.run_time / self.jobs if self.jobs else 0.0
+        return (
+            f"jobs={self.jobs} failures={self.failures} timeouts={self.timeouts} "
+            f"cancelled={self.cancelled} restarts={self.restarts} avg={avg:.2f}s"
+        )
+
+
+class RenderPool:
+    """Worker processes for CPU heavy rendering, like the map size plots.
+
+    Workers are spawned (not forked from the running bot), import matplotlib with the Agg backend
+    as soon as the pool starts and are reused for every job. A job that exceeds its timeout takes
+    the workers down with it: there is no way to stop a single busy worker, so the pool is
+    replaced and jobs running at that moment fail as well.
+
+    Args:
+        workers: Number of worker processes.
+        timeout: Default timeout of a job in seconds.
+    """
+
+    def __init__(self, workers: int = 1, timeout: float = 120.0):
+        self.workers = workers
+        self.timeout = timeout
+        self.stats = RenderStats()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def __repr__(self):
+        return f"<RenderPool workers={self.workers} running={self._pool is not None}>"
+
+    def configure(self, workers: int, timeout: float):
+        """Applies new settings. Running workers are replaced on the next restart."""
+        self.workers = workers
+        self.timeout = timeout
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=render_worker.warm_up,
+            )
+        return self._pool
+
+    async def start(self):
+        """|coro|
+        Spawns and warms up every worker, so the first job doesn't pay for it.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._executor()
+        await asyncio.gather(*(loop.run_in_executor(executor, render_worker.ping) for _ in range(self.workers)))
+
+    def _kill(self, pool: Optional[ProcessPoolExecutor] = None):
+        # Only replace the pool the failed job ran in, other jobs may have started a new one since.
+        if self._pool is None or (pool is not None and pool is not self._pool):
+            return
+        pool, self._pool = self._pool, None
+        # ProcessPoolExecutor has no public way to stop busy workers. _processes exists from
+        # Python 3.10 (the oldest version the bot supports) up to at least 3.13; without it the
+        # busy workers can only finish their job before they exit.
+        processes = list((getattr(pool, "_processes", None) or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.kill()
+        self.stats.restarts += 1
+
+    def close(self):
+        """Stops every worker, including busy ones."""
+        self._kill()
+
+    async def run(self, func: Callable, *args, timeout: Optional[float] = None):
+        """|coro|
+        Runs `func(*args)` in a worker process.
+
+        `func` and its arguments must be picklable. Cancelling the caller drops the job if it
+        hasn't started yet; a running job finishes, but its result is discarded.
+
+        Raises:
+            asyncio.TimeoutError: The job exceeded its timeout. The workers are replaced.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        executor = self._executor()
+        future = asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        start = time.perf_counter()
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            self.stats.timeouts += 1
+            log.error("Render job %s timed out after %.1fs, restarting the workers", func.__name__, timeout)
+            self._kill(executor)
+            raise
+        except asyncio.CancelledError:
+            self.stats.cancelled += 1
+            raise
+        except BrokenProcessPool:
+            # a worker died (e.g. out of memory), start over with fresh ones next time
+            self.stats.failures += 1
+            self._kill(executor)
+            raise
+        except Exception:
+            self.stats.failures += 1
+            raise
+        finally:
+            self.stats.jobs += 1
+            self.stats.run_time += time.perf_counter() - start
+
+    async def visualize_size(self, data: bytes, *, timeout: Optional[float] = None) -> bytes:
+        """|coro|
+        Renders the size visualization of a map as PNG, see :mod:`map_visualize_size`.
+        """
+        return await self.run(render_worker.visualize_size, data, timeout=timeout)
+
+    def summary(self) -> str:
+        return f"render pool (workers {self.workers}, timeout {self.timeout:.0f}s): {self.stats}"
+
+
+# Shared by every submission. The MapTesting cog applies the config and starts the workers.
+render_pool = RenderPool()
@@ -1,21 +1,50 @@
+import asyncio
 import contextlib
 import enum
 import logging
 import os
 import re
 import io
+import time
 from io import BytesIO
 from typing import Optional
 
 import discord
+from PIL import Image
 
-from . import map_visualize_size
+from extensions.map_testing.analysis_cache import analysis_cache, map_digest
+from extensions.map_testing.map_diff import diff_map_bytes
 from extensions.map_testing.map_states import MapState
-from utils.misc import run_process_shell, run_process_exec, check_os
+from extensions.map_testing.render_pool import render_pool
+from extensions.map_testing.version_store import MapVersion, map_versions
+from utils.misc import check_os, executor
+from utils.process_pool import Priority, ProcessPool
+from utils.scratch import scratch_dir, write_scratch
 from utils.text import sanitize
 
 log = logging.getLogger("mt")
 
+# Shared by every submission. The MapTesting cog applies the limits from the config.
+tools = ProcessPool({
+    "twmap-check": 2,
+    "twmap-check-ddnet": 2,
+    "twmap-edit": 2,
+    "twgpu-map-photography": 1,
+})
+
+
+@executor
+def scale_png(png: bytes, width: int) -> bytes:
+    """Scales a PNG down to `width` pixels, keeping the aspect ratio. Smaller images are returned as is."""
+    with Image.open(BytesIO(png)) as img:
+        if img.width <= width:
+            return png
+        height = max(1, round(img.height * width / img.width))
+        scaled = img.resize((width, height), Image.Resampling.LANCZOS)
+    buf = BytesIO()
+    scaled.save(buf, format="png", optimize=True)
+    return buf.getvalue()
+
 
 class SubmissionState(enum.Enum):
     PENDING = "⏳"
@@ -29,7 +58,7 @@ class SubmissionState(enum.Enum):
 
 
 class Submission:
-    __slots__ = ("message", "author", "channel", "filename", "_bytes", "_state")
+    __slots__ = ("message", "author", "channel", "filename", "_bytes", "_state", "_digest")
 
     DIR = "data/map-testing"
 
@@ -44,6 +73,7 @@ class Submission:
                 break
 
         self._bytes = raw_bytes
+        self._digest = None
         self._state = SubmissionState.PENDING
 
     def __str__(self) -> str:
@@ -53,8 +83,44 @@ class Submission:
     def state(self) -> SubmissionState:
         return self._state
 
+    @classmethod
+    def from_version(cls, channel: discord.TextChannel, version: MapVersion) -> "Submission":
+        """Creates a submission of a stored map version without fetching its message.
+
+        The message is partial and the author unknown until :meth:`fetch_message` is called.
+        """
+        self = cls.__new__(cls)
+        self.message = channel.get_partial_message(version.message_id)
+        self.author = None
+        self.channel = channel
+        self.filename = version.filename
+        self._bytes = None
+        self._digest = version.digest
+        self._state = SubmissionState.UPLOADED if version.uploaded else SubmissionState.VALIDATED
+        return self
+
+    async def fetch_message(self) -> discord.Message:
+        """|coro|
+        Replaces the partial message of a submission created by :meth:`from_version` with the full one.
+
+        Raises:
+            ValueError: The message was deleted.
+        """
+        if not isinstance(self.message, discord.Message):
+            try:
+                self.message = await self.message.fetch()
+            except discord.NotFound:
+                raise ValueError(f"The message of map {self.filename!r} no longer exists") from None
+            self.author = self.message.author
+        return self.message
+
     async def buffer(self) -> BytesIO:
         if self._bytes is None:
+            self._bytes = await map_versions.read_message(self.message.id)
+
+        if self._bytes is None:
+            # not (or no longer) in the version store, download the attachment after all
+            await self.fetch_message()
             map_attachment = next(
                 (
                     attachment
@@ -70,6 +136,37 @@ class Submission:
                 raise ValueError("No .map file found in message attachments")
         return BytesIO(self._bytes)
 
+    async def digest(self) -> str:
+        """SHA-256 of the map, the key of its cached analysis results."""
+        if self._digest is None:
+            buf = await self.buffer()
+            self._digest = map_digest(buf.getbuffer())
+            await analysis_cache.update_meta(self._digest, filename=self.filename, size=buf.getbuffer().nbytes)
+        return self._digest
+
+    async def store(self, *, uploaded: Optional[bool] = None) -> Optional[MapVersion]:
+        """|coro|
+        Adds the map to the local version store of its channel.
+
+        Args:
+            uploaded: Whether the map was uploaded to ddnet.org. Defaults to the submission state.
+        """
+        if uploaded is None:
+            uploaded = self._state is SubmissionState.UPLOADED
+        buf = await self.buffer()
+        version = await map_versions.add(
+            self.channel.id,
+            self.message.id,
+            self.filename,
+            buf.getvalue(),
+            by_bot=bool(self.author and self.author.bot),
+            uploaded=uploaded,
+            digest=await self.digest(),
+        )
+        if version is not None and uploaded and not version.uploaded:
+            await map_versions.mark_uploaded(self.message.id)
+        return version
+
     async def get_file(self) -> discord.File:
         return discord.File(await self.buffer(), filename=self.filename)
 
@@ -88,74 +185,116 @@ class Submission:
         await self.message.pin()
 
     async def visualize_size(self) -> discord.File:
+        png = await analysis_cache.get_or_compute(await self.digest(), "size.png", self._visualize_size)
+        return discord.File(BytesIO(png), filename="FileSizeStats.png")
+
+    async def _visualize_size(self) -> bytes:
         buf = await self.buffer()
-        out_buf = map_visualize_size.visualize_from_bytes(buf.getvalue())
-        return discord.File(out_buf, filename="FileSizeStats.png")
+        return await render_pool.visualize_size(buf.getvalue())
+
+    async def diff(self, previous: "Submission") -> str:
+        """|coro|
+        Summarizes what changed compared to an earlier version of the map.
+
+        Raises:
+            MapFormatError: If either map can't be read.
+        """
+        digest, previous_digest = await self.digest(), await previous.digest()
+
+        async def compute():
+            old, new = (await previous.buffer()).getvalue(), (await self.buffer()).getvalue()
+            result = await asyncio.get_running_loop().run_in_executor(None, diff_map_bytes, old, new)
+            return result.summary().encode()
+
+        summary = await analysis_cache.get_or_compute(digest, f"diff-{previous_digest}.txt", compute)
+        return summary.decode()
+
+    async def debug_map(self, priority: Priority = Priority.BACKGROUND) -> Optional[str]:
+        digest = await self.digest()
+        if (cached := await analysis_cache.get(digest, "debug.txt")) is not None:
+            return cached.decode()
+
+        output, complete = await self._debug_map(priority)
+        # Only cache runs where both checks actually ran.
+        if complete:
+            await analysis_cache.put(digest, "debug.txt", output.encode())
+        return output
 
-    async def debug_map(self) -> Optional[str]:
+    async def _debug_map(self, priority: Priority) -> (Optional[str], bool):
         _, ext = check_os()
-        tmp = f"{self.DIR}/tmp/{self.message.id}.map"
-
         buf = await self.buffer()
-        with open(tmp, "wb") as f:
-            f.write(buf.getvalue())
 
-        try:
-            dbg_stdout, dbg_stderr = await run_process_exec(
-                f'{self.DIR}/twmap-check{ext}',
-                "-vv", "--", tmp)
-        except RuntimeError as exc:
-            ddnet_dbg_error = str(exc)
-            return log.error(
+        with scratch_dir(prefix=f"{self.message.id}-") as scratch:
+            tmp = write_scratch(scratch, f"{self.message.id}.map", buf.getbuffer())
+
+            # Both checks only read the map, so they run side by side.
+            dbg_result, ddnet_dbg_result = await asyncio.gather(
+                tools.run_exec(
+                    "twmap-check", f'{self.DIR}/twmap-check{ext}',
+                    "-vv", "--", tmp, priority=priority),
+                tools.run_exec(
+                    "twmap-check-ddnet", f'{self.DIR}/twmap-check-ddnet{ext}',
+                    "--omit-unreliable-checks", "--", tmp, priority=priority),
+                return_exceptions=True,
+            )
+
+        if isinstance(dbg_result, BaseException):
+            if not isinstance(dbg_result, RuntimeError):
+                raise dbg_result
+            log.error(
                 "Debugging failed of map %r (%d): %s",
                 self.filename,
                 self.message.id,
-                ddnet_dbg_error,
+                str(dbg_result),
             )
+            return None, False
 
+        dbg_stdout, dbg_stderr = dbg_result
         output = dbg_stdout + dbg_stderr
-        ddnet_dbg_stdout, ddnet_dbg_stderr = None, None
+        complete = True
 
-        try:
-            ddnet_dbg_stdout, ddnet_dbg_stderr = await run_process_exec(
-                f'{self.DIR}/twmap-check-ddnet{ext}',
-                "--omit-unreliable-checks", "--", tmp)
-        except RuntimeError as exc:
-            ddnet_dbg_error = str(exc)
+        if isinstance(ddnet_dbg_result, BaseException):
+            if not isinstance(ddnet_dbg_result, RuntimeError):
+                raise ddnet_dbg_result
+            complete = False
             log.error(
                 "DDNet checks failed of map %r (%d): %s",
                 self.filename,
                 self.message.id,
-                ddnet_dbg_error,
+                str(ddnet_dbg_result),
             )
-        if not ddnet_dbg_stderr:
-            output += ddnet_dbg_stdout
-
-        # cleanup
-        os.remove(tmp)
+        else:
+            ddnet_dbg_stdout, ddnet_dbg_stderr = ddnet_dbg_result
+            if not ddnet_dbg_stderr:
+                output += ddnet_dbg_stdout
 
-        return output
+        return output, complete
 
-    async def edit_map(self, *args: str) -> (str, Optional[discord.File]):
+    async def edit_map(self, *args: str, priority: Priority = Priority.INTERACTIVE) -> (str, Optional[discord.File]):
         if "--mapdir" in args:
             return "Can't save as MapDir using the discord bot", None
 
-        tmp = f"{self.DIR}/tmp/{self.message.id}.map"
-        edited_tmp = f"{tmp}_edit"
-
+        _, ext = check_os()
         buf = await self.buffer()
-        with open(tmp, "wb") as f:
-            f.write(buf.getvalue())
 
-        _, ext = check_os()
+        with scratch_dir(prefix=f"{self.message.id}-") as scratch:
+            tmp = write_scratch(scratch, f"{self.message.id}.map", buf.getbuffer())
+            edited_tmp = f"{tmp}_edit"
 
-        try:
-            executable = f"{self.DIR}/twmap-edit{ext}"
-            stdout, stderr = await run_process_exec(executable, tmp, edited_tmp, *args)
-        except RuntimeError as exc:
-            error = str(exc)
-        else:
-            error = stderr
+            try:
+                executable = f"{self.DIR}/twmap-edit{ext}"
+                stdout, stderr = await tools.run_exec(
+                    "twmap-edit", executable, tmp, edited_tmp, *args, priority=priority
+                )
+            except RuntimeError as exc:
+                error = str(exc)
+            else:
+                error = stderr
+
+            edited = None
+            if not error and os.path.exists(edited_tmp):
+                with open(edited_tmp, "rb") as f:
+                    edited = f.read()
 
         if error:
             log.error(
@@ -166,14 +305,7 @@ class Submission:
             )
             raise RuntimeError(error)
 
-        if os.path.exists(edited_tmp):
-            with open(edited_tmp, "rb") as f:
-                file = discord.File(BytesIO(f.read()), filename=f"{str(self)}.map")
-            os.remove(edited_tmp)
-        else:
-            file = None
-
-        os.remove(tmp)
+        file = discord.File(BytesIO(edited), filename=f"{str(self)}.map") if edited is not None else None
         return stdout, file
 
 
@@ -236,27 +368,56 @@ class InitialSubmission(Submission):
     def emoji(self) -> str:
         return self.SERVER_TYPES.get(self.server, "")
 
-    async def generate_thumbnail(self) -> discord.File:
-        tmp = f'{self.DIR}/tmp/{self.message.id}.map'
-
+    async def generate_thumbnail(self, width: Optional[int] = None) -> discord.File:
+        """|coro|
+        Returns the map's thumbnail, rendering it if it isn't cached yet.
+
+        Args:
+            width: Scale the thumbnail down to this width in pixels. None keeps the rendered size.
+        """
+        start = time.perf_counter()
+        png = await self.thumbnail_png(width)
+        log.info(
+            "Thumbnail of map %r (%d) took %.2fs", self.filename, self.message.id, time.perf_counter() - start
+        )
+        suffix = f"-{width}" if width else ""
+        return discord.File(BytesIO(png), filename=f'{self}{suffix}.png')
+
+    async def thumbnail_png(self, width: Optional[int] = None) -> bytes:
+        """|coro|
+        Returns the thumbnail as PNG. Every size is derived from a single render and cached by map hash.
+        """
+        digest = await self.digest()
+        png = await analysis_cache.get_or_compute(digest, "thumbnail.png", self._generate_thumbnail)
+        if width is None:
+            return png
+
+        async def scale():
+            return await scale_png(png, width)
+
+        return await analysis_cache.get_or_compute(digest, f"thumbnail-{width}.png", scale)
+
+    async def _generate_thumbnail(self) -> bytes:
         buf = await self.buffer()
-        with open(tmp, 'wb') as f:
-            f.write(buf.getvalue())
-
-        _, ext = check_os()
-        cmd = [f"{self.DIR}/twgpu-map-photography"]
-        if ext:
-            cmd[0] += ext
-        cmd.append(tmp)
 
-        stdout, stderr = await run_process_shell(' '.join(cmd))
+        # The tool writes the PNG into its working directory, so it runs inside the scratch directory.
+        with scratch_dir(prefix=f"{self.message.id}-") as scratch:
+            tmp = write_scratch(scratch, f'{self.message.id}.map', buf.getbuffer())
+
+            _, ext = check_os()
+            program = os.path.abspath(f"{self.DIR}/twgpu-map-photography{ext}")
+
+            start = time.perf_counter()
+            try:
+                stdout, stderr = await tools.run_exec("twgpu-map-photography", program, tmp, cwd=scratch)
+            except Exception as e:
+                log.error(e)
+                raise RuntimeError(e) from e
+            log.info(
+                "Rendered thumbnail of map %r (%d) in %.2fs",
+                self.filename, self.message.id, time.perf_counter() - start,
+            )
 
-        try:
-            stdout, stderr = await run_process_shell(' '.join(cmd))
-        except Exception as e:
-            log.error(e)
-            raise RuntimeError(e) from e
-        else:
             log.info("stdout: %s", stdout)
             if stderr:
                 if "XDG_RUNTIME_DIR is invalid or not set" in stderr:
@@ -265,17 +426,12 @@ class InitialSubmission(Submission):
                     log.error("stderr: %s", stderr)
                     raise RuntimeError(stderr)
 
-        try:
-            with open(f'{self.message.id}.png', 'rb') as f:
-                buf = BytesIO(f.read())
-        except FileNotFoundError as error:
-            log.info(error)
-
-        # cleanup
-        os.remove(tmp)
-        os.remove(f'{self.message.id}.png')
-
-        return discord.File(buf, filename=f'{self}.png')
+            try:
+                with open(os.path.join(scratch, f'{self.message.id}.png'), 'rb') as f:
+                    return f.read()
+            except FileNotFoundError as error:
+                log.info(error)
+                raise RuntimeError(f"No thumbnail was rendered for map {self.filename!r}") from error
 
     async def process(self) -> Submission:
         perms = discord.PermissionOverwrite(read_messages=True)
@@ -294,10 +450,48 @@ class InitialSubmission(Submission):
         # circular imports
         from extensions.map_testing.map_channel import MapChannel
 
-        debug_output = await self.debug_map()
-        state = MapState.WAITING if debug_output else MapState.TESTING
-        self.map_channel, message = await MapChannel.from_submission(self, state, overwrites=overwrites)
+        start = time.perf_counter()
+        # Every stage reads the map, download it once before they start.
+        await self.digest()
+
+        debug = asyncio.create_task(self.debug_map())
+        thumbnail = asyncio.create_task(self.generate_thumbnail())
+        size = asyncio.create_task(self.visualize_size())
+
+        try:
+            # The debug output decides the category, so the channel is created once it is known,
+            # the thumbnail and the size plot keep rendering meanwhile.
+            debug_output = await debug
+            state = MapState.WAITING if debug_output else MapState.TESTING
+            self.map_channel = await MapChannel.create_for_submission(self, state, overwrites=overwrites)
+        except BaseException:
+            thumbnail.cancel()
+            size.cancel()
+            raise
+
+        try:
+            message = await self.map_channel.setup_submission(self, thumbnail=thumbnail)
+        except BaseException:
+            thumbnail.cancel()
+            size.cancel()
+            # don't leave a half set up channel behind
+            with contextlib.suppress(discord.HTTPException):
+                await self.map_channel.delete()
+            self.map_channel = None
+            raise
+
+        await asyncio.gather(
+            self._post_debug_output(message, debug_output),
+            self._post_size(size),
+        )
+        log.info(
+            "Processed submission %r (%d) in %.2fs", self.filename, self.message.id, time.perf_counter() - start
+        )
+
+        return Submission(message, raw_bytes=self._bytes)
 
+    @staticmethod
+    async def _post_debug_output(message: discord.Message, debug_output: Optional[str]):
         # DEBUG Map: Runs twmap-check-ddnet on the isubm map file
         if debug_output:
             if len(debug_output) < 1900:
@@ -313,4 +507,10 @@ class InitialSubmission(Submission):
         else:
             await message.add_reaction("👌")
 
-        return Submission(message, raw_bytes=self._bytes)
+    async def _post_size(self, size: "asyncio.Task[discord.File]"):
+        try:
+            file = await size
+        except Exception as e:
+            log.error("Size visualization failed of map %r (%d): %s", self.filename, self.message.id, e)
+            return
+        await self.map_channel.send("Map size breakdown :mag:", file=file)
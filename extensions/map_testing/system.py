@@ -1,10 +1,11 @@
+import asyncio
 import io
 import logging
 import re
 import shlex
+import time
 from datetime import datetime, timezone, timedelta
-from io import BytesIO
-from typing import List, Optional, TYPE_CHECKING
+from typing import List, Optional, Set, Tuple, TYPE_CHECKING
 
 import discord
 from discord import app_commands
@@ -12,26 +13,35 @@ from discord.ext import commands, tasks
 
 from extensions.map_testing.embeds import MapReleased, UnmatchedFilename, UnmatchedSubmOwner, MissingChangelog
 from extensions.map_testing.cooldown import global_cooldown
+from extensions.map_testing.activity import ActivityIndex
+from extensions.map_testing.asset_archive import AssetArchiver
+from extensions.map_testing.channel_snapshot import ChannelSnapshot
 from extensions.map_testing.log import TestLog
 from extensions.map_testing.map_channel import MapChannel
 from extensions.map_testing.scores import update_scores_topic
+from extensions.map_testing.map_index import MapFormatError
 from extensions.map_testing.map_states import MapState
+from extensions.map_testing.render_pool import render_pool
+from extensions.map_testing.version_store import map_versions
 from extensions.map_testing.submission import (
     InitialSubmission,
     Submission,
     SubmissionState,
+    tools,
 )
 from extensions.map_testing.utils import (
     is_testing_channel,
     is_testing_staff,
     by_releases_webhook,
-    debug_check
+    debug_check,
+    latest_submission,
 )
 from extensions.ticketsystem.queries import rm_mapinfo_from_db, fetch_map_from_db
 from utils.checks import has_map, is_staff
 from constants import Guilds, Channels, Roles, Emojis
 from utils.text import to_discord_timestamp
 from utils.conn import ddnet_upload, ddnet_delete, upload_submission
+from utils.process_pool import parse_limits
 
 log = logging.getLogger("mt")
 
@@ -64,16 +74,61 @@ class MapTesting(commands.Cog):
 
         self.bot.map_channels = {}
         self._active_submissions = set()
+        tools.configure(parse_limits(self.bot.config.get("MAP_TESTING", "TOOL_CONCURRENCY", fallback="")))
+        render_pool.configure(
+            workers=self.bot.config.getint("MAP_TESTING", "RENDER_WORKERS", fallback=1),
+            timeout=self.bot.config.getfloat("MAP_TESTING", "RENDER_TIMEOUT", fallback=120.0),
+        )
+        self._render_warmup = None
+        self.activity = ActivityIndex()
+        self.channel_snapshot = ChannelSnapshot()
+        self._reconcile = None
         self.update_scores.start()
 
     async def cog_load(self):
         self.session = TestLog.session = await self.bot.session_manager.get_session(self.__class__.__name__)
+        # Spawning the workers and importing matplotlib takes a while, don't hold up loading the cog.
+        self._render_warmup = asyncio.create_task(render_pool.start())
 
     async def cog_unload(self):
         self.auto_archive.cancel()
+        if self._render_warmup is not None:
+            self._render_warmup.cancel()
+        render_pool.close()
+        if self._reconcile is not None:
+            self._reconcile.cancel()
+        await self.activity.flush()
+        if self.bot.map_channels:
+            await self.channel_snapshot.save(self.map_channels)
         await self.bot.session_manager.close_session(self.__class__.__name__)
 
+    async def load_map_channel(
+            self, channel: discord.TextChannel, limit: asyncio.Semaphore
+    ) -> Optional[Tuple[MapChannel, bool]]:
+        """|coro|
+        Loads a map channel, from the snapshot if it is still up to date.
+
+        Returns:
+            The map channel and whether it was rebuilt from the snapshot, or None if it couldn't be loaded.
+        """
+        try:
+            entry = self.channel_snapshot.get(channel.id)
+            if entry is not None and (map_channel := MapChannel.from_snapshot(self.bot, channel, entry)) is not None:
+                return map_channel, True
+
+            async with limit:
+                map_channel = await MapChannel.create(self.bot, channel)
+                await map_channel.load_changelogs()
+        except ValueError as exc:
+            log.error("Failed loading map channel #%s: %s", channel, exc)
+            return None
+        return map_channel, False
+
     async def load_map_channels(self):
+        start = time.perf_counter()
+        await self.channel_snapshot.load()
+
+        channels = []
         for category_id in (
                 Channels.CAT_TESTING,
                 Channels.CAT_WAITING,
@@ -90,13 +145,55 @@ class MapTesting(commands.Cog):
                         Channels.TESTER_VOTES
                 ):
                     continue
+                channels.append(channel)
+
+        limit = asyncio.Semaphore(self.bot.config.getint("MAP_TESTING", "LOAD_CONCURRENCY", fallback=8))
+        results = await asyncio.gather(*(self.load_map_channel(channel, limit) for channel in channels))
+
+        restored = []
+        for channel, result in zip(channels, results):
+            if result is None:
+                continue
+            map_channel, from_snapshot = result
+            self.bot.map_channels[channel.id] = map_channel
+            if from_snapshot:
+                restored.append(map_channel)
+
+            # catches up on messages sent while the bot was offline
+            if channel.last_message_id is not None:
+                self.activity.touch(channel.id, discord.utils.snowflake_time(channel.last_message_id))
+
+        log.info(
+            "Loaded %d map channels in %.1fs, %d from the snapshot",
+            len(self.bot.map_channels), time.perf_counter() - start, len(restored)
+        )
+        self._reconcile = asyncio.create_task(self.reconcile_map_channels(restored, limit))
 
-                try:
-                    map_channel = await MapChannel.create(self.bot, channel)
-                    await map_channel.load_changelogs()
-                    self.bot.map_channels[channel.id] = map_channel
-                except ValueError as exc:
-                    log.error("Failed loading map channel #%s: %s", channel, exc)
+    async def reconcile_map_channels(self, map_channels: List[MapChannel], limit: asyncio.Semaphore):
+        """|coro|
+        Finishes loading the map channels rebuilt from the snapshot and saves a new one.
+        """
+        async def reconcile(map_channel: MapChannel):
+            async with limit:
+                await map_channel.reconcile()
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(reconcile(m) for m in map_channels), return_exceptions=True)
+        for map_channel, result in zip(map_channels, results):
+            if isinstance(result, Exception):
+                log.error("Failed reconciling map channel #%s: %r", map_channel, result)
+        if map_channels:
+            log.info("Reconciled %d map channels in %.1fs", len(map_channels), time.perf_counter() - start)
+
+        await self.channel_snapshot.save(self.map_channels)
+
+    async def seed_releases(self):
+        """Fills the release index from recent announcements, only needed on the first start."""
+        ann_channel = await self.bot.fetch_channel(Channels.ANNOUNCEMENTS)
+        after = datetime.now(timezone.utc) - timedelta(days=3)
+        async for message in ann_channel.history(after=after):
+            if by_releases_webhook(message) and (map_channel := self.get_map_channel_from_ann(message.content)):
+                self.activity.add_release(map_channel.id, message.created_at)
 
     def get_map_channel(self, channel_id: Optional[int] = None, **kwargs) -> Optional[MapChannel]:
         if channel_id is not None:
@@ -110,9 +207,17 @@ class MapTesting(commands.Cog):
 
     @commands.Cog.listener()
     async def on_ready(self):
+        await self.activity.load()
         await self.load_map_channels()
+        if not self.activity.loaded_from_disk:
+            await self.seed_releases()
         await self.auto_archive.start()
 
+    @commands.Cog.listener("on_message")
+    async def track_activity(self, message: discord.Message):
+        if message.channel.id in self.bot.map_channels:
+            self.activity.touch(message.channel.id, message.created_at)
+
     @commands.Cog.listener("on_message")
     async def handle_unwanted_message(self, message: discord.Message):
         author = message.author
@@ -190,48 +295,48 @@ class MapTesting(commands.Cog):
     async def archive_testlog(self, testlog: TestLog) -> bool:
         failed = False
 
-        js = testlog.json()
-        with open(f"{testlog.DIR}/json/{testlog.name}.json", "w", encoding="utf-8") as f:
-            f.write(js)
-
+        # TestLog.from_map_channel already wrote the log, upload it straight from the file
         try:
-            await ddnet_upload(self.session, "log", BytesIO(js.encode("utf-8")), testlog.name)
-        except RuntimeError:
+            with open(testlog.path, "rb") as f:
+                await ddnet_upload(self.session, "log", f, testlog.name)
+        except (OSError, RuntimeError) as e:
+            log.error("Failed uploading testlog %r: %r", testlog.name, e)
             failed = True
 
-        for asset_type, assets in testlog.assets.items():
-            for filename, url in assets.items():
-                async with self.session.get(url) as resp:
-                    if resp.status != 200:
-                        log.error(
-                            "Failed fetching asset %r: %s", filename, await resp.text()
-                        )
-                        failed = True
-                        continue
-
-                    bytes_ = await resp.read()
-
-                with open(f"{testlog.DIR}/assets/{asset_type}s/{filename}", "wb") as f:
-                    f.write(bytes_)
-
-                try:
-                    await ddnet_upload(self.session, asset_type, BytesIO(bytes_), filename)
-                except RuntimeError:
-                    failed = True
-                    continue
+        archiver = AssetArchiver(
+            self.session,
+            testlog.DIR,
+            concurrency=self.bot.config.getint("MAP_TESTING", "ARCHIVE_CONCURRENCY", fallback=8),
+            attempts=self.bot.config.getint("MAP_TESTING", "ARCHIVE_ATTEMPTS", fallback=3),
+        )
+        start = time.perf_counter()
+        if not await archiver.archive(testlog.assets):
+            failed = True
+        log.info(
+            "Archived assets of testlog %r in %.1fs: %s", testlog.name, time.perf_counter() - start, archiver.stats
+        )
 
         return not failed
 
+    def is_archivable(self, map_channel: MapChannel, now: datetime, deleted_waiting_maps: Set[int]) -> bool:
+        # keep the channel until its map is released, including a short grace period
+        if map_channel.state in (MapState.TESTING, MapState.READY, MapState.RC):
+            return False
+        if self.activity.released_since(map_channel.id, now - timedelta(days=3)):
+            return False
+
+        # don't tele waiting maps before 60 days have passed
+        if map_channel.state is MapState.WAITING and map_channel.id not in deleted_waiting_maps:
+            return False
+
+        # make sure there is no active discussion going on
+        # map authors with map releases receive a 2-week period for fixes which may affect the leaderboard
+        last_activity = self.activity.last_activity(map_channel.id)
+        return last_activity is not None and last_activity < now - timedelta(days=14)
+
     @tasks.loop(hours=1)
     async def auto_archive(self):
         now = datetime.now(timezone.utc)
-        ann_channel = await self.bot.fetch_channel(Channels.ANNOUNCEMENTS)
-        ann_history = [
-            msg async for msg in ann_channel.history(
-                after=now - timedelta(days=3)
-            ) if by_releases_webhook(msg)
-        ]
-        recent_releases = {self.get_map_channel_from_ann(m.content) for m in ann_history}
 
         query = """
                 SELECT channel_id
@@ -240,26 +345,12 @@ class MapTesting(commands.Cog):
                 """
 
         records = await self.bot.fetch(query, fetchall=True)
-        deleted_waiting_maps = [r[0] for r in records]
-
-        to_archive = []
-        for map_channel in self.bot.map_channels:
-            map_channel = self.get_map_channel(map_channel)
-            # keep the channel until its map is released, including a short grace period
-            if map_channel.state in (MapState.TESTING, MapState.READY, MapState.RC) or map_channel in recent_releases:
-                continue
-
-            # don't tele waiting maps before 60 days have passed
-            if map_channel.state is MapState.WAITING and map_channel.id not in deleted_waiting_maps:
-                continue
-
-            # make sure there is no active discussion going on
-            # map authors with map releases receive a 2-week period for fixes which may affect the leaderboard
-            recent_message = [msg async for msg in map_channel.history(limit=1, after=now - timedelta(days=14))]
-            if recent_message:
-                continue
+        deleted_waiting_maps = {r[0] for r in records}
 
-            to_archive.append(map_channel)
+        to_archive = [
+            map_channel for map_channel in self.map_channels
+            if self.is_archivable(map_channel, now, deleted_waiting_maps)
+        ]
 
         for map_channel in to_archive:
             testlog = await TestLog.from_map_channel(map_channel)
@@ -267,10 +358,15 @@ class MapTesting(commands.Cog):
 
             if archived:
                 await map_channel.delete()
+                await map_versions.drop_channel(map_channel.id)
+                self.activity.forget(map_channel.id)
                 log.info('Successfully auto-archived channel #%s', map_channel)
             else:
                 log.error('Failed auto-archiving channel #%s', map_channel)
 
+        # keeps the snapshot close to the current state, a restart falls back to Discord for anything newer
+        await self.channel_snapshot.save(self.map_channels)
+
     @auto_archive.before_loop
     async def before_loop_auto_archive(self):
         await self.bot.wait_until_ready()
@@ -294,6 +390,9 @@ class MapTesting(commands.Cog):
         if (map_channel := self.bot.map_channels.pop(channel.id, None)) is None:
             return
 
+        await map_versions.drop_channel(channel.id)
+        self.activity.forget(channel.id)
+
         try:
             entry = await anext(
                 channel.guild.audit_logs(limit=1, action=discord.AuditLogAction.channel_delete),
@@ -321,6 +420,7 @@ class MapTesting(commands.Cog):
         if map_channel is None:
             return
 
+        self.activity.add_release(map_channel.id, message.created_at)
         await map_channel.send(
             embed=MapReleased(
                 map_channel,
@@ -345,9 +445,12 @@ class MapTesting(commands.Cog):
     async def visualize_size(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True, thinking=True)
         map_channel = self.get_map_channel(interaction.channel.id)
-        pins = await map_channel.pins()
+        subm = await latest_submission(map_channel)
+        if subm is None:
+            await interaction.followup.send("There is no map in this channel.")
+            return
         try:
-            file = await Submission(pins[0]).visualize_size()
+            file = await subm.visualize_size()
             if is_staff(interaction.user):
                 await map_channel.send("Map size breakdown :mag:", file=file)
                 if interaction.response.is_done():
@@ -377,10 +480,13 @@ class MapTesting(commands.Cog):
             await interaction.followup.send(f"Invalid options: {e}")
             return
 
-        pins = await map_channel.pins()
+        subm = await latest_submission(map_channel)
+        if subm is None:
+            await interaction.followup.send("There is no map in this channel.")
+            return
 
         try:
-            stdout, file = await Submission(pins[0]).edit_map(*argv)
+            stdout, file = await subm.edit_map(*argv)
         except RuntimeError as e:
             await interaction.followup.send(str(e))
             return
@@ -404,7 +510,11 @@ class MapTesting(commands.Cog):
         await interaction.response.defer(ephemeral=True, thinking=True)  # noqa
 
         args = ["--remove-everything-unused", "--shrink-tiles-layers"]
-        stdout, file = await Submission((await interaction.channel.pins())[0]).edit_map(*args)
+        subm = await latest_submission(interaction.channel)
+        if subm is None:
+            await interaction.followup.send("There is no map in this channel.")
+            return
+        stdout, file = await subm.edit_map(*args)
 
         await interaction.channel.send(
             content=f"Optimized version attached, {interaction.user.mention}. Changelog: \n```{stdout}```\n"
@@ -572,8 +682,10 @@ class MapTesting(commands.Cog):
         else:
             await subm.set_state(SubmissionState.VALIDATED)
 
+        await subm.store()
         await self.update_changelog(map_channel, subm, message)
         await self.check_debug(subm, message)
+        await self.post_map_diff(subm, message)
         await self.check_changelog_requirement(message)
 
     async def handle_mapper_submission(self, map_channel, subm):
@@ -624,6 +736,40 @@ class MapTesting(commands.Cog):
         if not await debug_check(subm, message):
             await subm.message.add_reaction("👌")
 
+    @staticmethod
+    async def previous_submission(message: discord.Message) -> Optional[Submission]:
+        versions = await map_versions.versions(message.channel.id)
+        older = [v for v in versions if v.message_id < message.id]
+        if older:
+            return Submission.from_version(message.channel, older[-1])
+
+        async for msg in message.channel.history(limit=100, before=message):
+            if has_map(msg):
+                return Submission(msg)
+        return None
+
+    async def post_map_diff(self, subm: Submission, message: discord.Message):
+        # the diff is informational only, it must never break handling the submission
+        try:
+            await self._post_map_diff(subm, message)
+        except MapFormatError as e:
+            log.error("Diffing map %r (%d) failed: %s", subm.filename, message.id, e)
+        except Exception:
+            log.exception("Diffing map %r (%d) failed", subm.filename, message.id)
+
+    async def _post_map_diff(self, subm: Submission, message: discord.Message):
+        previous = await self.previous_submission(message)
+        if previous is None:
+            return
+
+        summary = await subm.diff(previous)
+        jump = previous.message.jump_url
+        if len(summary) < 1800:
+            await message.reply(f"Changes since {jump}:\n```{summary}```", mention_author=False)
+        else:
+            file = discord.File(io.StringIO(summary), filename="map_diff.txt")  # noqa
+            await message.reply(f"Changes since {jump}, see attached file.", file=file, mention_author=False)
+
     @staticmethod
     async def check_changelog_requirement(message: discord.Message):
         if not message.content and not message.author.bot and len(message.attachments) < 2:
@@ -674,6 +820,7 @@ class MapTesting(commands.Cog):
                 await subm.message.add_reaction("👌")
 
         await upload_submission(self.session, subm)
+        await subm.store()
         log.info(
             "%s approved submission %r in channel #%s", payload.member, subm.filename, channel
         )
@@ -0,0 +1,182 @@
+"""NumPy views of tilemap layer data.
+
+Decodes the tile data of tilemap layers (game, front, tele, speedup, switch, tune and plain tile
+layers) into structured arrays of shape (height, width). The arrays are read-only views over the
+inflated data item, nothing is copied besides the inflation itself.
+"""
+
+import struct
+from dataclasses import dataclass
+from enum import IntFlag
+from typing import List, Optional
+
+import numpy as np
+
+from extensions.map_testing.map_index import ITEM_LAYER, ItemInfo, MapIndex
+
+LAYER_TILEMAP = 2
+
+TILE = np.dtype([("id", "u1"), ("flags", "u1"), ("skip", "u1"), ("reserved", "u1")])
+TELE_TILE = np.dtype([("number", "u1"), ("type", "u1")])
+SPEEDUP_TILE = np.dtype([("force", "u1"), ("max_speed", "u1"), ("type", "u1"), ("reserved", "u1"), ("angle", "<i2")])
+SWITCH_TILE = np.dtype([("number", "u1"), ("type", "u1"), ("flags", "u1"), ("delay", "u1")])
+TUNE_TILE = np.dtype([("number", "u1"), ("type", "u1")])
+
+
+class TilemapFlags(IntFlag):
+    # TILESLAYERFLAG_* in DDNet's mapitems.h
+    TILES = 0
+    GAME = 1
+    TELE = 2
+    SPEEDUP = 4
+    FRONT = 8
+    SWITCH = 16
+    TUNE = 32
+
+
+def decode_i32x3(ints) -> str:
+    """Decodes a name stored as three integers (e.g. layer and group names)."""
+    raw = b"".join(bytes(b ^ 0x80 for b in reversed(struct.pack("<i", i))) for i in ints)
+    return raw.split(b"\0", 1)[0].decode("utf-8", errors="replace")
+
+
+@dataclass(slots=True)
+class TilemapLayer:
+    """
+    A tilemap layer item and the data items holding its tiles.
+
+    Attributes:
+        item: The layer item.
+        version: Tilemap layer version.
+        width: Width in tiles.
+        height: Height in tiles.
+        flags: Kind of the layer (game, tele, ... or plain tiles).
+        name: Layer name.
+        image: Index of the image used by plain tile layers, or None.
+        data_index: Data item of the regular tiles.
+        special_index: Data item of the layer specific tiles (tele, speedup, front, switch, tune), or None.
+    """
+    item: ItemInfo
+    version: int
+    width: int
+    height: int
+    flags: TilemapFlags
+    name: str
+    image: Optional[int]
+    data_index: int
+    special_index: Optional[int]
+
+    @property
+    def shape(self) -> tuple:
+        return self.height, self.width
+
+    @property
+    def special_dtype(self) -> Optional[np.dtype]:
+        if TilemapFlags.TELE in self.flags:
+            return TELE_TILE
+        if TilemapFlags.SPEEDUP in self.flags:
+            return SPEEDUP_TILE
+        if TilemapFlags.FRONT in self.flags:
+            return TILE
+        if TilemapFlags.SWITCH in self.flags:
+            return SWITCH_TILE
+        if TilemapFlags.TUNE in self.flags:
+            return TUNE_TILE
+        return None
+
+    @property
+    def kind(self) -> str:
+        for flag in (TilemapFlags.GAME, TilemapFlags.TELE, TilemapFlags.SPEEDUP,
+                     TilemapFlags.FRONT, TilemapFlags.SWITCH, TilemapFlags.TUNE):
+            if flag in self.flags:
+                return flag.name.lower()
+        return "tiles"
+
+
+def _optional(value: Optional[int]) -> Optional[int]:
+    return None if value is None or value < 0 else value
+
+
+def tilemap_layers(index: MapIndex) -> List[TilemapLayer]:
+    """Returns every tilemap layer of the map in file order."""
+    layers = []
+    for item in index.items_of(ITEM_LAYER):
+        # unused version, layer type, layer flags, then the tilemap layer fields
+        if item.get(1) != LAYER_TILEMAP:
+            continue
+        flags = TilemapFlags(item.get(6, 0))
+        special_index = None
+        for flag, field in ((TilemapFlags.TELE, 18), (TilemapFlags.SPEEDUP, 19), (TilemapFlags.FRONT, 20),
+                            (TilemapFlags.SWITCH, 21), (TilemapFlags.TUNE, 22)):
+            if flag in flags:
+                special_index = _optional(item.get(field))
+                break
+        layers.append(TilemapLayer(
+            item=item,
+            version=item.get(3),
+            width=item.get(4),
+            height=item.get(5),
+            flags=flags,
+            name=decode_i32x3(item.fields[15:18]) if len(item.fields) >= 18 else "",
+            image=_optional(item.get(13)),
+            data_index=item.get(14),
+            special_index=special_index,
+        ))
+    return layers
+
+
+def _view(data: bytes, dtype: np.dtype, layer: TilemapLayer) -> np.ndarray:
+    count = layer.width * layer.height
+    if len(data) < count * dtype.itemsize:
+        raise ValueError(
+            f"Layer {layer.name!r} has {len(data)} bytes of tile data, expected {count * dtype.itemsize}"
+        )
+    return np.frombuffer(data, dtype=dtype, count=count).reshape(layer.shape)
+
+
+def tiles(index: MapIndex, layer: TilemapLayer) -> np.ndarray:
+    """
+    Decodes the regular tiles of a layer.
+
+    Tilemap version 4 layers (0.7 maps) store runs of equal tiles only once, using the skip
+    field as run length. Those are expanded, which is the only case that allocates a new array.
+
+    Returns:
+        Read-only structured array of dtype TILE and shape (height, width).
+    """
+    data = index.inflate(layer.data_index)
+    count = layer.width * layer.height
+    if layer.version >= 4 and len(data) < count * TILE.itemsize:
+        runs = np.frombuffer(data, dtype=TILE, count=len(data) // TILE.itemsize)
+        expanded = np.repeat(runs, runs["skip"].astype(np.intp) + 1)
+        if len(expanded) < count:
+            raise ValueError(f"Layer {layer.name!r} has {len(expanded)} tiles, expected {count}")
+        expanded = expanded[:count]
+        expanded["skip"] = 0
+        expanded.flags.writeable = False
+        return expanded.reshape(layer.shape)
+    return _view(data, TILE, layer)
+
+
+def special_tiles(index: MapIndex, layer: TilemapLayer) -> Optional[np.ndarray]:
+    """
+    Decodes the layer specific tiles of a tele, speedup, front, switch or tune layer.
+
+    Returns:
+        Read-only structured array of shape (height, width) with the matching dtype
+        (TELE_TILE, SPEEDUP_TILE, TILE, SWITCH_TILE or TUNE_TILE), or None for other layers.
+    """
+    dtype = layer.special_dtype
+    if dtype is None or layer.special_index is None:
+        return None
+    return _view(index.inflate(layer.special_index), dtype, layer)
+
+
+def tile_histogram(array: np.ndarray, field: str = "id") -> np.ndarray:
+    """Counts how often every tile ID (0-255) occurs in a decoded layer."""
+    return np.bincount(array[field].ravel(), minlength=256)
+
+
+def tile_positions(array: np.ndarray, tile_ids, field: str = "id") -> np.ndarray:
+    """Returns the (y, x) positions of every tile whose ID is in `tile_ids`."""
+    return np.argwhere(np.isin(array[field], list(tile_ids)))
@@ -3,8 +3,10 @@ import discord
 from typing import Union, Any, Optional
 
 from extensions.map_testing.embeds import DebugEmbed
+from extensions.map_testing.submission import Submission
 from constants import Channels, Roles, Webhooks
 from utils.checks import has_map
+from utils.process_pool import Priority
 
 from typing import TYPE_CHECKING
 
@@ -12,11 +14,24 @@ if TYPE_CHECKING:
     from extensions.map_testing.map_channel import MapChannel
 
 
-async def get_unoptimized_map(map_channel: "MapChannel"):
-    pins = await map_channel.pins()
-    return next(
-        (pin for pin in pins if not pin.author.bot and has_map(pin)), None
-    )
+async def latest_submission(channel: Union[discord.TextChannel, "MapChannel"]) -> Optional[Submission]:
+    """Returns the newest pinned map of a channel.
+
+    The pins decide which map that is, so unpinned or deleted uploads are never used. Only the
+    map itself is read from the local version store, it is downloaded (and stored) if it isn't
+    there yet.
+
+    Args:
+        channel: The map channel.
+    """
+    pins = await channel.pins()
+    pin = next((pin for pin in pins if has_map(pin)), None)
+    if pin is None:
+        return None
+
+    subm = Submission(pin)
+    await subm.store(uploaded=True)
+    return subm
 
 
 def by_releases_webhook(message: discord.Message) -> bool:
@@ -91,7 +106,8 @@ async def debug_check(subm: Any, msg_type: Union[discord.Message, discord.Intera
     Returns:
         bool: True if debug output was sent, False if there was no output.
     """
-    debug_output = await subm.debug_map()
+    priority = Priority.INTERACTIVE if isinstance(msg_type, discord.Interaction) else Priority.BACKGROUND
+    debug_output = await subm.debug_map(priority=priority)
 
     if not debug_output:
         return False
@@ -0,0 +1,258 @@
+import asyncio
+import dataclasses
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from extensions.map_testing.analysis_cache import map_digest
+
+log = logging.getLogger("mt")
+
+
+@dataclass(slots=True)
+class MapVersion:
+    """
+    One version of a map posted in a map channel.
+
+    Attributes:
+        digest: SHA-256 of the map, the name of its blob in the store.
+        message_id: The message the map is attached to.
+        filename: Filename of the attachment.
+        size: Map size in bytes.
+        by_bot: Whether the bot posted it, e.g. an optimized version.
+        uploaded: Whether this version was uploaded to ddnet.org (and pinned).
+        added_at: Unix timestamp of when the version was stored.
+    """
+    digest: str
+    message_id: int
+    filename: str
+    size: int
+    by_bot: bool = False
+    uploaded: bool = False
+    added_at: float = 0.0
+
+
+class MapVersionStore:
+    """Local, content-addressed store of every map version posted in map channels.
+
+    Blobs are stored once per SHA-256 under `root/blobs`, an index maps every map channel to its
+    versions in upload order. Commands read maps from here instead of downloading attachments or
+    fetching pins again. A channel's versions are dropped when the channel is archived or deleted,
+    together with every blob no other channel refers to.
+
+    Args:
+        root: Directory of the store.
+    """
+
+    INDEX = "index.json"
+
+    def __init__(self, root: str = "data/map-testing/versions"):
+        self.root = root
+        self.reads = 0
+        self.writes = 0
+
+        self._lock = threading.Lock()
+        self._channels: Optional[Dict[int, List[MapVersion]]] = None
+        self._messages: Dict[int, MapVersion] = {}
+
+    def __repr__(self):
+        channels = len(self._channels) if self._channels is not None else "?"
+        return f"<MapVersionStore root={self.root!r} channels={channels} versions={len(self._messages)}>"
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, "blobs", digest[:2], f"{digest}.map")
+
+    # Disk backend. These run in the default executor.
+
+    def _load(self) -> Dict[int, List[MapVersion]]:
+        if self._channels is not None:
+            return self._channels
+
+        try:
+            with open(os.path.join(self.root, self.INDEX), encoding="utf-8") as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            raw = {}
+        except (OSError, ValueError) as e:
+            log.error("Failed reading the map version index, starting empty: %r", e)
+            raw = {}
+
+        self._channels = {
+            int(channel_id): [MapVersion(**version) for version in versions]
+            for channel_id, versions in raw.items()
+        }
+        self._messages = {v.message_id: v for versions in self._channels.values() for v in versions}
+        return self._channels
+
+    def _index(self) -> Dict[int, List[MapVersion]]:
+        with self._lock:
+            return self._load()
+
+    def _save(self):
+        raw = {
+            str(channel_id): [dataclasses.asdict(v) for v in versions]
+            for channel_id, versions in self._channels.items()
+        }
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, self.INDEX)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(raw, f)
+        os.replace(f"{path}.tmp", path)
+
+    def _add(self, channel_id: int, version: MapVersion, data: bytes) -> MapVersion:
+        with self._lock:
+            channels = self._load()
+            if (existing := self._messages.get(version.message_id)) is not None:
+                return existing
+
+            path = self._blob_path(version.digest)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(f"{path}.tmp", "wb") as f:
+                    f.write(data)
+                os.replace(f"{path}.tmp", path)
+                self.writes += 1
+
+            channels.setdefault(channel_id, []).append(version)
+            self._messages[version.message_id] = version
+            self._save()
+            return version
+
+    def _read(self, digest: str) -> Optional[bytes]:
+        try:
+            with open(self._blob_path(digest), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        self.reads += 1
+        return data
+
+    def _mark_uploaded(self, message_id: int):
+        with self._lock:
+            self._load()
+            version = self._messages.get(message_id)
+            if version is None or version.uploaded:
+                return
+            version.uploaded = True
+            self._save()
+
+    def _drop_channel(self, channel_id: int) -> int:
+        with self._lock:
+            channels = self._load()
+            versions = channels.pop(channel_id, None)
+            if versions is None:
+                return 0
+
+            referenced = {v.digest for other in channels.values() for v in other}
+            removed = 0
+            for version in versions:
+                self._messages.pop(version.message_id, None)
+                if version.digest in referenced:
+                    continue
+                referenced.add(version.digest)  # duplicates within the channel
+                try:
+                    os.remove(self._blob_path(version.digest))
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+            self._save()
+            return removed
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def add(
+            self, channel_id: int, message_id: int, filename: str, data: bytes, *, by_bot: bool = False,
+            uploaded: bool = False, digest: Optional[str] = None
+    ) -> Optional[MapVersion]:
+        """|coro|
+        Stores a map version. Adding the same message twice is a no-op.
+
+        Args:
+            channel_id: The map channel the version was posted in.
+            message_id: The message the map is attached to.
+            filename: Filename of the attachment.
+            data: The map.
+            by_bot: Whether the bot posted the map.
+            uploaded: Whether the map was uploaded to ddnet.org.
+            digest: SHA-256 of `data`, if already known.
+
+        Returns:
+            The stored version, or None if it couldn't be written.
+        """
+        version = MapVersion(
+            digest=digest or map_digest(data),
+            message_id=message_id,
+            filename=filename,
+            size=len(data),
+            by_bot=by_bot,
+            uploaded=uploaded,
+            added_at=time.time(),
+        )
+        try:
+            return await self._run(self._add, channel_id, version, data)
+        except OSError as e:
+            log.warning("Storing map version %r (%d) failed: %r", filename, message_id, e)
+            return None
+
+    async def mark_uploaded(self, message_id: int):
+        """|coro|
+        Marks a stored version as uploaded to ddnet.org.
+        """
+        try:
+            await self._run(self._mark_uploaded, message_id)
+        except OSError as e:
+            log.warning("Updating map version %d failed: %r", message_id, e)
+
+    async def read(self, digest: str) -> Optional[bytes]:
+        """|coro|
+        Returns the map with the given SHA-256, or None if it isn't stored.
+        """
+        try:
+            return await self._run(self._read, digest)
+        except OSError as e:
+            log.warning("Reading map version %s failed: %r", digest, e)
+            return None
+
+    async def read_message(self, message_id: int) -> Optional[bytes]:
+        """|coro|
+        Returns the map attached to a message, or None if it isn't stored.
+        """
+        await self._run(self._index)
+        version = self._messages.get(message_id)
+        return await self.read(version.digest) if version is not None else None
+
+    async def versions(self, channel_id: int) -> List[MapVersion]:
+        """|coro|
+        Returns the versions of a map channel, oldest first.
+        """
+        channels = await self._run(self._index)
+        return list(channels.get(channel_id, []))
+
+    async def drop_channel(self, channel_id: int):
+        """|coro|
+        Forgets every version of a map channel and deletes blobs no other channel refers to.
+        """
+        try:
+            removed = await self._run(self._drop_channel, channel_id)
+        except OSError as e:
+            log.warning("Dropping map versions of channel %d failed: %r", channel_id, e)
+            return
+        if removed:
+            log.info("Removed %d stored map versions of channel %d", removed, channel_id)
+
+    def summary(self) -> str:
+        channels = len(self._channels) if self._channels is not None else 0
+        size = sum(v.size for v in {v.digest: v for v in self._messages.values()}.values())
+        return (
+            f"channels={channels} versions={len(self._messages)} size={size / 1024 / 1024:.1f} MiB "
+            f"reads={self.reads} writes={self.writes}"
+        )
+
+
+# Shared by every submission.
+map_versions = MapVersionStore()
@@ -1,6 +1,8 @@
+import asyncio
 import datetime as dtt
 from datetime import datetime
-from requests import ReadTimeout
+
+import aiohttp
 import discord
 from discord import app_commands
 from discord.ext import commands
@@ -47,11 +49,11 @@ class Profile(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    def source(self, url, timeout: int = 20):
+    async def source(self, url, timeout: int = 20):
         try:
-            resp = self.bot.request_cache.get(url, timeout=timeout)
-            return resp.json() if resp.status_code == 200 else None
-        except ReadTimeout:
+            resp = await self.bot.request_cache.get(url, timeout=timeout)
+            return resp.json() if resp.status == 200 else None
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
             return None
 
     async def map_autocomplete(
@@ -88,7 +90,7 @@ class Profile(commands.Cog):
         await interaction.response.defer(ephemeral=True, thinking=True)  # noqa
 
         player = player or interaction.user.display_name
-        json_data = self.source(f"https://ddnet.org/players/?json2={player}", 30)
+        json_data = await self.source(f"https://ddnet.org/players/?json2={player}", 30)
 
         if not json_data:
             await interaction.followup.send(content=f"`{player}` does not exist.")
@@ -136,7 +138,7 @@ class Profile(commands.Cog):
             if player in data:
                 continue
 
-            json_data = self.source(f"https://ddnet.org/players/?json2={player}", 5)
+            json_data = await self.source(f"https://ddnet.org/players/?json2={player}", 5)
 
             if json_data is not None:
                 try:
@@ -212,7 +214,7 @@ class Profile(commands.Cog):
     async def map(self, interaction: discord.Interaction, name: str):
         await interaction.response.defer(ephemeral=True, thinking=True)  # noqa
 
-        json_data = self.source(f"https://ddnet.org/maps/?json={name}")
+        json_data = await self.source(f"https://ddnet.org/maps/?json={name}")
         result = {}
 
         if json_data:
@@ -1,15 +1,15 @@
+import asyncio
 import re
 import contextlib
 import time
 from collections import defaultdict
 
-from requests_cache import CachedSession
+import aiohttp
 import discord
 from discord.ext import commands
 import datetime
 
 from constants import Guilds, Roles, Channels
-from utils.conn import source
 from utils.misc import flag
 from .views.links import ButtonLinks
 from .embeds import ServerInfoEmbed
@@ -17,8 +17,7 @@ from .embeds import ServerInfoEmbed
 from utils.text import extract_address
 from utils.checks import is_staff
 
-# If the bot is running into KeyErrors, use /clear_cache to clear the sqlite cache the bot uses.
-session = CachedSession(cache_name="data/cache", expire_after=60 * 60 * 2)
+INFO_URL = "https://info.ddnet.org/info"
 
 
 def parse_community_info(resp):
@@ -76,18 +75,27 @@ def find_server_info_by_icon(resp, addr, community_info):
     return None
 
 
-def fetch_server_info(addr):
+async def fetch_server_info(cache, addr):
     """
     Retrieve information about a server based on its address.
 
+    If the bot is running into KeyErrors, use /clear_cache to clear the HTTP cache the bot uses.
+
     Args:
+    - cache: The bot's HTTPCache.
     - addr: The address of the server to fetch information for.
 
     Returns:
     - A dictionary containing server information, or an empty dictionary if no information is found.
     """
 
-    resp = source("https://info.ddnet.org/info", session=session)
+    try:
+        resp = await cache.get_json(INFO_URL)
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+        resp = None
+    if not resp:
+        return {}
+
     community_info = parse_community_info(resp)
 
     server_info = find_server_info_by_type(resp, addr, community_info, "servers")
@@ -125,7 +133,7 @@ class AutoMod(commands.Cog):
         Returns:
             Tuple[discord.Embed, Optional[ButtonLinks], Optional[str]]: The embed to display, an optional view, and the network name if available.
         """
-        info = fetch_server_info(addr)
+        info = await fetch_server_info(self.bot.request_cache, addr)
 
         if not info:
             embed = ServerInfoEmbed.from_server_info(
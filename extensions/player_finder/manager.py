@@ -1,4 +1,6 @@
+import heapq
 import ipaddress
+import itertools
 import json
 from dataclasses import dataclass
 from datetime import datetime
@@ -33,11 +35,61 @@ class Player:
 
 
 class PlayerfinderManager:
+    """
+    The playerfinder watchlist, mirrored from the discordbot_playerfinder table.
+
+    Players are stored by name. A min-heap of (expiry_date, seq, name) entries makes expiry
+    only touch players that are actually due. Heap entries are never removed in place; entries
+    whose player is gone or whose expiry date changed are dropped when they reach the top.
+    """
+
     def __init__(self, bot):
         self.bot = bot
-        self.players = []
+        self._players: dict[str, Player] = {}
+        self._expiry: list[tuple[datetime, int, str]] = []
+        self._seq = itertools.count()
+        # Bumped on every change to the watchlist, lets consumers skip work when nothing changed.
+        self.revision = 0
+
+    def __len__(self) -> int:
+        return len(self._players)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._players
+
+    @property
+    def players(self) -> list[Player]:
+        return list(self._players.values())
+
+    def _schedule(self, player: Player):
+        heapq.heappush(self._expiry, (player.expiry_date, next(self._seq), player.name))
+        # Compact once stale entries dominate the heap.
+        if len(self._expiry) > 2 * len(self._players) + 64:
+            self._expiry = [
+                (p.expiry_date, next(self._seq), p.name) for p in self._players.values()
+            ]
+            heapq.heapify(self._expiry)
+
+    def _is_current(self, entry: tuple[datetime, int, str]) -> Optional[Player]:
+        expiry_date, _, name = entry
+        player = self._players.get(name)
+        if player is None or player.expiry_date != expiry_date:
+            return None
+        return player
+
+    def next_expiry(self) -> Optional[datetime]:
+        """Returns the earliest expiry date on the watchlist, or None if it is empty."""
+        while self._expiry and self._is_current(self._expiry[0]) is None:
+            heapq.heappop(self._expiry)
+        return self._expiry[0][0] if self._expiry else None
 
     async def load_players(self):
+        """|coro|
+        Replaces the watchlist with the rows of discordbot_playerfinder.
+
+        Players removed from the table since the last load (e.g. while the overseer was stopped)
+        are dropped as well.
+        """
         query = """
                 SELECT name,
                        expiry_date,
@@ -48,12 +100,13 @@ class PlayerfinderManager:
                 """
         rows = await self.bot.fetch(query, fetchall=True)
 
-        for row in rows:
-            name, expiry_date, added_by, reason, link = row
-            player = Player(
-                name=name, expiry_date=expiry_date, added_by=added_by, reason=reason, ban_link=link
-            )
-            self.players.append(player)
+        self._players = {
+            name: Player(name=name, expiry_date=expiry_date, added_by=added_by, reason=reason, ban_link=link)
+            for name, expiry_date, added_by, reason, link in rows
+        }
+        self._expiry = [(p.expiry_date, next(self._seq), p.name) for p in self._players.values()]
+        heapq.heapify(self._expiry)
+        self.revision += 1
 
     async def add(self, player: Player):
         query = """
@@ -72,7 +125,9 @@ class PlayerfinderManager:
         await self.bot.upsert(
             query, player.name, player.expiry_date, str(player.added_by), player.reason, player.ban_link
         )
-        self.players.append(player)
+        self._players[player.name] = player
+        self._schedule(player)
+        self.revision += 1
 
     async def delete(self, player: Player):
         query = """
@@ -81,7 +136,8 @@ class PlayerfinderManager:
                 WHERE name = %s \
                 """
         await self.bot.upsert(query, player.name)
-        self.players.remove(player)
+        self._players.pop(player.name, None)
+        self.revision += 1
 
     async def update(self, player: Player):
         # Update the player in the database
@@ -104,11 +160,14 @@ class PlayerfinderManager:
             player.name
         )
 
-        if player := self.find_player(player.name):
-            player.expiry_date = player.expiry_date
-            player.added_by = player.added_by
-            player.reason = player.reason
-            player.ban_link = player.ban_link
+        if (existing := self.find_player(player.name)) and existing is not player:
+            existing.expiry_date = player.expiry_date
+            existing.added_by = player.added_by
+            existing.reason = player.reason
+            existing.ban_link = player.ban_link
+        if existing is not None:
+            self._schedule(existing)
+        self.revision += 1
 
     async def add_player(
             self,
@@ -131,8 +190,30 @@ class PlayerfinderManager:
                 raise ValueError(f"No player found with name '{original_name}'")
         await self.delete(player)
 
-    def find_player(self, name) -> Player:
-        return next((player for player in self.players if player.name == name), None)
+    def find_player(self, name) -> Optional[Player]:
+        return self._players.get(name)
+
+    async def del_expired(self, now: datetime) -> list[Player]:
+        """|coro|
+        Deletes every player whose expiry date lies before `now`.
+
+        If a deletion fails, the player stays scheduled and is retried on the next call.
+
+        Args:
+            now: Naive datetime to compare expiry dates against.
+
+        Returns:
+            The deleted players.
+        """
+        removed = []
+        while self._expiry and self._expiry[0][0] < now:
+            player = self._is_current(self._expiry[0])
+            if player is None:
+                heapq.heappop(self._expiry)
+                continue
+            await self.delete(player)
+            removed.append(player)
+        return removed
 
     async def edit_reason(self, name, reason) -> tuple[str, Player]:
         player = self.find_player(name)
@@ -1,8 +1,11 @@
 import asyncio
 import contextlib
+import hashlib
 import logging
 import os
 import re
+import time
+from dataclasses import dataclass
 from datetime import datetime
 import discord
 from discord import app_commands
@@ -10,15 +13,25 @@ from discord.ext import commands, tasks
 
 from .manager import Player
 from constants import Guilds, Channels, Roles
-from utils.master_parser import Server, Client, fetch_master_list, find_servers_by_community
+from utils.master_diff import MasterDiff, diff_servers, server_key
+from utils.master_parser import Server, Client, MasterList, find_servers_by_community
 from utils.text import choice_to_datetime, to_discord_timestamp
 from utils.checks import is_staff
 from utils.misc import duration, name_filter
-from .utils import filter, players, group_players_by_server
+from .utils import servers_of_player
 from .layoutview import PlayerfinderView
+from .scheduler import AdaptiveInterval
 
 log = logging.getLogger()
 
+ALLOWED_GAMEMODES = {
+    "DDraceNetwork", "Test", "Tutorial",
+    "Block", "Infection", "iCTF",
+    "gCTF", "Vanilla", "zCatch",
+    "TeeWare", "TeeSmash", "Foot",
+    "xPanic", "Monster",
+}
+
 BAN_RE = (
     r"(?P<author>\w+) banned (?P<banned_user>.+?) `(?P<IP>\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})` "
     r"for `(?P<reason>.+?)` until (?P<timestamp>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})"
@@ -29,6 +42,24 @@ UNBAN_RE = (
 )
 
 
+@dataclass(slots=True)
+class EditStats:
+    """
+    Counters for playerfinder message updates.
+
+    Attributes:
+        sent: Pages that were sent or edited.
+        skipped: Pages left alone because their content did not change.
+        deferred: Changed pages held back by the minimum edit interval.
+    """
+    sent: int = 0
+    skipped: int = 0
+    deferred: int = 0
+
+    def __str__(self) -> str:
+        return f"sent={self.sent} skipped={self.skipped} deferred={self.deferred}"
+
+
 def predicate(interaction: discord.Interaction) -> bool:
     return interaction.channel.id == Channels.PLAYERFINDER and is_staff(
         interaction.user, roles=[Roles.ADMIN, Roles.DISCORD_MODERATOR, Roles.MODERATOR]
@@ -38,93 +69,184 @@ def predicate(interaction: discord.Interaction) -> bool:
 class Overseer(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.session = None
-        self.master_url = "https://master1.ddnet.org/ddnet/15/servers.json"
         self.info_url = "https://info.ddnet.org/info"
         self.manager = bot.pfm
+        self.interval = AdaptiveInterval(fast=10.0, slow=60.0)
         self.overseer.start()
         self.players_online: dict[str, list[tuple[Server, Client]]] = {}
-        self.ddnet_servers_addresses = []
+        self.ddnet_servers: list[Server] = []
+        self.ddnet_servers_addresses: set[str] = set()
+        self.last_diff: MasterDiff | None = None
+        self.snapshot_version = 0
+
+        # (manager revision, watched (name, server) pairs) of the last rendered playerfinder state
+        self._watched_state: tuple[int, frozenset[tuple[str, str]]] | None = None
 
         # new: multi-message tracking
-        self.page_cache: dict[int, str] = {}
+        # message index -> digest of the full rendered content (page + copycat panel)
+        self.page_cache: dict[int, bytes] = {}
+        self.last_edit: dict[int, float] = {}
+        self.pending_edits: set[int] = set()
+        self.edit_stats = EditStats()
+        self.min_edit_interval = bot.config.getfloat("PLAYERFINDER", "MIN_EDIT_INTERVAL", fallback=30.0)
         self.playerfinder_messages: list[discord.Message] = []
 
-    async def cog_load(self):
-        self.session = await self.bot.session_manager.get_session(self.__class__.__name__)
-
     async def cog_unload(self) -> None:
         self.overseer.cancel()
         await self.clean_up()
-        await self.bot.session_manager.close_session(self.__class__.__name__)
 
     async def clean_up(self) -> None:
         channel = self.bot.get_channel(Channels.PLAYERFINDER)
         await channel.purge()
+        self.reset_messages()
+
+    def reset_messages(self):
         self.playerfinder_messages.clear()
         self.page_cache.clear()
+        self.last_edit.clear()
+        self.pending_edits.clear()
+        self._watched_state = None
+
+    async def get_master_data(self) -> MasterDiff | None:
+        """|coro|
+        Fetches the master list and applies the changes since the last tick to players_online.
 
-    async def get_master_data(self):
+        Returns:
+            The diff against the previous snapshot, or None if the fetch failed.
+        """
         try:
-            if self.session is None:
-                log.warning("Playerfinder: session not initialized yet")
-                return
-            master = await fetch_master_list(self.session)
+            # Half the fast interval: every tick sees a new list, /find in between reuses it.
+            snapshot = await self.bot.master_snapshot.get(max_age=self.interval.fast / 2)
         except Exception as e:
             log.warning("Playerfinder fetch failed: %r", e)
-            return
+            return None
 
-        ALLOWED_GAMEMODES = {
-            "DDraceNetwork", "Test", "Tutorial",
-            "Block", "Infection", "iCTF",
-            "gCTF", "Vanilla", "zCatch",
-            "TeeWare", "TeeSmash", "Foot",
-            "xPanic", "Monster",
-        }
+        if snapshot.version == self.snapshot_version:
+            return MasterDiff()
+        self.snapshot_version = snapshot.version
+        master = snapshot.master
 
         ddnet_servers = [
             s for s in find_servers_by_community(master, "ddnet")
             if s.info.game_type in ALLOWED_GAMEMODES
         ]
 
-        for server in ddnet_servers:
-            self.ddnet_servers_addresses.append(server.normalized_address)
+        diff = diff_servers(self.ddnet_servers, ddnet_servers)
+        self.ddnet_servers = ddnet_servers
+        self.ddnet_servers_addresses = {addr for s in ddnet_servers for addr in s.normalized_addresses}
+        self.apply_diff(master, diff)
+        self.last_diff = diff
+        return diff
 
-        new_players: dict[str, list[tuple[Server, Client]]] = {}
+    def apply_diff(self, master: MasterList, diff: MasterDiff):
+        """
+        Updates players_online for the players touched by the diff.
 
-        for server in ddnet_servers:
-            for client in server.info.clients:
-                new_players.setdefault(client.name, []).append((server, client))
+        Players that joined or left a server are looked up again. The entries of everyone else
+        are re-pointed at the Server and Client objects of the new snapshot, so a server's info
+        (map, player count, ...) is never older than the last tick.
+        """
+        names = diff.changed_players
+
+        keys = {server_key(s) for s in self.ddnet_servers}
+        for name in names:
+            entries = [
+                (server, client)
+                for server, client in master.index.players.get(name.casefold(), ())
+                if client.name == name and server_key(server) in keys
+            ]
+            if entries:
+                self.players_online[name] = entries
+            else:
+                self.players_online.pop(name, None)
 
-        self.players_online = new_players
+        addresses = master.index.addresses
+        for name, entries in self.players_online.items():
+            if name not in names:
+                self.players_online[name] = [self._repoint(addresses, name, entry) for entry in entries]
+
+    @staticmethod
+    def _repoint(addresses: dict[str, Server], name: str, entry: tuple[Server, Client]) -> tuple[Server, Client]:
+        server, client = entry
+        current = addresses.get(server_key(server))
+        if current is None or current is server:
+            return entry
+        return current, next((c for c in current.info.clients if c.name == name), client)
+
+    def watched_state(self) -> tuple[int, frozenset[tuple[str, str]]]:
+        """Everything the playerfinder page depends on besides the static player details."""
+        watched = frozenset(
+            (name, server_key(server))
+            for name, entries in self.players_online.items()
+            if name in self.manager and not name_filter(name)
+            for server, _ in entries
+        )
+        return self.manager.revision, watched
 
     async def del_expired_bans(self):
-        now = datetime.now().replace(tzinfo=None)
-        expired = [p for p in self.manager.players if p.expiry_date < now]
-        for player in expired:
-            await self.manager.del_player(player)
+        await self.manager.del_expired(datetime.now().replace(tzinfo=None))
 
-    @tasks.loop(seconds=10)
-    async def overseer(self):
+    async def tick(self) -> tuple[int, frozenset[tuple[str, str]]] | None:
+        """|coro|
+        One Overseer pass. Returns the watched state, or None if the master list was unavailable.
+        """
         await self.del_expired_bans()
-        await self.get_master_data()
+        if await self.get_master_data() is None:
+            return None
+
+        state = self.watched_state()
+        if state == self._watched_state and not self.pending_edits:
+            return state
+        self._watched_state = state
 
         copycat_cog = self.bot.get_cog("Copycat")
         if copycat_cog is not None:
             await copycat_cog.detect_copycats()
 
         await self.playerfinder()
+        return state
+
+    @tasks.loop(seconds=10)
+    async def overseer(self):
+        state = None
+        try:
+            state = await self.tick()
+        finally:
+            # tasks.loop only schedules the next iteration once this one returned,
+            # so ticks never overlap no matter how short the interval gets.
+            delay = self.interval.next(active=bool(state and state[1]), watching=len(self.manager) > 0)
+            self.overseer.change_interval(seconds=delay)
 
     @overseer.before_loop
     async def before_overseer(self):
         await self.bot.wait_until_ready()
         pf_channel = self.bot.get_channel(Channels.PLAYERFINDER)
         await pf_channel.purge()
-        self.playerfinder_messages.clear()
-        self.page_cache.clear()
+        self.reset_messages()
+        self.interval.reset()
         await self.manager.load_players()
 
+    @staticmethod
+    def page_digest(page_content: str, copycat_summary: str) -> bytes:
+        return hashlib.blake2b(
+            f"{page_content}\0{copycat_summary}".encode(), digest_size=16
+        ).digest()
+
+    @staticmethod
+    def build_view(page_content: str, copycat_summary: str) -> PlayerfinderView:
+        view = PlayerfinderView()
+        view.container.children[0].content = page_content
+        view.container.children[2].content = copycat_summary
+        return view
+
     async def playerfinder(self):
+        """|coro|
+        Brings the playerfinder messages in line with the current pages.
+
+        Messages whose content digest did not change are not touched at all. Changed messages
+        are edited at most once per `min_edit_interval` seconds, held back edits are flushed on
+        a later tick.
+        """
         pages = self.build_pages()
         channel = self.bot.get_channel(Channels.PLAYERFINDER)
 
@@ -136,52 +258,44 @@ class Overseer(commands.Cog):
             copycat_summary = "*Copycat detection unavailable.*"
 
         desired_count = len(pages)
-        current_count = len(self.playerfinder_messages)
-
-        if current_count > desired_count:
+        if len(self.playerfinder_messages) > desired_count:
             for msg in self.playerfinder_messages[desired_count:]:
                 with contextlib.suppress(discord.NotFound, discord.HTTPException):
                     await msg.delete()
             del self.playerfinder_messages[desired_count:]
-            self.page_cache.clear()
-
-        for index in range(min(current_count, desired_count)):
-            msg = self.playerfinder_messages[index]
-            page_content = pages[index]
-
-            if self.page_cache.get(index) == page_content:
-                # content for first TextDisplay is unchanged; still update the copycat panel
-                view = PlayerfinderView()
-                view.container.children[0].content = page_content
-                view.container.children[2].content = copycat_summary
+            for index in [i for i in self.page_cache if i >= desired_count]:
+                self.page_cache.pop(index)
+                self.last_edit.pop(index, None)
+            self.pending_edits = {i for i in self.pending_edits if i < desired_count}
+
+        now = time.monotonic()
+        for index, page_content in enumerate(pages):
+            digest = self.page_digest(page_content, copycat_summary)
+
+            if index < len(self.playerfinder_messages):
+                if self.page_cache.get(index) == digest:
+                    self.edit_stats.skipped += 1
+                    self.pending_edits.discard(index)
+                    continue
+
+                if now - self.last_edit.get(index, float("-inf")) < self.min_edit_interval:
+                    self.edit_stats.deferred += 1
+                    self.pending_edits.add(index)
+                    continue
+
+                view = self.build_view(page_content, copycat_summary)
                 try:
-                    await msg.edit(view=view)
+                    await self.playerfinder_messages[index].edit(view=view)
                 except discord.NotFound:
-                    sent = await channel.send(view=view)
-                    self.playerfinder_messages[index] = sent
-                continue
-
-            view = PlayerfinderView()
-            view.container.children[0].content = page_content
-            view.container.children[2].content = copycat_summary
-
-            try:
-                await msg.edit(view=view)
-            except discord.NotFound:
-                sent = await channel.send(view=view)
-                self.playerfinder_messages[index] = sent
-            finally:
-                self.page_cache[index] = page_content
-
-        for index in range(current_count, desired_count):
-            page_content = pages[index]
-            view = PlayerfinderView()
-            view.container.children[0].content = page_content
-            view.container.children[2].content = copycat_summary
-
-            sent = await channel.send(view=view)
-            self.playerfinder_messages.append(sent)
-            self.page_cache[index] = page_content
+                    self.playerfinder_messages[index] = await channel.send(view=view)
+            else:
+                view = self.build_view(page_content, copycat_summary)
+                self.playerfinder_messages.append(await channel.send(view=view))
+
+            self.edit_stats.sent += 1
+            self.page_cache[index] = digest
+            self.last_edit[index] = now
+            self.pending_edits.discard(index)
 
     def author_label(self, player: "Player") -> str:
         # I tried muting @mentions, but doesn't seem to work with ui.containers yet
@@ -253,6 +367,17 @@ class Overseer(commands.Cog):
 
         return pages
 
+    def wake_up(self):
+        """
+        Drops back to the fast interval, e.g. after a player was added to the watchlist.
+
+        A sleeping overseer runs its next tick at most `fast` seconds after its last one instead
+        of waiting out a backed off delay.
+        """
+        self.interval.reset()
+        if self.overseer.is_running():
+            self.overseer.change_interval(seconds=self.interval.fast)
+
     @commands.Cog.listener('on_message')
     async def bans_listener(self, message: discord.Message) -> None:
         if message.channel.id != Channels.BANS:
@@ -268,6 +393,7 @@ class Overseer(commands.Cog):
                 reason=regex["reason"],
                 link=message.jump_url
             )
+            self.wake_up()
 
         if regex := re.match(UNBAN_RE, message.content):
             await self.manager.del_player(regex["name"])
@@ -317,6 +443,7 @@ class Overseer(commands.Cog):
         except ValueError as e:
             await interaction.followup.send(str(e))
             return
+        self.wake_up()
         try:
             await interaction.followup.send(
                 f"Added: `{player.name}` "
@@ -427,9 +554,14 @@ class PlayerFinder(Overseer):
     async def search_player(self, interaction: discord.Interaction, name: str):
         await interaction.response.defer(ephemeral=True, thinking=True)  # noqa
 
-        players_dict = await players(self.bot.session, self.master_url)
-        if name in players_dict:
-            player_info = players_dict[name]
+        try:
+            snapshot = await self.bot.master_snapshot.get()
+        except Exception as e:
+            log.warning("/find: master list unavailable: %r", e)
+            await interaction.followup.send("The server list is currently unavailable, please try again later.")
+            return
+
+        if player_info := servers_of_player(snapshot.master, name):
             message = (
                 f'Found {len(player_info)} server(s) with "{name}" currently playing:\n'
             )
@@ -0,0 +1,61 @@
+import random
+import time
+
+
+class AdaptiveInterval:
+    """Picks the delay until the next Overseer tick.
+
+    Stays at `fast` while a watched player is online. Once nobody watched has been seen for
+    `idle_after` seconds (or the watchlist is empty), the delay grows by `factor` per tick up to
+    `slow`. Seeing a watched player again snaps it back to `fast`. Every delay is jittered by
+    +/- `jitter` so the polls do not line up with other periodic work.
+
+    Args:
+        fast: Delay in seconds while watched players are online.
+        slow: Upper bound for the delay while idle.
+        factor: Growth factor per idle tick.
+        idle_after: Seconds without a watched player online before backing off.
+        jitter: Relative jitter applied to every delay, e.g. 0.1 for +/- 10%.
+    """
+
+    def __init__(
+            self,
+            fast: float = 10.0,
+            slow: float = 60.0,
+            factor: float = 1.5,
+            idle_after: float = 300.0,
+            jitter: float = 0.1,
+    ):
+        self.fast = fast
+        self.slow = slow
+        self.factor = factor
+        self.idle_after = idle_after
+        self.jitter = jitter
+
+        self.current = fast
+        self.last_active = time.monotonic()
+
+    def __repr__(self):
+        return f"<AdaptiveInterval current={self.current:.1f}s fast={self.fast}s slow={self.slow}s>"
+
+    def reset(self):
+        self.current = self.fast
+        self.last_active = time.monotonic()
+
+    def next(self, *, active: bool, watching: bool = True) -> float:
+        """
+        Args:
+            active: Whether a watched player is online right now.
+            watching: Whether the watchlist has any entries at all.
+
+        Returns:
+            The jittered delay in seconds until the next tick.
+        """
+        now = time.monotonic()
+        if active:
+            self.current = self.fast
+            self.last_active = now
+        elif not watching or now - self.last_active >= self.idle_after:
+            self.current = min(self.slow, self.current * self.factor)
+
+        return self.current * random.uniform(1 - self.jitter, 1 + self.jitter)
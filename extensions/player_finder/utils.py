@@ -1,63 +1,27 @@
-import re
-from collections import defaultdict
+from typing import Optional
 
+from utils.master_parser import MasterList, Server
 
-async def group_players_by_server(session, url) -> dict:
-    resp = await session.get(url)
-    data = await resp.json()
 
-    server_players = defaultdict(list)
-    for server in data["servers"]:
-        addresses = [format_address(addr) for addr in server["addresses"] if format_address(addr)]
-        names = [p["name"] for p in server["info"].get("clients", [])]
-        for address in addresses:
-            server_players[address].extend(names)
-    return server_players
+def _connect_address(server: Server) -> Optional[str]:
+    """Returns one address of a server to connect to, the IPv4 one if there is any."""
+    addresses = server.normalized_addresses
+    return next((address for address in addresses if not address.startswith("[")), None) or server.normalized_address
 
 
-async def filter(session, url) -> list:
-    gamemodes = [
-        "DDNet", "Test", "Tutorial",
-        "Block", "Infection", "iCTF",
-        "gCTF", "Vanilla", "zCatch",
-        "TeeWare", "TeeSmash", "Foot",
-        "xPanic", "Monster",
-    ]
-    resp = await session.get(url)
-    data = await resp.json()
-    servers = data.get("servers", [])
-    ddnet_ips = []
-    for entry in servers:
-        sv_list = entry.get("servers")
-        for mode in gamemodes:
-            server_lists = sv_list.get(mode)
-            if server_lists is not None:
-                ddnet_ips += server_lists
-    return ddnet_ips
-
-
-def format_address(address):
-    if address_match := re.match(r"tw-0.6\+udp://([\d.]+):(\d+)", address):
-        ip, port = address_match.groups()
-        return f"{ip}:{port}"
-    return None
+def servers_of_player(master: MasterList, name: str) -> list[tuple[str, str]]:
+    """
+    Looks up the servers a player is currently on.
 
+    Args:
+        master: The snapshot to search.
+        name: The exact player name.
 
-async def players(session, url) -> dict:
-    resp = await session.get(url)
-    data = await resp.json()
-    players = defaultdict(list)
-
-    for server in data["servers"]:
-        server_addresses = []
-        for address in server["addresses"]:
-            fmt_addr = format_address(address)
-            if fmt_addr is not None:
-                server_addresses.append(fmt_addr)
-        if "clients" in server["info"]:
-            for player in server["info"]["clients"]:
-                for address in server_addresses:
-                    players[player["name"]].append(
-                        (server["info"]["name"], address)
-                    )
-    return players
\ No newline at end of file
+    Returns:
+        (server name, normalized address) for every server the player is on, one entry per server.
+    """
+    return [
+        (server.info.name, address)
+        for server, client in master.index.players.get(name.casefold(), ())
+        if client.name == name and (address := _connect_address(server))
+    ]
@@ -1,5 +1,6 @@
 import asyncio
 import contextlib
+import functools
 import logging
 from io import BytesIO
 from datetime import datetime, timezone, timedelta
@@ -23,6 +24,7 @@ from .checks import (
 from constants import Guilds, Channels, Roles, Emojis
 from utils.image import skin_renderer
 from utils.checks import is_staff
+from utils.misc import maybe_coroutine
 
 log = logging.getLogger("skin_submits")
 
@@ -130,7 +132,7 @@ class SkinDB(commands.Cog):
                 (check_attachment_amount, "check_attachment_amount"),
                 (check_name_length, "skin_name_too_long"),
                 (check_latin_letters, "skin_name_latin_letters_only"),
-                (check_dupl_name, "skin_name_taken"),
+                (functools.partial(check_dupl_name, cache=self.bot.request_cache), "skin_name_taken"),
                 (check_license, "license_missing_or_invalid")
             ]
 
@@ -140,7 +142,7 @@ class SkinDB(commands.Cog):
                     if not is_valid:
                         error_messages.append(f"{ERROR_MAP[error_mapping_key][0]}\n`{dim}`")
                         log_errors.append(ERROR_MAP[error_mapping_key][1])
-                elif not check_func(message):
+                elif not await maybe_coroutine(check_func, message):
                     error_messages.append(ERROR_MAP[error_mapping_key][0].format(Channels=Channels))  # noqa
                     log_errors.append(ERROR_MAP[error_mapping_key][1])
 
@@ -1,12 +1,14 @@
+import asyncio
 import re
 import logging
 from io import BytesIO
 from typing import Tuple, Optional
 
+import aiohttp
 import discord
-import requests
 from PIL import Image
 
+SKINS_URL = "https://skins.ddnet.org/skin/skins.json"
 
 REGEX = re.compile(r"^\"(?P<skin_name>.+)\" by (?P<user_name>.+) (\((?P<license>.{3,8})\))$", re.IGNORECASE,)
 NAME_REGEX = re.compile(r"^[a-zA-Z0-9 _-]+$")
@@ -61,21 +63,22 @@ def check_name_length(message: discord.Message) -> bool:
     re_match = REGEX.match(message.content)
     return len(re_match["skin_name"].encode("utf8")) < 23
 
-def check_dupl_name(message: discord.Message) -> bool:
+async def check_dupl_name(message: discord.Message, cache) -> bool:
     re_match = REGEX.match(message.content)
     skin_name = re_match["skin_name"]
     try:
-        response = requests.get("https://skins.ddnet.org/skin/skins.json")
-        response.raise_for_status()
-        skin_data = response.json()
+        skin_data = await cache.get_json(SKINS_URL)
+        if skin_data is None:
+            logging.error("Error fetching skins data: bad status code")
+            return False
         names_in_use = {skin["name"].lower() for skin in skin_data["skins"]}
 
         if skin_name.lower() in names_in_use:
             return False
         else:
             return True
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Error fetching skins data: {e}")
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+        logging.error(f"Error fetching skins data: {e!r}")
         return False
 
 
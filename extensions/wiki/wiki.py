@@ -1,3 +1,4 @@
+import asyncio
 import contextlib
 import difflib
 import json
@@ -8,7 +9,6 @@ from datetime import datetime
 
 import aiohttp
 import discord
-import requests
 from discord.ext import commands, tasks
 
 from constants import Channels
@@ -55,7 +55,7 @@ class Wiki(commands.Cog):
         else:
             return f"[`{title}`]({link})"
 
-    def fetch_article_content(self, pageid):
+    async def fetch_article_content(self, pageid):
         params = {
             "action": "parse",
             "format": "json",
@@ -65,25 +65,27 @@ class Wiki(commands.Cog):
         headers = {"User-Agent": "DDNetDiscordBot/1.0 (+https://ddnet.org/)"}
 
         try:
-            response = self.bot.request_cache.get(WIKI_API, params=params, headers=headers)
-            response.raise_for_status()
+            response = await self.bot.request_cache.get(WIKI_API, params=params, headers=headers)
+            if not response.ok:
+                logging.error("Error fetching article content: status code %d", response.status)
+                return ""
             data = response.json()
             # print(data.get('parse', {}).get('wikitext', {}).get('*'))
             return data.get("parse", {}).get("wikitext").get("*")
-        except requests.RequestException as e:
-            logging.error("Error fetching article content:", e)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.error("Error fetching article content: %r", e)
             return ""
 
-    def wiki_search(self, keyword, max_articles=5, max_sections_per_article=2):
+    async def wiki_search(self, keyword, max_articles=5, max_sections_per_article=2):
         keywords = keyword.split()
-        articles = self.search_articles(keyword)
+        articles = await self.search_articles(keyword)
         if not articles:
             return "No articles found."
 
         response_lines = []
 
         for article in articles[:max_articles]:
-            content = self.fetch_article_content(article["pageid"])
+            content = await self.fetch_article_content(article["pageid"])
             sections = self.find_sections_with_keywords(content, keywords)
 
             for section in sections[:max_sections_per_article]:
@@ -92,7 +94,7 @@ class Wiki(commands.Cog):
 
         return "\n".join(response_lines) if response_lines else "No matching sections found."
 
-    def search_articles(self, keyword):
+    async def search_articles(self, keyword):
         params = {
             "action": "query",
             "format": "json",
@@ -103,10 +105,9 @@ class Wiki(commands.Cog):
         headers = {"User-Agent": "DDNetDiscordBot/1.0 (+https://ddnet.org/)"}
 
         try:
-            response = self.bot.request_cache.get(WIKI_API, params=params, headers=headers)
-            response.raise_for_status()
+            response = await self.bot.request_cache.get(WIKI_API, params=params, headers=headers)
 
-            if response.status_code == 200:
+            if response.status == 200:
                 data = response.json()
                 if "error" in data:
                     raise ValueError(f"Wiki API Error: {data['error'].get('info', 'Unknown error')}")
@@ -114,9 +115,9 @@ class Wiki(commands.Cog):
                 articles = data.get("query", {}).get("search", [])
                 return [article for article in articles if "/" not in article["title"]]
 
-            raise ValueError(f"Unexpected status code from Wiki API: {response.status_code}")
+            raise ValueError(f"Unexpected status code from Wiki API: {response.status}")
 
-        except requests.RequestException as e:
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             raise ValueError(f"Failed to fetch articles: {e}") from e
 
     @commands.command(
@@ -133,7 +134,7 @@ class Wiki(commands.Cog):
             return
 
         try:
-            resp = self.wiki_search(search_query, max_articles=5, max_sections_per_article=3)
+            resp = await self.wiki_search(search_query, max_articles=5, max_sections_per_article=3)
             embed = discord.Embed(description=resp, colour=discord.Colour.blurple())
         except ValueError as e:
             embed = discord.Embed(
@@ -8,7 +8,6 @@ from typing import Optional
 import traceback
 
 import aiohttp
-from requests_cache import CachedSession
 import asyncmy
 import discord
 from discord import Intents
@@ -20,6 +19,8 @@ from extensions.ticketsystem.manager import TicketManager
 from extensions.player_finder.manager import PlayerfinderManager
 from extensions.moderator.manager import ModeratorDB
 from extensions.help import HelpCommand
+from utils.http_cache import HTTPCache
+from utils.master_snapshot import MasterSnapshotStore
 
 config = ConfigParser()
 config.read("config.ini")
@@ -73,7 +74,8 @@ class DDNet(commands.Bot):
         session: The current session for managing user interactions.
         ticket_manager: An instance of the TicketManager for handling tickets.
         pfm: An instance of the PlayerfinderManager for managing player-related queries.
-        request_cache: A cached session for storing requests.
+        request_cache: A non-blocking HTTP client with an on-disk response cache.
+        master_snapshot: The latest parsed master list, shared by every consumer.
         session_manager: An instance of the SessionManager for managing sessions.
         synced: A flag indicating whether the bot's commands have been synced.
     """
@@ -92,17 +94,27 @@ class DDNet(commands.Bot):
         self.ticket_manager = TicketManager(self)
         self.pfm = PlayerfinderManager(self)
         self.moddb = ModeratorDB(self)
-        self.request_cache = CachedSession(
-            cache_name="data/cache", backend="sqlite", expire_after=60 * 60 * 2
-        )
         self.session_manager = SessionManager()
+        self.request_cache = HTTPCache(
+            self.session_manager,
+            path="data/http_cache.sqlite",
+            expire_after=60 * 60 * 2,
+            urls_expire_after={
+                "ddnet.org/players/*": 60 * 10,
+                "ddnet.org/maps/*": 60 * 60,
+                "skins.ddnet.org/skin/skins.json": 60 * 10,
+                "info.ddnet.org/info": 60 * 60 * 2,
+                "wiki.ddnet.org/*": 60 * 60 * 2,
+            },
+        )
+        self.master_snapshot = MasterSnapshotStore(self.session_manager, ttl=30)
         self.synced = False
 
     async def close(self):
         """Closes the bot and releases all resources."""
 
         log.info("Closing")
-        self.request_cache.close()
+        await self.request_cache.close()
         for session in self.session_manager.sessions.values():
             await session.close()
         if self.pool is not None:
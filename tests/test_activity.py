@@ -0,0 +1,70 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+from extensions.map_testing.activity import ActivityIndex
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def test_touch_and_releases(tmp_path):
+    path = tmp_path / "activity.json"
+
+    async def run():
+        index = ActivityIndex(str(path), save_delay=60)
+        index.touch(1, NOW)
+        index.touch(1, NOW - timedelta(days=1))  # older messages never move it back
+        index.add_release(1, NOW - timedelta(days=2))
+        assert index.last_activity(1) == NOW
+        assert index.last_activity(2) is None
+        assert index.released_since(1, NOW - timedelta(days=3))
+        assert not index.released_since(1, NOW - timedelta(days=1))
+        assert not index.released_since(2, NOW - timedelta(days=3))
+
+        # Nothing is written before the save delay or a flush.
+        assert not path.exists()
+        await index.flush()
+        assert json.loads(path.read_text())["last_activity"] == {"1": NOW.timestamp()}
+
+        reloaded = ActivityIndex(str(path))
+        reloaded.touch(1, NOW + timedelta(hours=1))
+        reloaded.touch(2, NOW - timedelta(hours=1))
+        await reloaded.load()
+        await reloaded.flush()
+        assert reloaded.loaded_from_disk
+        assert reloaded.last_activity(1) == NOW + timedelta(hours=1)
+        assert reloaded.last_activity(2) == NOW - timedelta(hours=1)
+        assert reloaded.released_since(1, NOW - timedelta(days=3))
+
+    asyncio.run(run())
+
+
+def test_changes_are_batched(tmp_path):
+    path = tmp_path / "activity.json"
+
+    async def run():
+        index = ActivityIndex(str(path), save_delay=0.05)
+        for hours in range(5):
+            index.touch(1, NOW + timedelta(hours=hours))
+        index.forget(2)
+        index.touch(3, NOW)
+        index.forget(3)
+        await asyncio.sleep(0.2)
+        assert json.loads(path.read_text()) == {
+            "last_activity": {"1": (NOW + timedelta(hours=4)).timestamp()}, "releases": {}
+        }
+
+    asyncio.run(run())
+
+
+def test_corrupt_file_starts_empty(tmp_path):
+    path = tmp_path / "activity.json"
+    path.write_text("{not json")
+
+    async def run():
+        index = ActivityIndex(str(path))
+        await index.load()
+        assert not index.loaded_from_disk
+        assert index.last_activity(1) is None
+
+    asyncio.run(run())
@@ -0,0 +1,72 @@
+import asyncio
+import json
+import os
+
+import aiohttp
+from aiohttp import web
+
+from extensions.map_testing import asset_archive
+from extensions.map_testing.asset_archive import AssetArchiver
+from utils.conn import UploadError
+
+
+def test_archive(tmp_path, monkeypatch):
+    requests = []
+    uploads = []
+    upload_statuses = {"emoji/bad.png": [400], "avatar/busy.png": [429, None]}
+
+    async def handler(request):
+        requests.append(request.path)
+        if request.path == "/flaky.png" and requests.count("/flaky.png") == 1:
+            return web.Response(status=503)
+        if request.path == "/gone.png":
+            return web.Response(status=404)
+        return web.Response(body=request.path.encode())
+
+    async def fake_upload(_session, asset_type, buf, filename):
+        key = f"{asset_type}/{filename}"
+        if status := (upload_statuses.get(key) or [None]).pop(0):
+            raise UploadError("rejected", status)
+        uploads.append((key, buf.read()))
+
+    monkeypatch.setattr(asset_archive, "ddnet_upload", fake_upload)
+    root = str(tmp_path / "testlog")
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/{name}", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        base = f"http://127.0.0.1:{runner.addresses[0][1]}"
+        assets = {
+            "avatar": {"a.png": f"{base}/shared.png", "busy.png": f"{base}/busy.png"},
+            "emoji": {"e.png": f"{base}/shared.png", "bad.png": f"{base}/bad.png"},
+            "attachment": {"f.png": f"{base}/flaky.png", "g.png": f"{base}/gone.png"},
+        }
+        try:
+            async with aiohttp.ClientSession() as session:
+                first = AssetArchiver(session, root, backoff=0)
+                ok = await first.archive(assets)
+                uploaded = len(uploads)
+                # A second run reads the local copies and skips what ddnet.org already has.
+                second = AssetArchiver(session, root, backoff=0)
+                await second.archive(assets)
+        finally:
+            await runner.cleanup()
+        return ok, uploaded, first.stats, second.stats
+
+    ok, uploaded, first, second = asyncio.run(run())
+
+    assert not ok
+    # Every URL is fetched once, the 503 is retried, the 404 is not.
+    assert sorted(requests[:6]) == ["/bad.png", "/busy.png", "/flaky.png", "/flaky.png", "/gone.png", "/shared.png"]
+    assert sorted(key for key, _ in uploads[:uploaded]) == ["attachment/f.png", "avatar/a.png", "avatar/busy.png", "emoji/e.png"]
+    assert (first.assets, first.fetched, first.uploaded, first.failed) == (6, 5, 4, 2)
+    assert os.path.exists(os.path.join(root, "assets", "emojis", "e.png"))
+
+    assert requests[6:] == ["/gone.png"]
+    assert (second.cached, second.skipped, second.uploaded) == (5, 4, 1)
+    assert [key for key, _ in uploads[uploaded:]] == ["emoji/bad.png"]
+    with open(os.path.join(root, AssetArchiver.LEDGER), encoding="utf-8") as f:
+        assert len(json.load(f)) == 5
@@ -0,0 +1,51 @@
+import asyncio
+
+import aiohttp
+from aiohttp import web
+
+from utils.http_cache import HTTPCache
+from utils.singleflight import SingleFlight
+
+
+class Sessions:
+    def __init__(self):
+        self.session = None
+
+    async def get_session(self, _name: str) -> aiohttp.ClientSession:
+        if self.session is None:
+            self.session = aiohttp.ClientSession()
+        return self.session
+
+
+def test_stale_entry_on_server_error(tmp_path):
+    statuses = [200, 503]
+
+    async def handler(_request):
+        return web.Response(status=statuses.pop(0), body=b'{"points": 1}')
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        url = f"http://127.0.0.1:{runner.addresses[0][1]}/"
+
+        sessions = Sessions()
+        cache = HTTPCache(sessions, path=str(tmp_path / "cache.sqlite"), flight=SingleFlight())
+        try:
+            first = await cache.get(url, expire_after=0)
+            second = await cache.get(url, expire_after=0)
+        finally:
+            await cache.close()
+            await sessions.session.close()
+            await runner.cleanup()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first.status == 200 and not first.from_cache
+    assert second.status == 200 and second.from_cache
+    assert second.json() == {"points": 1}
+    # the copy served to the second caller must not change what the first one holds
+    assert second is not first
@@ -0,0 +1,92 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+from tests.twmap_fixture import build_map
+from extensions.map_testing import submission
+from extensions.map_testing.analysis_cache import AnalysisCache
+from extensions.map_testing.map_diff import diff_map_bytes
+from extensions.map_testing.submission import Submission
+from extensions.map_testing.version_store import MapVersionStore
+
+
+class FakeAttachment:
+    def __init__(self, filename: str, data: bytes = b""):
+        self.filename = filename
+        self.data = data
+
+    async def read(self) -> bytes:
+        return self.data
+
+
+class FakeChannel:
+    id = 1
+
+    def __init__(self):
+        self.messages = {}
+
+    def get_partial_message(self, message_id: int):
+        # like discord.PartialMessage: no author, no attachments
+        return SimpleNamespace(id=message_id, fetch=lambda: self._fetch(message_id))
+
+    async def _fetch(self, message_id: int):
+        return self.messages[message_id]
+
+
+def fake_message(message_id: int, channel: FakeChannel, filename: str, data: bytes = b""):
+    message = SimpleNamespace(
+        id=message_id,
+        author=SimpleNamespace(bot=False),
+        channel=channel,
+        attachments=[FakeAttachment(filename, data)],
+    )
+    channel.messages[message_id] = message
+    return message
+
+
+def test_special_layers():
+    old = build_map(images=0, sounds=0, tiles=(20, 10), special_layers=("tele", "switch"))
+    new = build_map(images=0, sounds=0, tiles=(20, 10), special_layers=("tele", "switch", "tune"), seed=1)
+    changes = {(change.kind, change.name): change for change in diff_map_bytes(old, new).changes}
+
+    assert changes[("layer", "Game/Tune [tune]")].status == "added"
+    assert changes[("layer", "Game/Tele [tele]")].detail == "19 tiles changed"
+    assert changes[("layer", "Game/Switch [switch]")].detail == "19 tiles changed"
+
+
+def test_diff_against_stored_version(tmp_path, monkeypatch):
+    store = MapVersionStore(str(tmp_path / "versions"))
+    monkeypatch.setattr(submission, "map_versions", store)
+    monkeypatch.setattr(submission, "analysis_cache", AnalysisCache(str(tmp_path / "cache")))
+
+    old = build_map(images=2, image_size=16, sounds=0, tiles=(20, 10))
+    new = build_map(images=3, image_size=16, sounds=0, tiles=(20, 10))
+    channel = FakeChannel()
+
+    async def run():
+        version = await store.add(channel.id, 10, "test.map", old)
+        previous = Submission.from_version(channel, version)
+        subm = Submission(fake_message(11, channel, "test.map"), raw_bytes=new)
+        return await subm.diff(previous)
+
+    summary = asyncio.run(run())
+    assert "image_2" in summary
+
+
+def test_stored_version_without_blob(tmp_path, monkeypatch):
+    store = MapVersionStore(str(tmp_path / "versions"))
+    monkeypatch.setattr(submission, "map_versions", store)
+
+    data = build_map(images=1, image_size=16, sounds=0, tiles=(20, 10))
+    channel = FakeChannel()
+    message = fake_message(10, channel, "test.map", data)
+
+    async def run():
+        version = await store.add(channel.id, message.id, "test.map", data)
+        os.remove(store._blob_path(version.digest))
+        subm = Submission.from_version(channel, version)
+        return subm, (await subm.buffer()).getvalue()
+
+    subm, buffered = asyncio.run(run())
+    assert buffered == data
+    assert subm.message is message and subm.author is message.author
@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+
+from utils.master_diff import diff_servers
+from utils.master_parser import parse_master
+from extensions.player_finder.overseer import Overseer
+
+
+def snapshot(*servers):
+    """servers: (port, map name, [client names])"""
+    return parse_master({"servers": [
+        {
+            "addresses": [f"tw-0.6+udp://10.0.0.1:{port}", f"tw-0.6+udp://[2001:db8::1]:{port}"],
+            "community": "ddnet",
+            "info": {
+                "name": f"srv {port}",
+                "game_type": "DDraceNetwork",
+                "map": {"name": map_name},
+                "clients": [{"name": name} for name in clients],
+            },
+        }
+        for port, map_name, clients in servers
+    ]})
+
+
+def test_unchanged():
+    old = snapshot((8303, "Kobra", ["a", "b"]))
+    new = snapshot((8303, "Kobra", ["a", "b"]))
+    assert not diff_servers(old.servers, new.servers)
+
+
+def test_first_tick():
+    new = snapshot((8303, "Kobra", ["a", "b"]))
+    diff = diff_servers([], new.servers)
+    assert [e.server for e in diff.appeared] == new.servers
+    assert diff.changed_players == {"a", "b"}
+    assert not diff.left
+
+
+def test_players_and_maps():
+    old = snapshot((8303, "Kobra", ["a", "b"]), (8304, "Tsunami", ["c"]), (8305, "Gold Mine", ["d"]))
+    new = snapshot((8303, "Kobra", ["b", "e"]), (8304, "Multeasymap", ["c"]), (8306, "Stronghold", ["f"]))
+    diff = diff_servers(old.servers, new.servers)
+
+    assert {(e.name, e.server.info.name) for e in diff.joined} == {("e", "srv 8303"), ("f", "srv 8306")}
+    assert {(e.name, e.server.info.name) for e in diff.left} == {("a", "srv 8303"), ("d", "srv 8305")}
+    assert [e.server.info.name for e in diff.appeared] == ["srv 8306"]
+    assert [e.server.info.name for e in diff.vanished] == ["srv 8305"]
+    assert [(e.old_map, e.new_map) for e in diff.map_changed] == [("Tsunami", "Multeasymap")]
+
+
+def test_player_moves():
+    old = snapshot((8303, "Kobra", ["a"]), (8304, "Kobra", []))
+    new = snapshot((8303, "Kobra", []), (8304, "Kobra", ["a"]))
+    diff = diff_servers(old.servers, new.servers)
+    assert [(e.name, e.server.info.name) for e in diff.left] == [("a", "srv 8303")]
+    assert [(e.name, e.server.info.name) for e in diff.joined] == [("a", "srv 8304")]
+
+
+def apply(overseer, master):
+    diff = diff_servers(overseer.ddnet_servers, master.servers)
+    overseer.ddnet_servers = master.servers
+    Overseer.apply_diff(overseer, master, diff)
+
+
+def test_apply_diff_repoints_unchanged_players():
+    overseer = SimpleNamespace(ddnet_servers=[], players_online={}, _repoint=Overseer._repoint)
+    apply(overseer, snapshot((8303, "Kobra", ["a"]), (8304, "Tsunami", ["b"])))
+    assert set(overseer.players_online) == {"a", "b"}
+
+    # Nobody joined or left, only the server info changed.
+    master = snapshot((8303, "Kobra", ["a", "c"]), (8304, "Tsunami", ["b"]))
+    apply(overseer, master)
+    assert set(overseer.players_online) == {"a", "b", "c"}
+    for name, entries in overseer.players_online.items():
+        [(server, client)] = entries
+        assert server in master.servers
+        assert client in server.info.clients and client.name == name
+
+    apply(overseer, snapshot((8303, "Kobra", ["c"])))
+    assert set(overseer.players_online) == {"c"}
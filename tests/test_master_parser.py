@@ -0,0 +1,80 @@
+import asyncio
+import time
+from collections import defaultdict
+
+import aiohttp
+from aiohttp import web
+
+from utils import master_parser
+from utils.master_parser import EndpointStats, fetch_master_list, order_endpoints
+
+SERVERS_JSON = b'{"servers": [{"addresses": ["tw-0.6+udp://10.0.0.1:8303"], "info": {"name": "srv", "clients": []}}]}'
+
+
+async def serve(routes: dict) -> web.AppRunner:
+    app = web.Application()
+    for path, handler in routes.items():
+        app.router.add_get(path, handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    return runner
+
+
+def base_url(runner: web.AppRunner) -> str:
+    return f"http://127.0.0.1:{runner.addresses[0][1]}"
+
+
+async def slow(_request):
+    await asyncio.sleep(2)
+    return web.Response(body=SERVERS_JSON)
+
+
+async def failing(_request):
+    return web.Response(status=503)
+
+
+async def fast(_request):
+    return web.Response(body=SERVERS_JSON)
+
+
+def fetch(primary_path: str, hedge_after: float, monkeypatch):
+    monkeypatch.setattr(master_parser, "endpoint_stats", defaultdict(EndpointStats))
+
+    async def run():
+        primary = await serve({"/slow": slow, "/fail": failing})
+        backup = await serve({"/servers.json": fast})
+        urls = (base_url(primary) + primary_path, base_url(backup) + "/servers.json")
+        try:
+            async with aiohttp.ClientSession() as session:
+                start = time.perf_counter()
+                master = await fetch_master_list(session, urls=urls, hedge_after=hedge_after)
+                return urls, master, time.perf_counter() - start
+        finally:
+            await primary.cleanup()
+            await backup.cleanup()
+
+    return asyncio.run(run())
+
+
+def test_hedged_request_wins(monkeypatch):
+    (slow_url, fast_url), master, elapsed = fetch("/slow", 0.1, monkeypatch)
+
+    assert [server.info.name for server in master.servers] == ["srv"]
+    assert elapsed < 1
+    stats = master_parser.endpoint_stats
+    assert stats[fast_url].successes == 1
+    # the slow request was cancelled, not counted as an error
+    assert stats[slow_url].errors == 0
+    assert order_endpoints([slow_url, fast_url]) == [fast_url, slow_url]
+
+
+def test_failing_endpoint_is_replaced_at_once(monkeypatch):
+    (failing_url, fast_url), master, elapsed = fetch("/fail", 5, monkeypatch)
+
+    assert len(master.servers) == 1
+    assert elapsed < 1
+    stats = master_parser.endpoint_stats
+    assert stats[failing_url].consecutive_errors == 1
+    assert stats[fast_url].successes == 1
+    assert order_endpoints([failing_url, fast_url]) == [fast_url, failing_url]
@@ -0,0 +1,43 @@
+import asyncio
+from datetime import datetime
+
+from extensions.player_finder.manager import PlayerfinderManager
+
+
+class FakeBot:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    async def fetch(self, query, fetchall=False):
+        return list(self.rows)
+
+    async def upsert(self, query, *args):
+        self.queries.append(args)
+
+
+def row(name, day):
+    return name, datetime(2026, 1, day), "mod", "reason", None
+
+
+def test_load_players_replaces_watchlist():
+    bot = FakeBot([row("a", 1), row("b", 2)])
+    manager = PlayerfinderManager(bot)
+
+    async def run():
+        await manager.load_players()
+        assert {p.name for p in manager.players} == {"a", "b"}
+        revision = manager.revision
+
+        # "a" was removed from the table in the meantime, "b" got a new expiry date.
+        bot.rows = [row("b", 5), row("c", 3)]
+        await manager.load_players()
+        assert {p.name for p in manager.players} == {"b", "c"}
+        assert manager.revision > revision
+        assert manager.next_expiry() == datetime(2026, 1, 3)
+
+        removed = await manager.del_expired(datetime(2026, 1, 4))
+        assert [p.name for p in removed] == ["c"]
+        assert manager.next_expiry() == datetime(2026, 1, 5)
+
+    asyncio.run(run())
@@ -0,0 +1,116 @@
+import asyncio
+
+from utils.process_pool import Priority, PriorityLimiter, ProcessPool, parse_limits
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_priority_order():
+    async def run():
+        limiter = PriorityLimiter(1)
+        await limiter.acquire()
+        order = []
+
+        async def waiter(name, priority):
+            await limiter.acquire(priority)
+            order.append(name)
+            limiter.release()
+
+        tasks = [
+            asyncio.create_task(waiter("bg1", Priority.BACKGROUND)),
+            asyncio.create_task(waiter("int1", Priority.INTERACTIVE)),
+            asyncio.create_task(waiter("bg2", Priority.BACKGROUND)),
+            asyncio.create_task(waiter("int2", Priority.INTERACTIVE)),
+        ]
+        await settle()
+        limiter.release()
+        await asyncio.gather(*tasks)
+        assert order == ["int1", "int2", "bg1", "bg2"]
+        assert limiter._active == 0
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_is_skipped():
+    async def run():
+        limiter = PriorityLimiter(1)
+        await limiter.acquire()
+        cancelled = asyncio.create_task(limiter.acquire(Priority.INTERACTIVE))
+        waiting = asyncio.create_task(limiter.acquire())
+        await settle()
+        cancelled.cancel()
+        await settle()
+
+        limiter.release()
+        await asyncio.wait_for(waiting, 1)
+        assert limiter._active == 1
+
+    asyncio.run(run())
+
+
+def test_resize_down():
+    async def run():
+        limiter = PriorityLimiter(3)
+        for _ in range(3):
+            await limiter.acquire()
+        waiters = [asyncio.create_task(limiter.acquire()) for _ in range(2)]
+        await settle()
+
+        limiter.resize(1)
+        limiter.release()
+        limiter.release()
+        await settle()
+        # Two holders left, but only one slot: nobody may start yet.
+        assert limiter._active == 1
+        assert not any(w.done() for w in waiters)
+
+        limiter.release()
+        await settle()
+        assert limiter._active == 1
+        assert sum(w.done() for w in waiters) == 1
+
+    asyncio.run(run())
+
+
+def test_resize_up():
+    async def run():
+        limiter = PriorityLimiter(1)
+        await limiter.acquire()
+        waiters = [asyncio.create_task(limiter.acquire()) for _ in range(3)]
+        await settle()
+
+        limiter.resize(3)
+        await settle()
+        assert limiter._active == 3
+        assert sum(w.done() for w in waiters) == 2
+
+    asyncio.run(run())
+
+
+def test_pool_limits_and_stats():
+    async def run():
+        pool = ProcessPool(parse_limits("tool:2"))
+        running = 0
+        peak = 0
+
+        async def job():
+            nonlocal running, peak
+            async with pool.slot("tool"):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*(job() for _ in range(5)))
+        assert peak == 2
+        stats = pool.stats["tool"]
+        assert (stats.runs, stats.running, stats.queued, stats.failures) == (5, 0, 0, 0)
+
+    asyncio.run(run())
+
+
+def test_parse_limits():
+    assert parse_limits("twmap-check: 2, map-render:1,") == {"twmap-check": 2, "map-render": 1}
@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from extensions.player_finder import scheduler
+from extensions.player_finder.scheduler import AdaptiveInterval
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(scheduler.time, "monotonic", clock)
+    return clock
+
+
+def test_backs_off_without_watchlist(clock):
+    interval = AdaptiveInterval(fast=10.0, slow=60.0, factor=2.0, jitter=0)
+    assert [interval.next(active=False, watching=False) for _ in range(4)] == [20.0, 40.0, 60.0, 60.0]
+
+
+def test_backs_off_once_idle(clock):
+    interval = AdaptiveInterval(fast=10.0, slow=60.0, factor=2.0, idle_after=300.0, jitter=0)
+    clock.now += 299
+    assert interval.next(active=False) == 10.0
+    clock.now += 1
+    assert interval.next(active=False) == 20.0
+    assert interval.next(active=False) == 40.0
+
+    assert interval.next(active=True) == 10.0
+    clock.now += 10
+    assert interval.next(active=False) == 10.0
+
+
+def test_reset(clock):
+    interval = AdaptiveInterval(fast=10.0, slow=60.0, factor=2.0, jitter=0)
+    interval.next(active=False, watching=False)
+    interval.reset()
+    assert interval.current == 10.0
+    assert interval.next(active=False) == 10.0
+
+
+def test_jitter_bounds(clock):
+    random.seed(0)
+    interval = AdaptiveInterval(fast=10.0, slow=60.0, jitter=0.1)
+    delays = [interval.next(active=True) for _ in range(1000)]
+    assert all(9.0 <= d <= 11.0 for d in delays)
+    assert min(delays) < 9.5 and max(delays) > 10.5
+
+    delays = [interval.next(active=False, watching=False) for _ in range(1000)][10:]
+    assert all(54.0 <= d <= 66.0 for d in delays)
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from utils.singleflight import SingleFlight
+
+
+def test_concurrent_calls_are_coalesced():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch(url):
+        calls.append(url)
+        await asyncio.sleep(0.01)
+        return url.upper()
+
+    async def run():
+        results = await asyncio.gather(*(flight.do("a", fetch, "a") for _ in range(3)), flight.do("b", fetch, "b"))
+        # Finished calls are not cached, the next caller starts a new one.
+        results.append(await flight.do("a", fetch, "a"))
+        return results
+
+    assert asyncio.run(run()) == ["A", "A", "A", "B", "A"]
+    assert calls == ["a", "b", "a"]
+    stats = flight.stats["default"]
+    assert (stats.calls, stats.merged, stats.errors) == (3, 2, 0)
+    assert not flight._inflight
+
+
+def test_errors_reach_every_waiter():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def run():
+        return await asyncio.gather(*(flight.do("a", fail, label="master") for _ in range(2)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flight.stats["master"].errors == 1
+
+
+def test_cancelled_waiter_keeps_the_call_running():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return 1
+
+    async def run():
+        first = asyncio.create_task(flight.do("a", fetch))
+        second = asyncio.create_task(flight.do("a", fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == 1
+    assert flight.stats["default"].calls == 1
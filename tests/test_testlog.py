@@ -0,0 +1,81 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from extensions.map_testing import log as testlog
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def author(user_id: int):
+    return SimpleNamespace(id=user_id, name=f"user{user_id}", discriminator="0", avatar=None, default_avatar=1)
+
+
+def message(i: int, content: str = "", attachments=()):
+    return SimpleNamespace(
+        author=author(i % 2),
+        content=content,
+        attachments=list(attachments),
+        reactions=[],
+        created_at=START + timedelta(minutes=i),
+    )
+
+
+def attachment(attachment_id: int, filename: str):
+    return SimpleNamespace(id=attachment_id, filename=filename, url=f"https://cdn/{filename}", size=2048)
+
+
+class FakeMapChannel:
+    filename = "Kobra"
+    details = "**Kobra** by **someone**"
+    guild = None
+
+    def __init__(self, messages, fail_after=None):
+        self.messages = messages
+        self.fail_after = fail_after
+
+    async def history(self, limit=None, oldest_first=True):
+        for i, msg in enumerate(self.messages):
+            if i == self.fail_after:
+                raise RuntimeError("connection lost")
+            yield msg
+
+
+@pytest.fixture
+def testlog_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(testlog.TestLog, "DIR", str(tmp_path))
+    # Small enough that the log is written in several chunks.
+    monkeypatch.setattr(testlog.TestLog, "FLUSH_SIZE", 256)
+    return tmp_path
+
+
+def test_streamed_log_is_valid_json(testlog_dir):
+    messages = [message(i, f"message {i}") for i in range(20)]
+    messages.append(message(20, attachments=[attachment(7, "screenshot.png")]))
+    messages.append(message(21, attachments=[attachment(8, "clip.mp4")]))
+
+    log = asyncio.run(testlog.TestLog.from_map_channel(FakeMapChannel(messages)))
+
+    with open(log.path, encoding="utf-8") as f:
+        doc = json.load(f)
+    assert doc["name"] == "Kobra"
+    assert doc["topic"] == "Kobra by someone"
+    assert doc["protocol"] == {"version": testlog.TestLog.VERSION}
+    # The video is left out.
+    assert len(doc["messages"]) == 21
+    assert doc["messages"][3]["content"] == [{"text": [{"text": "message 3"}]}]
+    assert doc["messages"][3]["author"]["name"] == "user1"
+    assert doc["messages"][20]["content"][0]["image"]["id"] == 7
+    assert log.assets["attachment"] == {"7.png": "https://cdn/screenshot.png"}
+    assert not os.path.exists(f"{log.path}.tmp")
+
+
+def test_failed_log_leaves_no_files(testlog_dir):
+    messages = [message(i, f"message {i}") for i in range(20)]
+    with pytest.raises(RuntimeError):
+        asyncio.run(testlog.TestLog.from_map_channel(FakeMapChannel(messages, fail_after=15)))
+    assert os.listdir(testlog_dir / "json") == []
@@ -0,0 +1,29 @@
+from tests.twmap_fixture import build_map
+from extensions.map_testing.map_index import read_map_index
+from extensions.map_testing.tilemap import (
+    SWITCH_TILE,
+    TELE_TILE,
+    TilemapFlags,
+    special_tiles,
+    tilemap_layers,
+    tiles,
+)
+
+
+def test_special_layers():
+    raw = build_map(images=0, sounds=0, tiles=(20, 10), special_layers=("tele", "switch"))
+    index = read_map_index(raw)
+    game, tele, switch = tilemap_layers(index)
+
+    assert (game.kind, tele.kind, switch.kind) == ("game", "tele", "switch")
+    assert tele.flags == TilemapFlags.TELE and switch.flags == TilemapFlags.SWITCH
+    assert special_tiles(index, game) is None
+    assert tiles(index, tele).shape == (10, 20)
+
+    tele_tiles = special_tiles(index, tele)
+    assert tele_tiles.dtype == TELE_TILE and tele_tiles.shape == (10, 20)
+    assert tele_tiles["number"].any()
+
+    switch_tiles = special_tiles(index, switch)
+    assert switch_tiles.dtype == SWITCH_TILE and switch_tiles.shape == (10, 20)
+    assert switch_tiles["number"].any()
@@ -0,0 +1,56 @@
+import asyncio
+import os
+
+from extensions.map_testing.version_store import MapVersionStore
+
+
+def test_add_and_reload(tmp_path):
+    root = str(tmp_path / "versions")
+
+    async def run():
+        store = MapVersionStore(root)
+        first = await store.add(1, 10, "a.map", b"v1")
+        assert await store.add(1, 10, "a.map", b"v1") is first
+        await store.add(1, 11, "a.map", b"v2", by_bot=True)
+        await store.mark_uploaded(10)
+        assert store.writes == 2
+
+        reloaded = MapVersionStore(root)
+        versions = await reloaded.versions(1)
+        assert [(v.message_id, v.uploaded, v.by_bot) for v in versions] == [(10, True, False), (11, False, True)]
+        assert await reloaded.read_message(11) == b"v2"
+        assert await reloaded.read_message(12) is None
+        assert await reloaded.versions(2) == []
+
+    asyncio.run(run())
+
+
+def test_blobs_are_shared_between_channels(tmp_path):
+    async def run():
+        store = MapVersionStore(str(tmp_path / "versions"))
+        shared = await store.add(1, 10, "a.map", b"same")
+        await store.add(2, 20, "b.map", b"same")
+        own = await store.add(1, 11, "a.map", b"only in 1")
+        assert store.writes == 2
+
+        await store.drop_channel(1)
+        assert await store.versions(1) == []
+        assert await store.read_message(10) is None
+        assert not os.path.exists(store._blob_path(own.digest))
+        assert await store.read(shared.digest) == b"same"
+        assert await store.read_message(20) == b"same"
+
+    asyncio.run(run())
+
+
+def test_corrupt_index_starts_empty(tmp_path):
+    root = tmp_path / "versions"
+    root.mkdir()
+    (root / MapVersionStore.INDEX).write_text("{not json")
+
+    async def run():
+        store = MapVersionStore(str(root))
+        assert await store.versions(1) == []
+        assert await store.add(1, 10, "a.map", b"v1") is not None
+
+    asyncio.run(run())
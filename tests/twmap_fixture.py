@@ -0,0 +1,150 @@
+# Builds synthetic datafile v4 maps for the tests and the map benchmarks.
+#
+# The maps contain a version item, images and sounds with names, one group and a game layer,
+# optionally followed by special layers (tele, speedup, front, switch, tune).
+# Image pixels are partially random so they compress roughly like real mapres.
+
+import random
+import struct
+import zlib
+from typing import List, Tuple
+
+ITEM_VERSION = 0
+ITEM_IMAGE = 2
+ITEM_GROUP = 4
+ITEM_LAYER = 5
+ITEM_SOUND = 7
+
+# layer flag and tile size of the special layers, their data index follows the layer name
+SPECIAL_LAYERS = {
+    "tele": (2, 2),
+    "speedup": (4, 6),
+    "front": (8, 4),
+    "switch": (16, 4),
+    "tune": (32, 2),
+}
+
+
+def i32x3(name: str) -> List[int]:
+    raw = name.encode()[:11].ljust(12, b"\0")
+    ints = []
+    for i in range(0, 12, 4):
+        chunk = bytes(b ^ 0x80 for b in reversed(raw[i:i + 4]))
+        ints.append(struct.unpack("<i", chunk)[0])
+    return ints
+
+
+def pixels(width: int, height: int, rng: random.Random) -> bytes:
+    # Rows of random noise mixed with flat rows.
+    row = width * 4
+    out = bytearray()
+    for y in range(height):
+        if y % 4 == 0:
+            out += rng.randbytes(row)
+        else:
+            out += bytes([y % 256, 0, 0, 255]) * width
+    return bytes(out)
+
+
+def build_map(
+        images: int = 20,
+        image_size: int = 512,
+        sounds: int = 4,
+        sound_bytes: int = 256 * 1024,
+        tiles: Tuple[int, int] = (500, 300),
+        seed: int = 0,
+        special_layers: Tuple[str, ...] = (),
+) -> bytes:
+    rng = random.Random(seed)
+    items: List[Tuple[int, int, List[int]]] = []
+    data: List[bytes] = []
+
+    def add_data(blob: bytes) -> int:
+        data.append(blob)
+        return len(data) - 1
+
+    items.append((ITEM_VERSION, 0, [1]))
+
+    for i in range(images):
+        name = add_data(f"image_{i}\0".encode())
+        pixels_index = add_data(pixels(image_size, image_size, rng))
+        items.append((ITEM_IMAGE, i, [1, image_size, image_size, 0, name, pixels_index]))
+
+    for i in range(sounds):
+        name = add_data(f"sound_{i}\0".encode())
+        blob = add_data(rng.randbytes(sound_bytes // 2) + bytes(sound_bytes // 2))
+        items.append((ITEM_SOUND, i, [1, 0, name, blob]))
+
+    width, height = tiles
+    tile_data = bytearray(width * height * 4)
+    for t in range(0, width * height, 7):
+        tile_data[t * 4] = 1 + rng.randrange(3)
+    game_tiles = add_data(bytes(tile_data))
+
+    num_layers = 1 + len(special_layers)
+    items.append((ITEM_GROUP, 0, [3, 0, 0, 100, 100, 0, num_layers, 0, 0, 0, 0, 0, *i32x3("Game")]))
+    items.append((
+        ITEM_LAYER, 0,
+        [0, 2, 0,  # unused version, tilemap, flags
+         3, width, height, 1,  # version, width, height, game
+         255, 255, 255, 255,  # color
+         -1, 0, -1,  # color envelope, offset, image
+         game_tiles, *i32x3("Game"),
+         -1, -1, -1, -1, -1],
+    ))
+
+    specials = list(SPECIAL_LAYERS)
+    for i, kind in enumerate(special_layers, start=1):
+        flag, tile_size = SPECIAL_LAYERS[kind]
+        special_data = bytearray(width * height * tile_size)
+        for t in range(0, width * height, 11):
+            special_data[t * tile_size] = 1 + rng.randrange(255)  # e.g. the tele or switch number
+        special_fields = [-1] * len(specials)
+        special_fields[specials.index(kind)] = add_data(bytes(special_data))
+        items.append((
+            ITEM_LAYER, i,
+            [0, 2, 0,
+             3, width, height, flag,
+             255, 255, 255, 255,
+             -1, 0, -1,
+             add_data(bytes(width * height * 4)), *i32x3(kind.capitalize()),
+             *special_fields],
+        ))
+
+    items.sort(key=lambda item: item[0])
+    item_types = []
+    for type_id, _, _ in items:
+        if item_types and item_types[-1][0] == type_id:
+            item_types[-1][2] += 1
+        else:
+            item_types.append([type_id, sum(t[2] for t in item_types), 1])
+
+    item_blobs = [
+        struct.pack("<ii", (type_id << 16) | item_id, len(payload) * 4) + struct.pack(f"<{len(payload)}i", *payload)
+        for type_id, item_id, payload in items
+    ]
+    compressed = [zlib.compress(blob) for blob in data]
+
+    item_offsets, offset = [], 0
+    for blob in item_blobs:
+        item_offsets.append(offset)
+        offset += len(blob)
+    item_size = offset
+
+    data_offsets, offset = [], 0
+    for blob in compressed:
+        data_offsets.append(offset)
+        offset += len(blob)
+    data_size = offset
+
+    body = b"".join([
+        b"".join(struct.pack("<iii", *t) for t in item_types),
+        struct.pack(f"<{len(item_offsets)}i", *item_offsets),
+        struct.pack(f"<{len(data_offsets)}i", *data_offsets),
+        struct.pack(f"<{len(data)}i", *(len(blob) for blob in data)),
+        *item_blobs,
+    ])
+    header_rest = struct.pack("<iiiii", len(item_types), len(items), len(data), item_size, data_size)
+    swaplen = 20 + len(body)
+    size = swaplen + data_size
+    return b"DATA" + struct.pack("<i", 4) + struct.pack("<ii", size, swaplen) + header_rest + body + b"".join(compressed)
@@ -1,13 +1,21 @@
+import aiohttp
 import discord
 import logging
-from io import BytesIO
+from typing import BinaryIO
 
 log = logging.getLogger("mt")
 
 
-def source(url, session):
-    resp = session.get(url)
-    return resp.json()
+class UploadError(RuntimeError):
+    """An upload was rejected by ddnet.org.
+
+    Attributes:
+        status: HTTP status code of the response.
+    """
+
+    def __init__(self, message: str, status: int):
+        super().__init__(message)
+        self.status = status
 
 
 async def upload_submission(session, subm):
@@ -25,7 +33,7 @@ async def upload_submission(session, subm):
         await subm.message.pin()
 
 
-async def ddnet_upload(session, asset_type: str, buf: BytesIO, filename: str):
+async def ddnet_upload(session, asset_type: str, buf: BinaryIO, filename: str):
     from run import config
     url = config.get("DDNET", "UPLOAD")
     headers = {"X-DDNet-Token": config.get("DDNET", "TOKEN")}
@@ -39,8 +47,12 @@ async def ddnet_upload(session, asset_type: str, buf: BytesIO, filename: str):
     else:
         raise ValueError("Invalid asset type")
 
-    data = {"asset_type": asset_type, "file": buf, name: filename}
-    log.info(data)
+    fields = {"asset_type": asset_type, "file": buf, name: filename}
+    log.info(fields)
+    data = aiohttp.FormData()
+    for key, value in fields.items():
+        # the file part is always sent as "file", whatever the buffer is (aiohttp would use a file's own name)
+        data.add_field(key, value, filename="file" if key == "file" else None)
     async with session.post(url, data=data, headers=headers) as resp:
         if resp.status != 200:
             fmt = "Failed uploading %s %r to ddnet.org: %s (status code: %d %s)"
@@ -52,7 +64,7 @@ async def ddnet_upload(session, asset_type: str, buf: BytesIO, filename: str):
                 resp.status,
                 resp.reason,
             )
-            raise RuntimeError("Could not upload file to ddnet.org")
+            raise UploadError("Could not upload file to ddnet.org", resp.status)
 
         log.info("Successfully uploaded %s %r to ddnet.org", asset_type, filename)
 
@@ -0,0 +1,323 @@
+import asyncio
+import fnmatch
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Mapping, Optional
+from urllib.parse import urlencode, urlsplit
+
+import aiohttp
+
+from utils.singleflight import SingleFlight, upstream
+
+log = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+@dataclass(slots=True)
+class CachedResponse:
+    """
+    A response body together with the validators needed to revalidate it.
+
+    Attributes:
+        url: The request URL including the (sorted) query string.
+        status: HTTP status code of the original response.
+        body: Raw response body.
+        etag: ETag header of the original response, if any.
+        last_modified: Last-Modified header of the original response, if any.
+        expires_at: UNIX timestamp after which the entry has to be revalidated.
+        from_cache: True if the body was served without downloading it again.
+
+    The decoded JSON body is memoized, so concurrent callers sharing one response also share the
+    parsed object. Treat it as read-only.
+    """
+    url: str
+    status: int
+    body: bytes
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    expires_at: float = 0.0
+    from_cache: bool = False
+    _json: Any = field(default=_MISSING, repr=False, compare=False)
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def text(self, encoding: str = "utf-8") -> str:
+        return self.body.decode(encoding, errors="replace")
+
+    def json(self) -> Any:
+        if self._json is _MISSING:
+            self._json = json.loads(self.body)
+        return self._json
+
+
+class HTTPCache:
+    """Non-blocking HTTP client with an on-disk response cache.
+
+    Responses are kept in a small in-memory LRU in front of a SQLite file. All disk access runs in
+    the default executor, all network access goes through an aiohttp session obtained from the
+    bot's SessionManager, so nothing here blocks the event loop.
+
+    Stale entries are revalidated with If-None-Match / If-Modified-Since. If the upstream is
+    unreachable or answers with a server error, a stale entry is returned instead. Concurrent requests for the same
+    URL are coalesced into one upstream request.
+
+    Args:
+        session_manager: The bot's SessionManager.
+        path: Location of the SQLite cache file.
+        expire_after: Default time to live in seconds.
+        urls_expire_after: Per-URL time to live in seconds, keyed by glob patterns matched against
+            "host/path" (e.g. "ddnet.org/players/*"). The first matching pattern wins.
+        memory_entries: Maximum number of responses kept in memory.
+        flight: Coalescing layer for concurrent identical requests.
+    """
+
+    def __init__(
+            self,
+            session_manager,
+            *,
+            path: str = "data/http_cache.sqlite",
+            expire_after: int = 60 * 60 * 2,
+            urls_expire_after: Optional[Mapping[str, int]] = None,
+            memory_entries: int = 256,
+            flight: SingleFlight = upstream,
+    ):
+        self.session_manager = session_manager
+        self.path = path
+        self.expire_after = expire_after
+        self.urls_expire_after = dict(urls_expire_after or {})
+        self.memory_entries = memory_entries
+        self.flight = flight
+
+        self._memory: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<HTTPCache path={self.path!r} entries_in_memory={len(self._memory)}>"
+
+    @staticmethod
+    def cache_key(url: str, params: Optional[Mapping[str, Any]] = None) -> str:
+        if not params:
+            return url
+        query = urlencode(sorted((str(k), str(v)) for k, v in params.items()))
+        return f"{url}{'&' if '?' in url else '?'}{query}"
+
+    @staticmethod
+    def label_for(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.netloc}{parts.path}"
+
+    def ttl_for(self, url: str) -> int:
+        target = self.label_for(url)
+        for pattern, ttl in self.urls_expire_after.items():
+            if fnmatch.fnmatch(target, pattern):
+                return ttl
+        return self.expire_after
+
+    # Disk backend. These run in the default executor.
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            if directory := os.path.dirname(self.path):
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses
+                (
+                    key           TEXT PRIMARY KEY,
+                    status        INTEGER NOT NULL,
+                    body          BLOB    NOT NULL,
+                    etag          TEXT,
+                    last_modified TEXT,
+                    expires_at    REAL    NOT NULL
+                )
+                """
+            )
+        return self._db
+
+    def _disk_load(self, key: str) -> Optional[CachedResponse]:
+        with self._db_lock:
+            row = self._connect().execute(
+                "SELECT status, body, etag, last_modified, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        status, body, etag, last_modified, expires_at = row
+        return CachedResponse(key, status, body, etag, last_modified, expires_at)
+
+    def _disk_store(self, entry: CachedResponse):
+        with self._db_lock:
+            db = self._connect()
+            db.execute(
+                "REPLACE INTO responses (key, status, body, etag, last_modified, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (entry.url, entry.status, entry.body, entry.etag, entry.last_modified, entry.expires_at),
+            )
+            db.commit()
+
+    def _disk_clear(self):
+        with self._db_lock:
+            db = self._connect()
+            db.execute("DELETE FROM responses")
+            db.commit()
+
+    def _disk_close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    def _remember(self, entry: CachedResponse):
+        self._memory[entry.url] = entry
+        self._memory.move_to_end(entry.url)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    async def _lookup(self, key: str) -> Optional[CachedResponse]:
+        if (entry := self._memory.get(key)) is not None:
+            self._memory.move_to_end(key)
+            return entry
+
+        try:
+            entry = await self._run(self._disk_load, key)
+        except sqlite3.Error as e:
+            log.warning("HTTP cache read failed for %s: %r", key, e)
+            return None
+
+        if entry is not None:
+            self._remember(entry)
+        return entry
+
+    async def _store(self, entry: CachedResponse):
+        self._remember(entry)
+        try:
+            await self._run(self._disk_store, entry)
+        except sqlite3.Error as e:
+            log.warning("HTTP cache write failed for %s: %r", entry.url, e)
+
+    async def get(
+            self,
+            url: str,
+            *,
+            params: Optional[Mapping[str, Any]] = None,
+            headers: Optional[Dict[str, str]] = None,
+            timeout: float = 20,
+            expire_after: Optional[int] = None,
+    ) -> CachedResponse:
+        """|coro|
+        Performs a cached GET request.
+
+        Args:
+            url: The URL to request.
+            params: Optional query parameters.
+            headers: Optional request headers.
+            timeout: Total request timeout in seconds.
+            expire_after: Overrides the configured time to live for this request.
+
+        Returns:
+            CachedResponse: The (possibly cached) response. Non-2xx responses are returned as well,
+            but never cached. A server error is only returned if there is no cached entry.
+
+        Raises:
+            aiohttp.ClientError: On network errors when no cached entry is available.
+            asyncio.TimeoutError: If the request timed out and no cached entry is available.
+        """
+        key = self.cache_key(url, params)
+        label = self.label_for(url)
+        entry = await self._lookup(key)
+        if entry is not None and entry.is_fresh:
+            self.flight.record_hit(label)
+            return replace(entry, from_cache=True)
+
+        ttl = self.ttl_for(url) if expire_after is None else expire_after
+        return await self.flight.do(
+            key, self._fetch, key, url, entry, params, headers, timeout, ttl, label=label
+        )
+
+    async def _fetch(
+            self,
+            key: str,
+            url: str,
+            entry: Optional[CachedResponse],
+            params: Optional[Mapping[str, Any]],
+            headers: Optional[Dict[str, str]],
+            timeout: float,
+            ttl: int,
+    ) -> CachedResponse:
+        request_headers = dict(headers or {})
+        if entry is not None:
+            if entry.etag:
+                request_headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                request_headers["If-Modified-Since"] = entry.last_modified
+
+        session = await self.session_manager.get_session(self.__class__.__name__)
+
+        try:
+            async with session.get(
+                    url, params=params, headers=request_headers, timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as resp:
+                if resp.status == 304 and entry is not None:
+                    # cached entries may be held by other callers, never modify them
+                    entry = replace(entry, expires_at=time.time() + ttl)
+                    await self._store(entry)
+                    return replace(entry, from_cache=True)
+
+                body = await resp.read()
+                response = CachedResponse(
+                    url=key,
+                    status=resp.status,
+                    body=body,
+                    etag=resp.headers.get("ETag"),
+                    last_modified=resp.headers.get("Last-Modified"),
+                    expires_at=time.time() + ttl,
+                )
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if entry is None:
+                raise
+            log.warning("Serving stale cache entry for %s: %r", key, e)
+            return replace(entry, from_cache=True)
+
+        if response.status >= 500 and entry is not None:
+            log.warning("Serving stale cache entry for %s: status %d", key, response.status)
+            return replace(entry, from_cache=True)
+        if response.ok:
+            await self._store(response)
+        return response
+
+    async def get_json(self, url: str, **kwargs) -> Optional[Any]:
+        """|coro|
+        Shortcut for :meth:`get` that returns the decoded JSON body, or None if the status is not 2xx.
+        """
+        resp = await self.get(url, **kwargs)
+        return resp.json() if resp.ok else None
+
+    async def clear(self):
+        """|coro|
+        Drops every cached response from memory and disk.
+        """
+        self._memory.clear()
+        await self._run(self._disk_clear)
+
+    async def close(self):
+        """|coro|
+        Closes the cache file. The HTTP session is owned by the SessionManager.
+        """
+        await self._run(self._disk_close)
@@ -0,0 +1,128 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set
+
+from utils.master_parser import Client, Server
+
+
+@dataclass(slots=True)
+class PlayerJoined:
+    name: str
+    server: Server
+    client: Client
+
+
+@dataclass(slots=True)
+class PlayerLeft:
+    name: str
+    server: Server
+
+
+@dataclass(slots=True)
+class ServerAppeared:
+    server: Server
+
+
+@dataclass(slots=True)
+class ServerVanished:
+    server: Server
+
+
+@dataclass(slots=True)
+class MapChanged:
+    server: Server
+    old_map: str
+    new_map: str
+
+
+@dataclass(slots=True)
+class MasterDiff:
+    """
+    Changes between two consecutive master list snapshots.
+
+    Players moving between servers show up as a PlayerLeft on the old and a PlayerJoined on the
+    new server. Clients of servers that appeared or vanished are reported as joined/left as well.
+
+    Attributes:
+        joined: Players that are on a server now but were not before.
+        left: Players that were on a server before but are not anymore.
+        appeared: Servers that are new in this snapshot.
+        vanished: Servers that are gone from this snapshot.
+        map_changed: Servers that switched maps.
+
+    Properties:
+        changed_players: Names of every player that joined or left a server.
+    """
+    joined: List[PlayerJoined] = field(default_factory=list)
+    left: List[PlayerLeft] = field(default_factory=list)
+    appeared: List[ServerAppeared] = field(default_factory=list)
+    vanished: List[ServerVanished] = field(default_factory=list)
+    map_changed: List[MapChanged] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.joined or self.left or self.appeared or self.vanished or self.map_changed)
+
+    def __str__(self) -> str:
+        return (
+            f"+{len(self.joined)}/-{len(self.left)} players, "
+            f"+{len(self.appeared)}/-{len(self.vanished)} servers, "
+            f"{len(self.map_changed)} map changes"
+        )
+
+    @property
+    def changed_players(self) -> Set[str]:
+        return {e.name for e in self.joined} | {e.name for e in self.left}
+
+
+def server_key(server: Server) -> Optional[str]:
+    """Stable identity of a server across snapshots: its primary normalized address."""
+    return server.normalized_address or server.ddnet_address
+
+
+def _map_name(server: Server) -> str:
+    return server.info.map.name if server.info.map and server.info.map.name else ""
+
+
+def diff_servers(old: Iterable[Server], new: Iterable[Server]) -> MasterDiff:
+    """
+    Compare two snapshots of (usually pre-filtered) servers.
+
+    Args:
+        old: Servers of the previous snapshot. Empty on the first tick.
+        new: Servers of the current snapshot.
+
+    Returns:
+        MasterDiff describing every change. Falsy if nothing changed.
+    """
+    old_by_key: Dict[str, Server] = {server_key(s): s for s in old}
+    new_by_key: Dict[str, Server] = {server_key(s): s for s in new}
+    diff = MasterDiff()
+
+    for key, server in new_by_key.items():
+        before = old_by_key.get(key)
+        if before is None:
+            diff.appeared.append(ServerAppeared(server))
+            diff.joined.extend(PlayerJoined(c.name, server, c) for c in server.info.clients)
+            continue
+
+        if (old_map := _map_name(before)) != (new_map := _map_name(server)):
+            diff.map_changed.append(MapChanged(server, old_map, new_map))
+
+        old_clients = before.info.clients
+        new_clients = server.info.clients
+        # Fast path: most servers have the very same client list tick over tick.
+        if len(old_clients) == len(new_clients) and all(
+                a.name == b.name for a, b in zip(old_clients, new_clients)
+        ):
+            continue
+
+        old_names = {c.name for c in old_clients}
+        new_names = {c.name for c in new_clients}
+        diff.joined.extend(PlayerJoined(c.name, server, c) for c in new_clients if c.name not in old_names)
+        diff.left.extend(PlayerLeft(name, server) for name in old_names - new_names)
+
+    for key, server in old_by_key.items():
+        if key not in new_by_key:
+            diff.vanished.append(ServerVanished(server))
+            diff.left.extend(PlayerLeft(c.name, server) for c in server.info.clients)
+
+    return diff
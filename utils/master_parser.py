@@ -1,12 +1,27 @@
+import asyncio
+import contextlib
+import gc
+import json
+import time
+from collections import defaultdict
+
 import aiohttp
 
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
-MASTER_URL = "https://master1.ddnet.org/ddnet/15/servers.json"
+from utils.singleflight import upstream
 
+try:
+    import orjson
+except ImportError:  # optional, only makes decode_master faster
+    orjson = None
 
-@dataclass
+MASTER_URLS = tuple(f"https://master{i}.ddnet.org/ddnet/15/servers.json" for i in range(1, 5))
+MASTER_URL = MASTER_URLS[0]
+
+
+@dataclass(slots=True)
 class Icon:
     """
     Icon information for a community.
@@ -19,7 +34,7 @@ class Icon:
     url: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Community:
     """
     Represents a community listed in the master JSON.
@@ -38,7 +53,7 @@ class Community:
     contact_urls: List[str] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class Skin:
     """
     Player skin information.
@@ -53,7 +68,7 @@ class Skin:
     color_feet: Optional[int] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Client:
     """
     Represents one connected client (player or spectator).
@@ -78,7 +93,7 @@ class Client:
     team: Optional[int] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class MapInfo:
     """
     Information about the currently running map.
@@ -93,7 +108,7 @@ class MapInfo:
     size: Optional[int] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Info:
     """
     Operational state and metadata for a server.
@@ -143,7 +158,7 @@ class Info:
         return sum(c.is_player is True or c.is_player is None for c in self.clients)
 
 
-@dataclass
+@dataclass(slots=True)
 class Server:
     """
     Represents a single server entry from the master list.
@@ -163,6 +178,7 @@ class Server:
     location: str
     info: Info
     community: Optional[str] = None
+    _normalized: Optional[List[Optional[str]]] = field(default=None, init=False, repr=False, compare=False)
 
     @property
     def region_country(self) -> Tuple[Optional[str], Optional[str]]:
@@ -189,19 +205,8 @@ class Server:
             'tw-0.6+udp://45.141.57.22:8379'        -> '45.141.57.22:8379'
             'tw-0.7+udp://[2a01:4f8:1c1e::1]:8303'  -> '[2a01:4f8:1c1e::1]:8303'
         """
-        if not self.addresses:
-            return None
-
-        addr = self.addresses[0]
-        _, _, _, host, port = parse_address(addr)
-        if not host or not port:
-            return None
-
-        # Ensure IPv6 uses brackets
-        if ":" in host and not host.startswith("["):
-            return f"[{host}]:{port}"
-
-        return f"{host}:{port}"
+        normalized = self._normalize()
+        return normalized[0] if normalized else None
 
     @property
     def normalized_addresses(self) -> List[str]:
@@ -216,25 +221,48 @@ class Server:
             IPv4 + IPv6:
                 ['45.141.57.22:8379', '[2a01:4f8:1c1e::1]:8379']
         """
-        seen = set()
-        out = []
+        return list(dict.fromkeys(n for n in self._normalize() if n))
+
+    def _normalize(self) -> List[Optional[str]]:
+        """Normalizes every advertised address once and memoizes the result."""
+        if self._normalized is None:
+            self._normalized = [normalize_address(addr) for addr in self.addresses]
+        return self._normalized
 
-        for addr in self.addresses:
-            _, _, _, host, port = parse_address(addr)
-            if not host or not port:
-                continue
 
-            # Normalize IPv6
-            if ":" in host and not host.startswith("["):
-                norm = f"[{host}]:{port}"
-            else:
-                norm = f"{host}:{port}"
+@dataclass
+class MasterIndex:
+    """
+    Lookup tables over one master list snapshot. Built once, then read-only.
+
+    Attributes:
+        players: Casefolded client name -> every (Server, Client) with that name.
+        addresses: Raw and normalized "host:port" address -> Server.
+        communities: Casefolded community ID -> servers of that community.
+        maps: Casefolded map name -> servers running that map.
+    """
+    players: Dict[str, List[Tuple[Server, Client]]] = field(default_factory=dict)
+    addresses: Dict[str, Server] = field(default_factory=dict)
+    communities: Dict[str, List[Server]] = field(default_factory=dict)
+    maps: Dict[str, List[Server]] = field(default_factory=dict)
 
-            if norm not in seen:
-                seen.add(norm)
-                out.append(norm)
+    @classmethod
+    def build(cls, servers: List[Server]) -> "MasterIndex":
+        index = cls()
+        for server in servers:
+            for addr in server.addresses:
+                index.addresses.setdefault(addr, server)
+            for norm in server.normalized_addresses:
+                index.addresses.setdefault(norm, server)
 
-        return out
+            index.communities.setdefault((server.community or "").casefold(), []).append(server)
+
+            map_name = server.info.map.name if server.info.map and server.info.map.name else ""
+            index.maps.setdefault(map_name.casefold(), []).append(server)
+
+            for client in server.info.clients:
+                index.players.setdefault(client.name.casefold(), []).append((server, client))
+        return index
 
 
 @dataclass
@@ -245,9 +273,19 @@ class MasterList:
     Attributes:
         communities: All communities known to the master server.
         servers: All discovered servers (across all communities).
+
+    Properties:
+        index: Lookup tables over 'servers', built on first access.
     """
     communities: List[Community] = field(default_factory=list)
     servers: List[Server] = field(default_factory=list)
+    _index: Optional[MasterIndex] = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def index(self) -> MasterIndex:
+        if self._index is None:
+            self._index = MasterIndex.build(self.servers)
+        return self._index
 
 
 def _get(d: Dict[str, Any], key: str, default=None):
@@ -409,12 +447,122 @@ def parse_master(data: Dict[str, Any]) -> MasterList:
         data: Root dictionary loaded from JSON.
 
     Returns:
-        MasterList instance containing communities and servers.
+        MasterList instance containing communities and servers, with its lookup index built.
     """
-    return MasterList(
+    master = MasterList(
         communities=[parse_community(x) for x in _get(data, "communities", [])],
         servers=[parse_server(x) for x in _get(data, "servers", [])],
     )
+    master._index = MasterIndex.build(master.servers)
+    return master
+
+
+def _loads(raw: Union[bytes, str]) -> Any:
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+@contextlib.contextmanager
+def _gc_paused():
+    """
+    Pause the cyclic garbage collector while building a snapshot.
+
+    Decoding allocates ~100k acyclic objects at once, which otherwise triggers repeated full
+    collections that walk the whole (still growing) object graph.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def decode_master(raw: Union[bytes, str], *, skins: bool = False, extras: bool = False) -> MasterList:
+    """
+    Fast path for parse_master that decodes the raw servers.json payload directly.
+
+    Builds the same (slotted) records as parse_master, but skips the per-field _get calls and
+    leaves out fields the bot rarely needs. Uses orjson when it is installed.
+
+    Args:
+        raw: The undecoded JSON payload.
+        skins: Also decode client skins. Client.skin stays None otherwise.
+        extras: Also decode map sha256/size, server version, client_score_kind, requires_login
+            and the info-level country.
+
+    Returns:
+        MasterList instance containing communities and servers, with its lookup index built.
+    """
+    with _gc_paused():
+        return _decode_master(_loads(raw), skins, extras)
+
+
+def _decode_master(data: Dict[str, Any], skins: bool, extras: bool) -> MasterList:
+    # Pop each raw server entry as it is converted, so its dicts can be freed right away
+    # instead of keeping the whole decoded JSON tree alive until the end.
+    raw_servers = data.get("servers") or []
+    raw_servers.reverse()
+
+    servers = []
+    append = servers.append
+    while raw_servers:
+        sd = raw_servers.pop()
+        info = sd.get("info") or {}
+
+        clients = [
+            Client(
+                c.get("name") or "",
+                c.get("clan") or "",
+                c.get("country"),
+                c.get("score"),
+                c.get("is_player"),
+                parse_skin(c.get("skin")) if skins else None,
+                c.get("afk"),
+                c.get("team"),
+            )
+            for c in info.get("clients") or ()
+        ]
+
+        if m := info.get("map"):
+            map_info = MapInfo(m.get("name") or "", m.get("sha256"), m.get("size")) if extras \
+                else MapInfo(m.get("name") or "")
+        else:
+            map_info = None
+
+        if extras:
+            info_obj = Info(
+                info.get("max_clients"),
+                info.get("max_players"),
+                info.get("passworded"),
+                info.get("game_type") or "",
+                info.get("name") or "",
+                map_info,
+                info.get("version"),
+                info.get("client_score_kind"),
+                info.get("requires_login"),
+                info.get("country"),
+                clients,
+            )
+        else:
+            info_obj = Info(
+                info.get("max_clients"),
+                info.get("max_players"),
+                info.get("passworded"),
+                info.get("game_type") or "",
+                info.get("name") or "",
+                map_info,
+                clients=clients,
+            )
+
+        append(Server(sd.get("addresses") or [], sd.get("location") or "", info_obj, sd.get("community")))
+
+    master = MasterList(
+        communities=[parse_community(x) for x in data.get("communities") or ()],
+        servers=servers,
+    )
+    master._index = MasterIndex.build(servers)
+    return master
 
 
 def find_player(master: MasterList, player_name: str) -> Optional[Tuple[Server, Client]]:
@@ -430,37 +578,29 @@ def find_player(master: MasterList, player_name: str) -> Optional[Tuple[Server,
         A tuple (Server, Client) if the player is found on any server.
         None if the player is not present on any server.
     """
-    needle = player_name.lower()
+    matches = master.index.players.get(player_name.casefold())
+    return matches[0] if matches else None
 
-    for server in master.servers:
-        for client in server.info.clients:
-            if client.name.lower() == needle:
-                return server, client
 
-    return None
+def find_players(master: MasterList, player_name: str) -> List[Tuple[Server, Client]]:
+    """
+    Like find_player, but returns every (Server, Client) pair using that name.
+    """
+    return list(master.index.players.get(player_name.casefold(), ()))
 
 
 def find_server_by_ip(master: MasterList, ip_port: str) -> Optional[Server]:
     """
     Find a server either by raw address match or by normalized host:port match.
     """
-    for server in master.servers:
-        if ip_port in server.addresses:
-            return server
-
-        norm = server.normalized_address
-        if norm and norm == ip_port:
-            return server
-
-    return None
+    return master.index.addresses.get(ip_port)
 
 
 def find_servers_by_community(master: MasterList, community_id: str) -> List[Server]:
     """
     All servers that belong to a specific community (e.g. 'ddnet').
     """
-    cid = community_id.lower()
-    return [s for s in master.servers if (s.community or "").lower() == cid]
+    return list(master.index.communities.get(community_id.casefold(), ()))
 
 
 def find_servers_by_region(master: MasterList, region: Optional[str] = None, country: Optional[str] = None) -> List[
@@ -506,13 +646,11 @@ def find_servers_by_map(master: MasterList, map_name: str, exact: bool = False)
     Returns:
         List of Server.
     """
-    needle = map_name.lower()
-    out: List[Server] = []
-    for s in master.servers:
-        m = s.info.map.name.lower() if s.info.map and s.info.map.name else ""
-        if (m == needle) if exact else (needle in m):
-            out.append(s)
-    return out
+    needle = map_name.casefold()
+    maps = master.index.maps
+    if exact:
+        return list(maps.get(needle, ()))
+    return [s for name, servers in maps.items() if needle in name for s in servers]
 
 
 def count_players(master: MasterList, community_id: Optional[str] = None) -> int:
@@ -533,6 +671,27 @@ class AddressParseError(ValueError):
     pass
 
 
+def normalize_address(addr: str) -> Optional[str]:
+    """
+    Normalize one advertised address to "host:port", bracketing IPv6 literals.
+
+    Returns:
+        The normalized address, or None if 'addr' can't be parsed.
+    """
+    try:
+        _, _, _, host, port = parse_address(addr)
+    except AddressParseError:
+        return None
+    if not host or not port:
+        return None
+
+    # Ensure IPv6 uses brackets
+    if ":" in host and not host.startswith("["):
+        return f"[{host}]:{port}"
+
+    return f"{host}:{port}"
+
+
 def parse_address(addr: str) -> Tuple[str, str, str, str, int]:
     if "://" not in addr:
         raise AddressParseError("Missing scheme separator '://'.")
@@ -584,21 +743,147 @@ def parse_address(addr: str) -> Tuple[str, str, str, str, int]:
     return tw_tag, version, transport, host, port
 
 
-async def fetch_master_list(session: aiohttp.ClientSession) -> MasterList:
+@dataclass(slots=True)
+class EndpointStats:
+    """
+    Health of one master endpoint, used to decide which endpoint to ask first.
+
+    Attributes:
+        latency: Exponentially weighted moving average of successful fetch times in seconds,
+            or None if the endpoint never answered yet.
+        successes: Number of successful fetches.
+        errors: Number of failed fetches. Requests cancelled because another endpoint won do not count.
+        consecutive_errors: Failed fetches since the last success.
+    """
+    latency: Optional[float] = None
+    successes: int = 0
+    errors: int = 0
+    consecutive_errors: int = 0
+
+    ALPHA = 0.3
+    UNKNOWN_LATENCY = 1.0
+    ERROR_PENALTY = 10.0
+
+    def __str__(self) -> str:
+        latency = "n/a" if self.latency is None else f"{self.latency * 1000:.0f}ms"
+        return f"latency={latency} ok={self.successes} errors={self.errors} streak={self.consecutive_errors}"
+
+    def record_success(self, elapsed: float):
+        self.latency = elapsed if self.latency is None else self.ALPHA * elapsed + (1 - self.ALPHA) * self.latency
+        self.successes += 1
+        self.consecutive_errors = 0
+
+    def record_error(self):
+        self.errors += 1
+        self.consecutive_errors += 1
+
+    @property
+    def score(self) -> float:
+        """Lower is better."""
+        latency = self.UNKNOWN_LATENCY if self.latency is None else self.latency
+        return latency + self.consecutive_errors * self.ERROR_PENALTY
+
+
+endpoint_stats: Dict[str, EndpointStats] = defaultdict(EndpointStats)
+
+
+def order_endpoints(urls: Sequence[str]) -> List[str]:
+    """Sorts endpoints by their recorded health, keeping the given order on ties."""
+    return sorted(urls, key=lambda url: endpoint_stats[url].score)
+
+
+def endpoint_summary() -> str:
+    return "\n".join(f"{url}: {endpoint_stats[url]}" for url in order_endpoints(list(endpoint_stats))) or "No fetches yet."
+
+
+async def fetch_master_list(
+        session: aiohttp.ClientSession,
+        *,
+        skins: bool = False,
+        urls: Sequence[str] = MASTER_URLS,
+        hedge_after: float = 1.5,
+        timeout: float = 10,
+) -> MasterList:
     """
-    HTTP-fetch the master JSON and parse it into objects.
+    HTTP-fetch the master JSON and parse it into objects using decode_master.
+
+    Endpoints are tried healthiest first. If the current request has not answered after
+    `hedge_after` seconds, the next endpoint is asked in parallel and whichever answers first
+    wins; a failing endpoint is replaced by the next one right away. Losing requests are cancelled.
+
+    Concurrent callers share one request and one parsed MasterList, so treat the result as read-only.
 
     Args:
         session: An aiohttp ClientSession to perform the request.
+        skins: Also decode client skins.
+        urls: Master endpoints serving the same servers.json.
+        hedge_after: Seconds to wait for an answer before asking the next endpoint as well.
+        timeout: Total timeout of every single request.
 
     Returns:
         MasterList containing communities and servers.
 
     Raises:
-        aiohttp.ClientError: On network/HTTP errors.
+        aiohttp.ClientError: On network/HTTP errors of every endpoint.
+        asyncio.TimeoutError: If every endpoint timed out.
         ValueError: If the response cannot be parsed as JSON.
     """
-    async with session.get(MASTER_URL, timeout=10) as resp:
-        resp.raise_for_status()
-        raw = await resp.json()
-        return parse_master(raw)
+    urls = tuple(urls)
+    return await upstream.do(
+        (urls, skins), _fetch_master_list, session, urls, skins, hedge_after, timeout, label="master"
+    )
+
+
+async def _fetch_endpoint(session: aiohttp.ClientSession, url: str, timeout: float) -> bytes:
+    stats = endpoint_stats[url]
+    start = time.perf_counter()
+    try:
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+            resp.raise_for_status()
+            raw = await resp.read()
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        stats.record_error()
+        raise
+    stats.record_success(time.perf_counter() - start)
+    return raw
+
+
+async def _fetch_master_list(
+        session: aiohttp.ClientSession, urls: Tuple[str, ...], skins: bool, hedge_after: float, timeout: float
+) -> MasterList:
+    remaining = iter(order_endpoints(urls))
+    pending: set = set()
+    raw: Optional[bytes] = None
+    error: Optional[BaseException] = None
+
+    def launch() -> bool:
+        url = next(remaining, None)
+        if url is None:
+            return False
+        pending.add(asyncio.ensure_future(_fetch_endpoint(session, url, timeout)))
+        return True
+
+    launch()
+    try:
+        while pending and raw is None:
+            done, _ = await asyncio.wait(pending, timeout=hedge_after, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                launch()
+                continue
+
+            for task in done:
+                pending.discard(task)
+                if task.exception() is not None:
+                    error = task.exception()
+                    launch()
+                elif raw is None:
+                    raw = task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+    if raw is None:
+        raise error or aiohttp.ClientError("No master endpoints configured")
+    return decode_master(raw, skins=skins)
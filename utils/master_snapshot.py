@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import aiohttp
+
+from utils.master_parser import MasterList, fetch_master_list
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class Snapshot:
+    """
+    One parsed master list together with its bookkeeping.
+
+    Attributes:
+        master: The parsed (and indexed) master list. Shared, treat it as read-only.
+        version: Increases by one for every new master list published to the store.
+        fetched_at: time.monotonic() timestamp of the fetch.
+    """
+    master: MasterList
+    version: int
+    fetched_at: float
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+
+class MasterSnapshotStore:
+    """Process-wide holder of the latest master list.
+
+    Every consumer (Overseer, /find, ...) reads the same parsed snapshot. A snapshot younger
+    than the requested maximum age is returned as is; otherwise a new one is fetched. Concurrent
+    refreshes share a single upstream request (see :func:`fetch_master_list`).
+
+    If refreshing fails, the previous snapshot is served instead of raising, as long as there is one.
+
+    Args:
+        session_manager: The bot's SessionManager.
+        ttl: Default maximum age of a snapshot in seconds.
+    """
+
+    def __init__(self, session_manager, *, ttl: float = 30.0):
+        self.session_manager = session_manager
+        self.ttl = ttl
+        self.current: Optional[Snapshot] = None
+        self._version = 0
+
+    def __repr__(self):
+        if self.current is None:
+            return "<MasterSnapshotStore empty>"
+        return f"<MasterSnapshotStore version={self.current.version} age={self.current.age:.1f}s>"
+
+    def publish(self, master: MasterList) -> Snapshot:
+        """Makes `master` the current snapshot, unless it already is."""
+        if self.current is not None and self.current.master is master:
+            return self.current
+        self._version += 1
+        self.current = Snapshot(master=master, version=self._version, fetched_at=time.monotonic())
+        return self.current
+
+    async def get(self, *, max_age: Optional[float] = None) -> Snapshot:
+        """|coro|
+        Returns a snapshot that is at most `max_age` seconds old, fetching one if needed.
+
+        Args:
+            max_age: Overrides the store's TTL for this call.
+
+        Returns:
+            Snapshot: The current snapshot.
+
+        Raises:
+            aiohttp.ClientError: On network errors when no snapshot is available yet.
+            asyncio.TimeoutError: If the request timed out and no snapshot is available yet.
+            ValueError: If the response cannot be parsed and no snapshot is available yet.
+        """
+        max_age = self.ttl if max_age is None else max_age
+        current = self.current
+        if current is not None and current.age < max_age:
+            return current
+
+        session = await self.session_manager.get_session(self.__class__.__name__)
+        try:
+            master = await fetch_master_list(session)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            if self.current is None:
+                raise
+            log.warning("Serving master snapshot v%d (%.0fs old): %r", self.current.version, self.current.age, e)
+            return self.current
+
+        return self.publish(master)
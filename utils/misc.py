@@ -5,7 +5,7 @@ import asyncio
 import functools
 import os
 from asyncio.subprocess import PIPE
-from typing import Awaitable, Callable, Tuple, Union
+from typing import Awaitable, Callable, Optional, Tuple, Union
 
 from constants import Emojis
 from data.countryflags import COUNTRYFLAGS
@@ -73,12 +73,12 @@ def check_os() -> Tuple[str, str]:
 SHELL, _ = check_os()
 
 
-async def run_process_shell(cmd: str, timeout: float = 90.0) -> Tuple[str, str]:
+async def run_process_shell(cmd: str, timeout: float = 90.0, cwd: Optional[str] = None) -> Tuple[str, str]:
     if os.name == 'posix':
         sequence = f"{SHELL} -c '{cmd}'"
-        proc = await asyncio.create_subprocess_shell(sequence, stdout=PIPE, stderr=PIPE)
+        proc = await asyncio.create_subprocess_shell(sequence, stdout=PIPE, stderr=PIPE, cwd=cwd)
     else:  # Windows
-        proc = await asyncio.create_subprocess_exec(SHELL, '-Command', cmd, stdout=PIPE, stderr=PIPE)
+        proc = await asyncio.create_subprocess_exec(SHELL, '-Command', cmd, stdout=PIPE, stderr=PIPE, cwd=cwd)
 
     try:
         stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
@@ -91,10 +91,10 @@ async def run_process_shell(cmd: str, timeout: float = 90.0) -> Tuple[str, str]:
 
 
 async def run_process_exec(
-        program: str, *args: str, timeout: float = 90.0
+        program: str, *args: str, timeout: float = 90.0, cwd: Optional[str] = None
 ) -> Tuple[str, str]:
     proc = await asyncio.create_subprocess_exec(
-        program, *args, stdout=PIPE, stderr=PIPE
+        program, *args, stdout=PIPE, stderr=PIPE, cwd=cwd
     )
     try:
         stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
@@ -0,0 +1,196 @@
+import asyncio
+import enum
+import heapq
+import itertools
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from utils.misc import run_process_exec, run_process_shell
+
+
+class Priority(enum.IntEnum):
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+@dataclass(slots=True)
+class ToolStats:
+    """
+    Counters for one tool of a ProcessPool.
+
+    Attributes:
+        queued: Calls currently waiting for a slot.
+        running: Calls currently running.
+        runs: Finished calls.
+        failures: Finished calls that raised, including timeouts.
+        wait_time: Total seconds spent waiting for a slot.
+        run_time: Total seconds spent running.
+        max_wait: Longest wait for a slot in seconds.
+    """
+    queued: int = 0
+    running: int = 0
+    runs: int = 0
+    failures: int = 0
+    wait_time: float = 0.0
+    run_time: float = 0.0
+    max_wait: float = 0.0
+
+    def __str__(self) -> str:
+        avg_wait = self.wait_time / self.runs if self.runs else 0.0
+        avg_run = self.run_time / self.runs if self.runs else 0.0
+        return (
+            f"queued={self.queued} running={self.running} runs={self.runs} failures={self.failures} "
+            f"avg_wait={avg_wait:.2f}s max_wait={self.max_wait:.2f}s avg_run={avg_run:.2f}s"
+        )
+
+
+class PriorityLimiter:
+    """Semaphore that hands free slots to the waiter with the lowest priority value first.
+
+    Waiters with the same priority are served in arrival order.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+    def __repr__(self):
+        return f"<PriorityLimiter active={self._active}/{self.limit} waiting={len(self._waiters)}>"
+
+    async def acquire(self, priority: int = Priority.BACKGROUND):
+        if self._active < self.limit and not self._waiters:
+            self._active += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over right before the cancellation, pass it on.
+                self.release()
+            raise
+
+    def release(self):
+        self._active -= 1
+        self._wake()
+
+    def resize(self, limit: int):
+        """Sets a new limit. Lowering it lets running holders finish, their slots are not refilled."""
+        self.limit = limit
+        self._wake()
+
+    def _wake(self):
+        # Hands free slots to waiters, skipping the ones that were cancelled while waiting.
+        while self._active < self.limit and self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self._active += 1
+                future.set_result(None)
+
+
+class ProcessPool:
+    """Runs external tools with a per-tool concurrency limit and priorities.
+
+    Every tool (e.g. "twmap-check") has its own limit. Interactive calls are started before
+    background calls that are waiting for the same tool.
+
+    Args:
+        limits: Maximum number of concurrent processes per tool.
+        default_limit: Limit for tools not listed in `limits`.
+    """
+
+    def __init__(self, limits: Optional[Mapping[str, int]] = None, default_limit: int = 2):
+        self.default_limit = default_limit
+        self._limiters: Dict[str, PriorityLimiter] = {}
+        self.stats: Dict[str, ToolStats] = defaultdict(ToolStats)
+        self.configure(limits or {})
+
+    def __repr__(self):
+        return f"<ProcessPool tools={list(self._limiters)}>"
+
+    def configure(self, limits: Mapping[str, int]):
+        """Sets the concurrency limit of the given tools. Running processes are not affected."""
+        for tool, limit in limits.items():
+            if tool in self._limiters:
+                self._limiters[tool].resize(limit)
+            else:
+                self._limiters[tool] = PriorityLimiter(limit)
+
+    def _limiter(self, tool: str) -> PriorityLimiter:
+        if tool not in self._limiters:
+            self._limiters[tool] = PriorityLimiter(self.default_limit)
+        return self._limiters[tool]
+
+    @asynccontextmanager
+    async def slot(self, tool: str, priority: Priority = Priority.BACKGROUND):
+        """Reserves a slot for `tool` and records wait and run times."""
+        limiter = self._limiter(tool)
+        stats = self.stats[tool]
+
+        stats.queued += 1
+        queued_at = time.perf_counter()
+        try:
+            await limiter.acquire(priority)
+        finally:
+            stats.queued -= 1
+
+        waited = time.perf_counter() - queued_at
+        stats.wait_time += waited
+        stats.max_wait = max(stats.max_wait, waited)
+        stats.running += 1
+        started_at = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            stats.failures += 1
+            raise
+        finally:
+            stats.running -= 1
+            stats.runs += 1
+            stats.run_time += time.perf_counter() - started_at
+            limiter.release()
+
+    async def run_exec(
+            self, tool: str, program: str, *args: str, priority: Priority = Priority.BACKGROUND,
+            timeout: float = 90.0, cwd: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """|coro|
+        :func:`utils.misc.run_process_exec` within the limit of `tool`.
+        """
+        async with self.slot(tool, priority):
+            return await run_process_exec(program, *args, timeout=timeout, cwd=cwd)
+
+    async def run_shell(
+            self, tool: str, cmd: str, *, priority: Priority = Priority.BACKGROUND,
+            timeout: float = 90.0, cwd: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """|coro|
+        :func:`utils.misc.run_process_shell` within the limit of `tool`.
+        """
+        async with self.slot(tool, priority):
+            return await run_process_shell(cmd, timeout=timeout, cwd=cwd)
+
+    def summary(self) -> str:
+        lines = []
+        for tool in sorted(set(self._limiters) | set(self.stats)):
+            limit = self._limiter(tool).limit
+            lines.append(f"{tool} (limit {limit}): {self.stats[tool]}")
+        return "\n".join(lines) or "No tools used yet."
+
+
+def parse_limits(value: str) -> Dict[str, int]:
+    """Parses "tool:limit, tool:limit" as used in the config file."""
+    limits = {}
+    for entry in value.split(","):
+        if not entry.strip():
+            continue
+        tool, _, limit = entry.partition(":")
+        limits[tool.strip()] = int(limit)
+    return limits
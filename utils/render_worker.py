@@ -0,0 +1,43 @@
+"""Code that runs inside the RenderPool worker processes.
+
+Workers are spawned, so they unpickle the initializer and every job by module name. This module
+lives outside of extensions.map_testing: importing anything from that package would run its
+__init__, which pulls in discord.py and every cog of the map testing extension.
+"""
+
+import os
+import sys
+import types
+
+MAP_TESTING = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "extensions", "map_testing")
+
+
+def _bare_package(name: str, path: str):
+    # Makes the modules of a package importable without running its __init__.
+    if name not in sys.modules:
+        package = types.ModuleType(name)
+        package.__path__ = [path]
+        sys.modules[name] = package
+
+
+def warm_up():
+    """Runs once in every worker: selects the headless backend before pyplot is imported and pays
+    for the matplotlib import up front instead of on the first job."""
+    _bare_package("extensions", os.path.dirname(MAP_TESTING))
+    _bare_package("extensions.map_testing", MAP_TESTING)
+
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot  # noqa: F401
+
+    from extensions.map_testing import map_visualize_size  # noqa: F401
+
+
+def ping() -> bool:
+    return True
+
+
+def visualize_size(data: bytes) -> bytes:
+    """Worker side of :meth:`RenderPool.visualize_size`."""
+    from extensions.map_testing.map_visualize_size import visualize_from_bytes
+    return visualize_from_bytes(data).getvalue()
@@ -0,0 +1,50 @@
+import contextlib
+import logging
+import os
+import shutil
+import tempfile
+from typing import Iterator, Optional
+
+log = logging.getLogger(__name__)
+
+# RAM-backed on Linux; other systems fall back to the regular temp directory.
+RAM_DIRS = ("/dev/shm",)
+
+
+def _usable(path: str) -> bool:
+    return os.path.isdir(path) and os.access(path, os.W_OK | os.X_OK)
+
+
+def scratch_root(name: str = "discordbot") -> str:
+    """Returns (and creates) the directory scratch directories are created in."""
+    base = next((d for d in RAM_DIRS if _usable(d)), tempfile.gettempdir())
+    root = os.path.join(base, name)
+    os.makedirs(root, mode=0o700, exist_ok=True)
+    return root
+
+
+@contextlib.contextmanager
+def scratch_dir(prefix: str = "", root: Optional[str] = None) -> Iterator[str]:
+    """
+    Creates a unique, private scratch directory and removes it with all contents on exit.
+
+    Args:
+        prefix: Prefix of the directory name, useful when inspecting leftovers.
+        root: Parent directory. Defaults to :func:`scratch_root`.
+
+    Yields:
+        The absolute path of the scratch directory.
+    """
+    path = tempfile.mkdtemp(prefix=prefix, dir=root or scratch_root())
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def write_scratch(directory: str, filename: str, data) -> str:
+    """Writes `data` to `directory/filename` and returns the path."""
+    path = os.path.join(directory, filename)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
@@ -0,0 +1,81 @@
+import asyncio
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+@dataclass(slots=True)
+class FlightStats:
+    """
+    Counters for one group of coalesced calls.
+
+    Attributes:
+        calls: Calls that actually ran the wrapped coroutine.
+        merged: Calls that joined a call already in flight instead.
+        hits: Calls answered without any call at all, e.g. from a cache.
+        errors: Calls that ended with an exception.
+    """
+    calls: int = 0
+    merged: int = 0
+    hits: int = 0
+    errors: int = 0
+
+    def __str__(self) -> str:
+        return f"calls={self.calls} merged={self.merged} hits={self.hits} errors={self.errors}"
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into a single in-flight call.
+
+    The first caller for a key starts the coroutine, every caller that arrives before it finishes
+    awaits the same task and receives the same result (or exception). Cancelling one waiter does not
+    cancel the shared call.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.stats: Dict[str, FlightStats] = defaultdict(FlightStats)
+
+    def __repr__(self):
+        return f"<SingleFlight inflight={len(self._inflight)} stats={dict(self.stats)}>"
+
+    async def do(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args, label: str = "default", **kwargs):
+        """|coro|
+        Runs ``func(*args, **kwargs)`` unless a call with the same key is already running.
+
+        Args:
+            key: Identifies identical calls, e.g. the request URL.
+            func: The coroutine function to run.
+            label: Name under which the call is counted in :attr:`stats`.
+
+        Returns:
+            The result of the shared call.
+        """
+        stats = self.stats[label]
+        task = self._inflight.get(key)
+        if task is None:
+            stats.calls += 1
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._inflight[key] = task
+
+            def _done(t: asyncio.Task):
+                if self._inflight.get(key) is t:
+                    del self._inflight[key]
+                if not t.cancelled() and t.exception() is not None:
+                    stats.errors += 1
+
+            task.add_done_callback(_done)
+        else:
+            stats.merged += 1
+
+        return await asyncio.shield(task)
+
+    def record_hit(self, label: str = "default"):
+        self.stats[label].hits += 1
+
+    def summary(self) -> str:
+        return "\n".join(f"{label}: {stats}" for label, stats in sorted(self.stats.items())) or "No calls yet."
+
+
+# Shared by every component that talks to the DDNet upstream servers.
+upstream = SingleFlight()